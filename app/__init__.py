@@ -1,3 +1,16 @@
-from .celery import app as celery_app
+"""
+The project package.
+
+The Celery app is loaded on first access of ``celery_app`` (by ``celery -A app``
+or a tasks module) so web processes that never send tasks do not import Celery.
+"""
 
 __all__ = ("celery_app",)
+
+
+def __getattr__(name: str):
+    if name == "celery_app":
+        from .celery import app
+
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
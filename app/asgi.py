@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from core.startup import start_up
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 application = get_asgi_application()
+start_up()
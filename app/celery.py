@@ -5,6 +5,10 @@ Celery configuration for the project.
 import os
 
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun
+
+from core import slow_queries
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
@@ -17,5 +21,16 @@ app = Celery("app")
 #   should have a `CELERY_` prefix.
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
+app.conf.beat_schedule = {
+    "send-daily-menu-report-at-10am": {
+        "task": "menu.tasks.send_daily_menu_report",
+        "schedule": crontab(hour=10, minute=0),
+    },
+}
+
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+# Attribute slow queries to the task running them.
+task_prerun.connect(slow_queries.task_started)
+task_postrun.connect(slow_queries.task_finished)
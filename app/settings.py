@@ -14,7 +14,8 @@ from datetime import timedelta
 from pathlib import Path
 
 import environ
-from celery.schedules import crontab
+
+from core.sqlite import tuned_options
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,6 +25,35 @@ env = environ.Env(
     DJANGO_DEBUG=(bool, False),
     DJANGO_ALLOWED_HOSTS=(list, []),
     DATABASE_URL=(str, "sqlite:///db.sqlite3"),
+    DATABASE_REPLICA_URLS=(list, []),
+    DATABASE_PRIMARY_PIN_SECONDS=(int, 5),
+    DATABASE_POOL=(bool, False),
+    DATABASE_POOL_MIN_SIZE=(int, 2),
+    DATABASE_POOL_MAX_SIZE=(int, 10),
+    DATABASE_SQLITE_TUNING=(bool, False),
+    DATABASE_SQLITE_BUSY_TIMEOUT_MS=(int, 5000),
+    CACHE_URL=(str, "locmemcache://"),
+    DJANGO_WARMUP=(bool, False),
+    APP_CODE_VERSION=(str, ""),
+    SCHEMA_CACHE_DIR=(str, ""),
+    METRICS_ENABLED=(bool, True),
+    METRICS_MULTIPROC_DIR=(str, ""),
+    METRICS_TOKEN=(str, ""),
+    SERVER_TIMING_ENABLED=(bool, False),
+    COMPRESSION_ENABLED=(bool, True),
+    COALESCE_ENABLED=(bool, True),
+    COALESCE_SHARED=(bool, False),
+    BATCH_CONCURRENCY=(int, 1),
+    SLOW_QUERY_THRESHOLD_MS=(float, 100.0),
+    SLOW_QUERY_EXPLAIN_ANALYZE=(bool, False),
+    PROFILE_MAX_BYTES=(int, 50 * 1024 * 1024),
+    PROFILE_MAX_CONCURRENT=(int, 2),
+    MENU_AUTO_PUBLISH=(bool, False),
+    MENU_CATALOG_INDEX=(bool, False),
+    MENU_SIMILARITY=(bool, False),
+    MENU_SIMILARITY_PATH=(str, str(BASE_DIR / "var" / "similar_dishes.npz")),
+    PASSWORD_HASH_CONCURRENCY=(int, 2),
+    PASSWORD_HASH_WAIT=(float, 0.5),
     CELERY_BROKER_URL=(str, "redis://redis:6379/0"),
     CELERY_RESULT_BACKEND=(str, "redis://redis:6379/0"),
 )
@@ -57,6 +87,7 @@ EXTERNAL_APPS = [
 ]
 
 OWN_APPS = [
+    "core",
     "user",
     "menu",
 ]
@@ -64,11 +95,14 @@ OWN_APPS = [
 INSTALLED_APPS = DJANGO_APPS + EXTERNAL_APPS + OWN_APPS
 
 MIDDLEWARE = [
+    "core.middleware.RequestTimingMiddleware",
+    "core.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -96,8 +130,45 @@ WSGI_APPLICATION = "app.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+
+def database_config(url: str) -> dict:
+    """Parse a database URL, enabling the psycopg connection pool or the SQLite tuning if configured."""
+    config = env.db_url_config(url)
+    if env("DATABASE_POOL") and config["ENGINE"] == "django.db.backends.postgresql":
+        config.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": env("DATABASE_POOL_MIN_SIZE"),
+            "max_size": env("DATABASE_POOL_MAX_SIZE"),
+        }
+    if env("DATABASE_SQLITE_TUNING") and config["ENGINE"] == "django.db.backends.sqlite3":
+        # WAL, busy timeout and BEGIN IMMEDIATE, see core.sqlite.
+        config.setdefault("OPTIONS", {}).update(tuned_options(env("DATABASE_SQLITE_BUSY_TIMEOUT_MS")))
+    return config
+
+
 DATABASES = {
-    "default": env.db("DATABASE_URL"),
+    "default": database_config(env("DATABASE_URL")),
+}
+
+# Read replicas (comma separated URLs) used for safe requests of views with
+# core.db_router.ReplicaReadMixin. Clients that wrote within the pin window
+# keep reading from the primary.
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(env("DATABASE_REPLICA_URLS"), start=1):
+    alias = f"replica_{index}"
+    DATABASES[alias] = {**database_config(replica_url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["core.db_router.PrimaryReplicaRouter"]
+DATABASE_PRIMARY_PIN_SECONDS = env("DATABASE_PRIMARY_PIN_SECONDS")
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (e.g. redis://) in production so token revocation
+# reaches every worker immediately.
+
+CACHES = {
+    "default": env.cache("CACHE_URL"),
 }
 
 
@@ -119,6 +190,18 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# API requests hash at most MAX_CONCURRENT passwords at once (see user.hashing),
+# counted in the cache: across the workers with a shared cache (CACHE_URL),
+# per worker otherwise. Requests finding no free slot within MAX_WAIT seconds
+# get a 503 with Retry-After. A slot leaked by a killed worker is freed when the
+# counter expires, EXPIRY seconds after it was created.
+PASSWORD_HASH_LIMIT = {
+    "MAX_CONCURRENT": env("PASSWORD_HASH_CONCURRENCY"),
+    "MAX_WAIT": env("PASSWORD_HASH_WAIT"),
+    "RETRY_AFTER": 1,
+    "EXPIRY": 60,
+}
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -149,7 +232,11 @@ AUTH_USER_MODEL = "user.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
-    "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("user.authentication.ClaimsJWTAuthentication",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.TimedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -160,12 +247,30 @@ SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
 
+# Serve these paths once when app.wsgi is imported so that workers forked from
+# a preloaded master (gunicorn --preload) start with warm caches.
+WARMUP_ENABLED = env("DJANGO_WARMUP")
+WARMUP_PATHS = ("/api/menu/menus/", "/api/menu/dishes/")
+
+# The OpenAPI schema is generated once per code version (APP_CODE_VERSION, or
+# a digest of the sources) and kept in SCHEMA_CACHE_DIR by build_schema.
+APP_CODE_VERSION = env("APP_CODE_VERSION")
+SCHEMA_CACHE_DIR = env("SCHEMA_CACHE_DIR")
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "user.serializers.ClaimsTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.ClaimsTokenRefreshSerializer",
 }
 
+# How long the current token version of a user is cached. Bounds how long a
+# revoked token keeps working on workers that do not share the cache.
+AUTH_TOKEN_VERSION_CACHE_TIMEOUT = 60
+# How long a full user instance is cached for permission checks.
+AUTH_USER_CACHE_TIMEOUT = 30
+
 # --- EMAIL CONFIGURATION ---
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 EMAIL_HOST = "localhost"
@@ -178,10 +283,121 @@ CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
-
-CELERY_BEAT_SCHEDULE = {
-    "send-daily-menu-report-at-10am": {
-        "task": "menu.tasks.send_daily_menu_report",
-        "schedule": crontab(hour=10, minute=0),
+# The beat schedule is defined in app/celery.py so web processes never import Celery.
+
+
+# --- METRICS ---
+# Request metrics exposed at /metrics/. With several worker processes set
+# METRICS_MULTIPROC_DIR to a directory shared by the workers (and emptied on
+# deploy) so the endpoint reports all of them; the files of exited workers are
+# folded into one total of retired workers.
+METRICS_ENABLED = env("METRICS_ENABLED")
+METRICS_MULTIPROC_DIR = env("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL = 5
+# Bearer token required by the metrics endpoint. Without it the endpoint only
+# answers requests from the loopback address that did not pass a proxy.
+METRICS_TOKEN = env("METRICS_TOKEN")
+
+# Add a Server-Timing header (auth, db, serialize, render, total) and a log
+# line to responses of the views in these URL namespaces.
+SERVER_TIMING_ENABLED = env("SERVER_TIMING_ENABLED")
+SERVER_TIMING_NAMESPACES = ("menu", "user")
+
+# Responses under COMPRESSION_PATH_PREFIXES of at least COMPRESSION_MIN_BYTES
+# are compressed with br or gzip. Each distinct body is compressed once per
+# encoding: the result is cached under a digest of the body in
+# COMPRESSION_CACHE (shared between workers with a shared cache) for bodies up
+# to COMPRESSION_CACHE_MAX_BYTES.
+COMPRESSION_ENABLED = env("COMPRESSION_ENABLED")
+COMPRESSION_PATH_PREFIXES = ("/api/",)
+COMPRESSION_MIN_BYTES = 512
+COMPRESSION_CACHE = "default"
+COMPRESSION_CACHE_TIMEOUT = 60 * 60
+COMPRESSION_CACHE_MAX_BYTES = 1024 * 1024
+
+# Identical concurrent anonymous reads of the menu API are answered by one of
+# them (see core.coalescing); the others wait up to COALESCE_WAIT_SECONDS for
+# its result. With COALESCE_SHARED this extends to all workers sharing
+# COALESCE_CACHE, which must then be a shared cache (CACHE_URL).
+COALESCE_ENABLED = env("COALESCE_ENABLED")
+COALESCE_SHARED = env("COALESCE_SHARED")
+COALESCE_CACHE = "default"
+COALESCE_WAIT_SECONDS = 2.0
+COALESCE_POLL_INTERVAL = 0.02
+
+# POST /api/batch/ answers up to BATCH_MAX_REQUESTS GET requests to the views
+# of BATCH_NAMESPACES in one round trip (see core.batch), one after the other
+# or on a pool of BATCH_CONCURRENCY threads shared by all batches of the
+# process; each thread holds its own database connection. Sub-requests still
+# unanswered after BATCH_TIMEOUT_SECONDS get a 504, but one that has started
+# runs to its end: one after the other, a slow sub-request can hold the batch
+# response past the limit.
+BATCH_NAMESPACES = ("menu", "user")
+BATCH_MAX_REQUESTS = 20
+BATCH_CONCURRENCY = env("BATCH_CONCURRENCY")
+BATCH_TIMEOUT_SECONDS = 5.0
+
+# Staff users can profile a request with the X-Profile header or the _profile
+# query parameter set to 1 (or true, yes, on). Profiles are listed in the admin; the oldest are deleted
+# once they take more than PROFILE_MAX_BYTES.
+PROFILE_MAX_BYTES = env("PROFILE_MAX_BYTES")
+PROFILE_MAX_CONCURRENT = env("PROFILE_MAX_CONCURRENT")
+PROFILE_SAMPLE_INTERVAL = 0.001
+
+# Queries of these apps slower than SLOW_QUERY_THRESHOLD_MS (0 disables) are
+# logged with their EXPLAIN plan; statistics per SQL fingerprint are logged
+# every SLOW_QUERY_FLUSH_INTERVAL seconds. EXPLAIN ANALYZE (PostgreSQL only)
+# runs the query a second time.
+SLOW_QUERY_THRESHOLD_MS = env("SLOW_QUERY_THRESHOLD_MS")
+SLOW_QUERY_EXPLAIN_ANALYZE = env("SLOW_QUERY_EXPLAIN_ANALYZE")
+SLOW_QUERY_FLUSH_INTERVAL = 60
+SLOW_QUERY_APPS = ("menu", "user")
+
+# --- MENU ---
+# Facet counts of the dish list (?facets=true) are cached per catalog version.
+# Workers only see each other's catalog changes through a shared cache
+# (CACHE_URL); with a per-process cache this bounds how long facets are stale.
+MENU_FACETS_CACHE_TIMEOUT = 5 * 60
+# Anonymous reads of a published menu are served from its snapshot, cached for
+# MENU_SNAPSHOT_CACHE_TIMEOUT seconds (like the facets, only a shared cache sees
+# publications of other processes at once). With MENU_AUTO_PUBLISH every
+# committed change of a published menu republishes it from a Celery task.
+MENU_SNAPSHOT_CACHE_TIMEOUT = 60
+MENU_AUTO_PUBLISH = env("MENU_AUTO_PUBLISH")
+# With MENU_CATALOG_INDEX menu and dish reads are answered from an in-process
+# copy of the catalog (menu.catalog_index), refreshed when the catalog version
+# changes or it is older than MENU_CATALOG_INDEX_MAX_AGE seconds.
+MENU_CATALOG_INDEX = env("MENU_CATALOG_INDEX")
+MENU_CATALOG_INDEX_MAX_AGE = 30
+# /api/menu/autocomplete/ answers from an in-process prefix index of the menu
+# and dish names (menu.autocomplete), built in the background on first use and
+# rebuilt after changes of other processes or MENU_AUTOCOMPLETE_MAX_AGE seconds.
+MENU_AUTOCOMPLETE_MAX_AGE = 5 * 60
+MENU_AUTOCOMPLETE_LIMIT = 10
+MENU_AUTOCOMPLETE_MAX_LIMIT = 50
+# With MENU_SIMILARITY /api/menu/dishes/<id>/similar/ answers from NumPy
+# arrays (menu.similarity) that a Celery task writes to MENU_SIMILARITY_PATH,
+# MENU_SIMILARITY_REBUILD_DELAY seconds after the catalog changes. The file
+# must be shared by the Celery workers and the web processes.
+MENU_SIMILARITY = env("MENU_SIMILARITY")
+MENU_SIMILARITY_PATH = env("MENU_SIMILARITY_PATH")
+MENU_SIMILARITY_REBUILD_DELAY = 60
+MENU_SIMILAR_DISHES_LIMIT = 10
+MENU_SIMILAR_DISHES_MAX_LIMIT = 50
+# The menu detail pages its dishes with ?dishes_limit= and ?dishes_cursor=
+# (MENU_DETAIL_DISHES_LIMIT by default once either is given); the menu list
+# embeds up to MENU_PREVIEW_MAX_DISHES dishes per menu with ?preview=.
+MENU_DETAIL_DISHES_LIMIT = 100
+MENU_DETAIL_DISHES_MAX_LIMIT = 500
+MENU_PREVIEW_MAX_DISHES = 10
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core": {"handlers": ["console"], "level": "INFO", "propagate": False},
     },
 }
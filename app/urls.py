@@ -6,14 +6,24 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+
+from core import views as core_views
+from core.batch import BatchView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="api-schema"),
-    path("api/docs/", SpectacularSwaggerView.as_view(url_name="api-schema"), name="api-docs"),
+    path("api/schema/", core_views.lazy_api_view("core.schema.CachedSpectacularAPIView"), name="api-schema"),
+    path(
+        "api/docs/",
+        core_views.lazy_api_view("drf_spectacular.views.SpectacularSwaggerView", url_name="api-schema"),
+        name="api-docs",
+    ),
     path("api/user/", include("user.urls")),
     path("api/menu/", include("menu.urls")),
+    path("api/batch/", BatchView.as_view(), name="api-batch"),
+    path("metrics/", core_views.metrics, name="metrics"),
+    path("healthz", core_views.healthz, name="healthz"),
+    path("readyz", core_views.readyz, name="readyz"),
 ]
 
 if settings.DEBUG:
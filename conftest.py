@@ -3,6 +3,7 @@ Global pytest configuration and fixtures.
 """
 
 import pytest
+from django.core.cache import cache
 
 
 @pytest.fixture(autouse=True)
@@ -19,3 +20,16 @@ def use_temporary_media_root(tmp_path, settings):
     temp_media_dir.mkdir()
 
     settings.MEDIA_ROOT = str(temp_media_dir)
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """
+    Clears the default cache around every test.
+
+    Primary keys are reused between tests, so cached per-user state
+    (e.g. token versions) must not leak from one test into another.
+    """
+    cache.clear()
+    yield
+    cache.clear()
@@ -0,0 +1,152 @@
+"""
+Django admin configuration for the Core app.
+
+Also provides the admin building blocks for large tables used by other apps:
+``EstimatedCountPaginator`` and ``AutocompleteFilter``.
+"""
+
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
+
+from core import models
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator using the planner statistics instead of ``COUNT(*)`` for large unfiltered tables.
+
+    Only on PostgreSQL, and only once ``pg_class.reltuples`` exceeds
+    ``exact_count_limit``; filtered lists and other databases are counted exactly.
+    """
+
+    exact_count_limit = 10_000
+
+    @cached_property
+    def count(self) -> int:
+        estimate = self.estimated_count()
+        if estimate is not None and estimate > self.exact_count_limit:
+            return estimate
+        return super().count
+
+    def estimated_count(self) -> int | None:
+        """Return the estimated row count of an unfiltered PostgreSQL table, or None."""
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet) or queryset.query.where or queryset.query.distinct:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # -1 until the table was first vacuumed or analyzed.
+        return row[0] if row and row[0] >= 0 else None
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    List filter for a foreign key using the admin's autocomplete widget.
+
+    Unlike the default related filter, it does not load every related object
+    into the sidebar. The related model admin needs ``search_fields`` and the
+    model admin must include ``AutocompleteFilter.media_for(admin_site)``.
+    """
+
+    template = "admin/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        self.lookup_val = params.get(self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.title = getattr(field, "verbose_name", field_path)
+
+        form_field = field.formfield(widget=AutocompleteSelect(field, model_admin.admin_site), required=False)
+        value = self.lookup_val[-1] if self.lookup_val else None
+        self.widget = form_field.widget.render(self.lookup_kwarg, value, attrs={"id": f"filter_{self.lookup_kwarg}"})
+        # Other filters, search and ordering are kept when a value is picked.
+        self.other_params = [
+            (name, value)
+            for name, values in request.GET.lists()
+            if name not in (self.lookup_kwarg, "p")
+            for value in values
+        ]
+
+    @classmethod
+    def media_for(cls, admin_site) -> forms.Media:
+        """Return the scripts the filter needs on the changelist page."""
+        return AutocompleteSelect(None, admin_site).media + forms.Media(js=["core/autocomplete_filter.js"])
+
+    def has_output(self) -> bool:
+        return True
+
+    def expected_parameters(self) -> list[str]:
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            "selected": not self.lookup_val,
+            "query_string": changelist.get_query_string(remove=[self.lookup_kwarg]),
+            "display": _("All"),
+        }
+
+
+@admin.register(models.RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Admin configuration for RequestProfile model."""
+
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "duration_ms",
+        "query_count",
+        "user",
+        "download_link",
+    )
+    list_filter = ("method", "status_code")
+    list_select_related = ("user",)
+    search_fields = ("path", "view_name")
+    readonly_fields = [field.name for field in models.RequestProfile._meta.fields] + ["download_link"]
+    exclude = ("stacks",)
+
+    def has_add_permission(self, request) -> bool:
+        return False
+
+    def has_change_permission(self, request, obj=None) -> bool:
+        return False
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="core_requestprofile_download",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    @admin.display(description="collapsed stacks")
+    def download_link(self, obj: models.RequestProfile) -> str:
+        url = reverse("admin:core_requestprofile_download", args=[obj.pk])
+        return format_html('<a href="{}">{}</a>', url, "Download")
+
+    def download_view(self, request, pk: int) -> FileResponse:
+        """Download the collapsed stacks of a profile."""
+        profile = get_object_or_404(models.RequestProfile, pk=pk)
+        if not self.has_view_permission(request, profile):
+            raise PermissionDenied
+        return FileResponse(profile.stacks.open("rb"), as_attachment=True, filename=f"profile-{pk}.folded")
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "core"
+
+    def ready(self) -> None:
+        from core import signals, slow_queries, timing  # noqa: F401
+
+        connection_created.connect(timing.install_execute_wrapper, dispatch_uid="core.timing.install_execute_wrapper")
+        connection_created.connect(
+            slow_queries.install_execute_wrapper, dispatch_uid="core.slow_queries.install_execute_wrapper"
+        )
@@ -0,0 +1,222 @@
+"""
+Batch endpoint answering many GET requests in one round trip.
+
+``POST /api/batch/`` takes ``{"requests": [{"path": "/api/menu/menus/?search=x"}, ...]}``
+and returns ``{"responses": [{"path": ..., "status": ..., "body": ...}, ...]}``
+in the same order. The batch is authenticated once; its user is handed to
+every sub-request, which is resolved and dispatched to its view in-process,
+without the middleware. Only views of the ``BATCH_NAMESPACES`` URL namespaces
+can be reached.
+
+At most ``BATCH_MAX_REQUESTS`` sub-requests are accepted. They run one after
+the other, or on a pool of ``BATCH_CONCURRENCY`` threads shared by all the
+batches of the process, so that threads and database connections stay
+bounded however many batches arrive. Sub-requests not answered within
+``BATCH_TIMEOUT_SECONDS`` of the start get a 504; those not started yet are
+cancelled. A sub-request that has started is not interrupted: on the pool it
+keeps its thread until it returns, and one after the other it delays the
+batch response past the limit (the sub-requests after it get a 504).
+Sub-requests on the pool are timed separately and their database time and
+queries added to the batch request's once they are answered.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from io import BytesIO
+from time import monotonic
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.translation import gettext_lazy as _
+from rest_framework import serializers, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.timing import RequestTimings, current_timings, timed_as
+
+logger = logging.getLogger(__name__)
+
+# Headers of the batch request not passed on to its sub-requests.
+EXCLUDED_META = frozenset(
+    {
+        "CONTENT_LENGTH",
+        "CONTENT_TYPE",
+        "HTTP_ACCEPT",
+        "HTTP_ACCEPT_ENCODING",
+        "HTTP_IF_MODIFIED_SINCE",
+        "HTTP_IF_NONE_MATCH",
+    }
+)
+
+
+class SubRequestSerializer(serializers.Serializer):
+    """Serializer for one GET request of a batch."""
+
+    path = serializers.CharField(max_length=2000)
+
+    def validate_path(self, value: str) -> str:
+        if not value.startswith("/"):
+            raise serializers.ValidationError(_("Must be an absolute path."))
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """Serializer for a batch of GET requests."""
+
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value: list) -> list:
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                _("At most %(count)d requests per batch.") % {"count": settings.BATCH_MAX_REQUESTS}
+            )
+        return value
+
+
+def error(path: str, status_code: int, detail: str) -> dict:
+    """Return the entry of a sub-request answered with an error."""
+    return {"path": path, "status": status_code, "body": {"detail": detail}}
+
+
+def sub_request(request: Request, path: str) -> WSGIRequest:
+    """Build a GET request for ``path`` carrying the headers and the authentication of ``request``."""
+    url = urlsplit(path)
+    environ = {key: value for key, value in request.META.items() if key.isupper() and key not in EXCLUDED_META}
+    environ.update(
+        {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.url_scheme": request.scheme,
+            "wsgi.input": BytesIO(),
+        }
+    )
+    sub = WSGIRequest(environ)
+    if request.user.is_authenticated:
+        # Picked up by rest_framework.request.Request instead of authenticating again.
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    return sub
+
+
+def dispatch(request: Request, path: str) -> dict:
+    """Answer the sub-request for ``path`` and return its entry in the batch response."""
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        match = None
+    if match is None or match.namespace not in settings.BATCH_NAMESPACES:
+        return error(path, status.HTTP_404_NOT_FOUND, _("Not found."))
+
+    sub = sub_request(request, path)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+    except Exception:
+        logger.exception("batch sub-request to %s failed", path)
+        return error(path, status.HTTP_500_INTERNAL_SERVER_ERROR, _("Server error."))
+
+    body = response.content.decode(response.charset)
+    if response.get("Content-Type", "").startswith("application/json") and body:
+        body = json.loads(body)
+    return {"path": path, "status": response.status_code, "body": body}
+
+
+def dispatch_in_thread(request: Request, path: str, timings: RequestTimings | None) -> dict:
+    """Like ``dispatch``, timed in ``timings`` and closing the database connections of the worker thread afterwards."""
+    try:
+        with timed_as(timings):
+            return dispatch(request, path)
+    finally:
+        connections.close_all()
+
+
+def sub_timings(parent: RequestTimings) -> RequestTimings:
+    """Return empty timings for a sub-request of ``parent``, logging queries if ``parent`` does."""
+    timings = RequestTimings()
+    if parent.queries is not None:
+        timings.queries = []
+    return timings
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_key: tuple[int, int] | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool of ``BATCH_CONCURRENCY`` threads answering sub-requests."""
+    global _executor, _executor_key
+    # Threads do not survive fork, so a worker forked after a batch in the master creates its own pool.
+    key = (os.getpid(), settings.BATCH_CONCURRENCY)
+    with _executor_lock:
+        if _executor_key != key:
+            if _executor is not None and _executor_key[0] == key[0]:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(settings.BATCH_CONCURRENCY, thread_name_prefix="batch")
+            _executor_key = key
+        return _executor
+
+
+def dispatch_all(request: Request, paths: list[str]) -> list[dict]:
+    """Answer the sub-requests for ``paths`` within the time limit, in order."""
+    deadline = monotonic() + settings.BATCH_TIMEOUT_SECONDS
+    timed_out = _("Batch time limit exceeded.")
+
+    if settings.BATCH_CONCURRENCY <= 1:
+        results = []
+        for path in paths:
+            if monotonic() < deadline:
+                results.append(dispatch(request, path))
+            else:
+                results.append(error(path, status.HTTP_504_GATEWAY_TIMEOUT, timed_out))
+        return results
+
+    executor = get_executor()
+    parent = current_timings()
+    # Threads must not share the batch's timings: each sub-request gets its own, added to them once answered.
+    timings = [None if parent is None else sub_timings(parent) for _ in paths]
+    # Each sub-request runs in a copy of this context, with its active language.
+    futures = [
+        executor.submit(contextvars.copy_context().run, dispatch_in_thread, request, path, sub)
+        for path, sub in zip(paths, timings, strict=True)
+    ]
+    try:
+        wait(futures, timeout=max(deadline - monotonic(), 0))
+    finally:
+        for future in futures:
+            future.cancel()
+    if parent is not None:
+        for future, sub in zip(futures, timings, strict=True):
+            # Sub-requests still running keep writing to their timings, which are then left out.
+            if future.done() and not future.cancelled():
+                parent.add(sub)
+    return [
+        future.result()
+        if future.done() and not future.cancelled()
+        else error(path, status.HTTP_504_GATEWAY_TIMEOUT, timed_out)
+        for path, future in zip(paths, futures, strict=True)
+    ]
+
+
+class BatchView(APIView):
+    """Answer many GET requests to the menu and user APIs in one round trip."""
+
+    serializer_class = BatchSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        paths = [item["path"] for item in serializer.validated_data["requests"]]
+        return Response({"responses": dispatch_all(request, paths)})
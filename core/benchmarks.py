@@ -0,0 +1,208 @@
+"""
+Micro benchmarks run by ``manage.py benchmark``.
+
+Scenarios register themselves with ``@scenario`` in a ``benchmarks`` module
+of any installed app. Each one receives a ``write`` callable for its report
+lines and the number of iterations to run.
+"""
+
+import functools
+import json
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from time import perf_counter, process_time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.urls import resolve
+
+from core.compression import ENCODINGS
+from core.metrics import MetricsRegistry
+from core.middleware import CompressionMiddleware, RequestTimingMiddleware
+from core.schema import clear_schemas
+from core.sqlite import stress, tuned_options
+
+Scenario = Callable[[Callable[[str], None], int], None]
+
+registry: dict[str, Scenario] = {}
+
+
+def scenario(name: str) -> Callable[[Scenario], Scenario]:
+    """Register a benchmark scenario under ``name``."""
+
+    def decorator(func: Scenario) -> Scenario:
+        registry[name] = func
+        return func
+
+    return decorator
+
+
+def per_call(
+    func: Callable[[], object], iterations: int, repeat: int = 5, clock: Callable[[], float] = perf_counter
+) -> float:
+    """Return the best average duration of ``func`` in seconds over ``repeat`` runs, as measured by ``clock``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = clock()
+        for _ in range(iterations):
+            func()
+        best = min(best, (clock() - start) / iterations)
+    return best
+
+
+@scenario("instrumentation")
+def instrumentation(write: Callable[[str], None], iterations: int) -> None:
+    """Overhead of RequestTimingMiddleware around a view that does nothing."""
+    request = RequestFactory().get("/api/menu/menus/")
+    match = resolve("/api/menu/menus/")
+    response = HttpResponse(b"{}", content_type="application/json")
+    response["Content-Length"] = "2"
+
+    request.resolver_match = match
+
+    def view(request):
+        return response
+
+    middleware = RequestTimingMiddleware(view)
+    middleware.registry = MetricsRegistry()
+
+    def view_with_hooks(request):
+        middleware.process_view(request, view, (), {})
+        return view(request)
+
+    middleware.get_response = view_with_hooks
+
+    bare = per_call(lambda: view(request), iterations)
+    timed = per_call(lambda: middleware(request), iterations)
+
+    write(f"bare view:            {bare * 1e6:8.2f} us/request")
+    write(f"with instrumentation: {timed * 1e6:8.2f} us/request")
+    write(f"overhead:             {(timed - bare) * 1e6:8.2f} us/request")
+
+
+@scenario("schema")
+def schema(write: Callable[[str], None], iterations: int) -> None:
+    """Cost of the first /api/schema/ request compared to cached ones."""
+    from drf_spectacular.views import SpectacularAPIView
+
+    from core.schema import CachedSpectacularAPIView
+
+    factory = RequestFactory()
+    view = CachedSpectacularAPIView.as_view()
+    uncached_view = SpectacularAPIView.as_view()
+
+    clear_schemas()
+    start = perf_counter()
+    etag = view(factory.get("/api/schema/"))["ETag"]
+    first = perf_counter() - start
+
+    uncached = per_call(lambda: uncached_view(factory.get("/api/schema/")).render(), 3, repeat=1)
+    cached = per_call(lambda: view(factory.get("/api/schema/")), iterations)
+    revalidated = per_call(lambda: view(factory.get("/api/schema/", HTTP_IF_NONE_MATCH=etag)), iterations)
+
+    write(f"uncached request:    {uncached * 1e3:8.2f} ms")
+    write(f"first request:       {first * 1e3:8.2f} ms")
+    write(f"cached request:      {cached * 1e3:8.2f} ms")
+    write(f"revalidated (304):   {revalidated * 1e3:8.2f} ms")
+
+
+@scenario("sqlite")
+def sqlite(write: Callable[[str], None], iterations: int) -> None:
+    """Concurrent readers and writers on a SQLite file, default settings vs. DATABASE_SQLITE_TUNING."""
+    duration = max(iterations / 1000, 1.0)
+    for label, options in (("default", {}), ("tuned", tuned_options(busy_timeout_ms=5000))):
+        with tempfile.TemporaryDirectory() as directory:
+            result = stress(str(Path(directory) / "stress.sqlite3"), options, duration=duration)
+        write(
+            f"{label:8} {result.reads_per_second:9.0f} reads/s  {result.writes_per_second:7.0f} writes/s  "
+            f"{result.errors:5} errors  slowest read {result.max_read_ms:7.1f} ms"
+        )
+
+
+@scenario("compression")
+def compression(write: Callable[[str], None], iterations: int) -> None:
+    """CPU per request and bytes saved by CompressionMiddleware for a large menu payload."""
+    dishes = [
+        {
+            "id": index,
+            "menu": 1,
+            "name": f"Dish {index}",
+            "description": "Slow-cooked with seasonal vegetables, herbs and a glass of house wine.",
+            "price": f"{index % 50 + 0.99:.2f}",
+            "prep_time": index % 90,
+            "is_vegetarian": index % 3 == 0,
+            "image": None,
+            "created_at": "2025-01-01T12:00:00Z",
+            "updated_at": "2025-01-01T12:00:00Z",
+        }
+        for index in range(500)
+    ]
+    body = json.dumps({"id": 1, "name": "Menu", "description": "", "dishes": dishes}).encode()
+    factory = RequestFactory()
+
+    def view(request):
+        return HttpResponse(body, content_type="application/json")
+
+    bare = per_call(lambda: view(factory.get("/api/menu/menus/1/")), iterations, clock=process_time)
+    write(f"uncompressed:   {bare * 1e6:8.1f} us CPU/request  {len(body):8} bytes")
+    cache = caches[settings.COMPRESSION_CACHE]
+    for encoding in ENCODINGS:
+        request = factory.get("/api/menu/menus/1/", HTTP_ACCEPT_ENCODING=encoding)
+        middleware = CompressionMiddleware(view)
+        size = len(middleware(request).content)
+        saved = 1 - size / len(body)
+
+        def uncached(middleware=middleware, request=request):
+            cache.clear()
+            return middleware(request)
+
+        for label, call in (("per request", uncached), ("cached", functools.partial(middleware, request))):
+            cpu = per_call(call, iterations, clock=process_time)
+            write(f"{encoding:4} {label:11} {cpu * 1e6:8.1f} us CPU/request  {size:8} bytes ({saved:.0%} saved)")
+
+
+@scenario("batch")
+def batch(write: Callable[[str], None], iterations: int) -> None:
+    """End-to-end latency of an app start's requests one by one compared to one POST /api/batch/."""
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from menu.models import Dish, Menu
+
+    user = get_user_model().objects.create_user("batch@example.com", "password123")
+    menus = [Menu.objects.create(name=f"Batch {index}") for index in range(5)]
+    Dish.objects.bulk_create(
+        Dish(menu=menus[index % len(menus)], name=f"Dish {index}", price=10, prep_time=5) for index in range(100)
+    )
+    paths = [
+        "/api/user/me/",
+        "/api/menu/menus/",
+        *(f"/api/menu/menus/{menu.pk}/" for menu in menus[:3]),
+        "/api/menu/dishes/?is_vegetarian=true",
+        f"/api/menu/dishes/?menu={menus[0].pk}",
+        "/api/menu/dishes/?ordering=-price",
+    ]
+    client = Client(SERVER_NAME="localhost", HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+    payload = {"requests": [{"path": path} for path in paths]}
+
+    def one_by_one() -> None:
+        for path in paths:
+            client.get(path)
+
+    def batched() -> None:
+        client.post("/api/batch/", payload, content_type="application/json")
+
+    repeat = max(iterations // 100, 1)
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"]):
+        separate = per_call(one_by_one, repeat)
+        together = per_call(batched, repeat)
+    write(f"one by one:            {separate * 1000:8.2f} ms server time, {len(paths)} round trips")
+    write(f"batched:               {together * 1000:8.2f} ms server time, 1 round trip")
+    for rtt in (20, 100):
+        write(
+            f"with {rtt:3} ms round trips: {separate * 1000 + len(paths) * rtt:8.2f} ms "
+            f"vs {together * 1000 + rtt:8.2f} ms (sequential client)"
+        )
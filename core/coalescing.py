@@ -0,0 +1,167 @@
+"""
+Single-flight coalescing of identical reads.
+
+When identical requests arrive while one of them is being answered, only that
+one (the leader) runs the view; the others (followers) wait for its result and
+reuse it. Views opt in through ``CoalescedReadMixin``, which coalesces the
+``list`` and ``retrieve`` requests of anonymous users.
+
+Within a process followers wait for the leader's thread. With
+``COALESCE_SHARED`` the leader also takes a short lock in the cache (``SET
+NX`` on Redis) and publishes its result there under the lock's token, so
+followers in other workers reuse it too. Followers wait at most
+``COALESCE_WAIT_SECONDS`` and then run the view themselves, as they do when
+the leader fails or its response cannot be shared.
+
+Under ASGI, Django runs sync views one at a time per worker, so coalescing
+there only happens across workers.
+"""
+
+import hashlib
+import math
+import threading
+import uuid
+from collections.abc import Callable
+from time import monotonic, sleep
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import translation
+from rest_framework.response import Response
+
+LOCK_CACHE_KEY = "coalesce:lock:{key}"
+RESULT_CACHE_KEY = "coalesce:result:{token}"
+
+
+class SharedResponse(NamedTuple):
+    """What followers need to rebuild the leader's response."""
+
+    status: int
+    data: Any
+    headers: dict[str, str]
+
+
+class _Flight:
+    __slots__ = ("done", "failed", "result")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.failed = False
+        self.result = None
+
+
+class SingleFlight:
+    """Run a function once for all concurrent calls with the same key in this process."""
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any], wait: float) -> Any:
+        """
+        Return the result of ``func``, run by the first of the concurrent callers.
+
+        The others wait up to ``wait`` seconds for it and then call ``func``
+        themselves, as they do if it raised.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(wait) and not flight.failed:
+                return flight.result
+            return func()
+
+        try:
+            flight.result = func()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+
+single_flight = SingleFlight()
+
+
+def shared_do(key: str, func: Callable[[], Any], wait: float) -> Any:
+    """Like ``SingleFlight.do``, across the processes sharing ``COALESCE_CACHE``."""
+    cache = caches[settings.COALESCE_CACHE]
+    lock_key = LOCK_CACHE_KEY.format(key=key)
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=math.ceil(wait) + 1):
+        try:
+            result = func()
+            cache.set(RESULT_CACHE_KEY.format(token=token), (result,), timeout=math.ceil(wait) + 1)
+        finally:
+            cache.delete(lock_key)
+        return result
+
+    deadline = monotonic() + wait
+    leader_token = cache.get(lock_key)
+    while leader_token is not None and monotonic() < deadline:
+        shared = cache.get(RESULT_CACHE_KEY.format(token=leader_token))
+        if shared is not None:
+            return shared[0]
+        sleep(settings.COALESCE_POLL_INTERVAL)
+    return func()
+
+
+def coalesce(key: str, func: Callable[[], Any]) -> Any:
+    """Run ``func`` once for identical concurrent calls, in this process and with ``COALESCE_SHARED`` beyond."""
+    wait = settings.COALESCE_WAIT_SECONDS
+    if settings.COALESCE_SHARED:
+        return single_flight.do(key, lambda: shared_do(key, func, wait), wait)
+    return single_flight.do(key, func, wait)
+
+
+class CoalescedReadMixin:
+    """Coalesce identical concurrent ``list`` and ``retrieve`` requests of anonymous users."""
+
+    def list(self, request, *args, **kwargs):
+        return self.coalesced(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.coalesced(super().retrieve, request, *args, **kwargs)
+
+    def coalesce_key(self, request) -> str:
+        """Return the key shared by requests that get the same response."""
+        parts = (
+            type(self).__module__,
+            type(self).__qualname__,
+            self.action,
+            request.scheme,
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_media_type,
+            translation.get_language() or "",
+        )
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def coalesced(self, view: Callable, request, *args, **kwargs):
+        """Answer the request with ``view``, or with the response of an identical request in flight."""
+        if not settings.COALESCE_ENABLED or not request.user.is_anonymous:
+            return view(request, *args, **kwargs)
+
+        own = []
+
+        def run() -> SharedResponse | None:
+            response = view(request, *args, **kwargs)
+            own.append(response)
+            if type(response) is not Response or response.status_code != 200:
+                return None
+            return SharedResponse(response.status_code, response.data, dict(response.items()))
+
+        shared = coalesce(self.coalesce_key(request), run)
+        if own:
+            return own[0]
+        if shared is None:
+            return view(request, *args, **kwargs)
+        return Response(shared.data, status=shared.status, headers=shared.headers)
@@ -0,0 +1,157 @@
+"""
+Content encodings for response bodies.
+
+Brotli (``br``) and gzip; ``CompressionMiddleware`` applies them to API
+responses.
+
+A strong ETag names one representation, so a compressed response carries its
+encoding in the ETag (``"abc"`` becomes ``"abc-gzip"``). ``split_etag`` maps
+such a tag back to the one the view knows.
+"""
+
+import gzip
+import hashlib
+import zlib
+from collections.abc import AsyncIterable, Iterable, Iterator
+
+import brotli
+from django.conf import settings
+from django.core.cache import caches
+
+# Supported encodings, preferred first.
+ENCODINGS: tuple[str, ...] = ("br", "gzip")
+
+# Encodings an ETag suffix may name.
+KNOWN_ENCODINGS = ENCODINGS
+
+# Brotli's default quality, 11, costs hundreds of milliseconds on a large menu;
+# 5 compresses about as fast as gzip level 6 and still smaller.
+BROTLI_QUALITY = 5
+
+COMPRESSED_CACHE_KEY = "compressed:{encoding}:{digest}"
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress ``body`` with one of ``ENCODINGS``."""
+    if encoding == "gzip":
+        # mtime=0 keeps the output, and so any ETag derived from it, deterministic.
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unsupported content encoding: {encoding!r}")
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Return the quality value of each coding listed in an ``Accept-Encoding`` header."""
+    qualities = {}
+    for item in header.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def negotiate(header: str, available: Iterable[str] = ENCODINGS) -> str | None:
+    """
+    Return the encoding of ``available`` the client prefers, or ``None`` for identity.
+
+    Ties go to the first of ``available``; ``*`` matches any encoding not
+    listed explicitly.
+    """
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def encode_etag(etag: str, encoding: str | None) -> str:
+    """Return the ETag of ``encoding`` applied to the representation tagged ``etag``."""
+    if encoding is None or etag.startswith("W/"):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def split_etag(etag: str) -> tuple[str, str | None]:
+    """Split an ETag made by ``encode_etag`` into the original ETag and the encoding."""
+    for encoding in KNOWN_ENCODINGS:
+        suffix = f'-{encoding}"'
+        if etag.endswith(suffix) and not etag.startswith("W/"):
+            return f'{etag[: -len(suffix)]}"', encoding
+    return etag, None
+
+
+def cached_compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress ``body``, reusing the result for the same bytes.
+
+    Results are kept in ``COMPRESSION_CACHE`` for bodies up to
+    ``COMPRESSION_CACHE_MAX_BYTES``, keyed on a digest of the body, so live
+    views benefit whether or not they set an ETag. Hashing costs a fraction of
+    compressing.
+    """
+    if len(body) > settings.COMPRESSION_CACHE_MAX_BYTES:
+        return compress(body, encoding)
+    cache = caches[settings.COMPRESSION_CACHE]
+    digest = hashlib.sha256(body).hexdigest()
+    key = COMPRESSED_CACHE_KEY.format(encoding=encoding, digest=digest)
+    compressed = cache.get(key)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        cache.set(key, compressed, settings.COMPRESSION_CACHE_TIMEOUT)
+    return compressed
+
+
+class StreamCompressor:
+    """Incremental compressor flushing after every chunk, so streamed responses keep streaming."""
+
+    def __init__(self, encoding: str):
+        if encoding == "gzip":
+            self._gzip = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding!r}")
+        self.encoding = encoding
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress and flush one chunk."""
+        if self.encoding == "gzip":
+            return self._gzip.compress(chunk) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+        return self._brotli.process(chunk) + self._brotli.flush()
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+        if self.encoding == "gzip":
+            return self._gzip.flush(zlib.Z_FINISH)
+        return self._brotli.finish()
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress the chunks of a streamed response as they are produced."""
+    compressor = StreamCompressor(encoding)
+    for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks: AsyncIterable[bytes], encoding: str):
+    """Compress the chunks of an asynchronous streamed response as they are produced."""
+    compressor = StreamCompressor(encoding)
+    async for chunk in chunks:
+        if data := compressor.compress(chunk):
+            yield data
+    yield compressor.finish()
@@ -0,0 +1,100 @@
+"""
+Routing of read queries between the primary database and read replicas.
+
+Views opt in through ``ReplicaReadMixin``: safe requests are then served from
+a randomly chosen replica from ``DATABASE_REPLICAS``. Clients that wrote
+recently are pinned to the primary for ``DATABASE_PRIMARY_PIN_SECONDS`` so
+they always read their own writes. The pin is tracked with a signed cookie
+(browsers and sessions) and with a per-user cache entry (token clients).
+"""
+
+import random
+import time
+from contextvars import ContextVar, Token
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, HttpResponse
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_PIN_COOKIE = "db_primary_pin"
+
+_read_alias: ContextVar[str | None] = ContextVar("read_alias", default=None)
+
+
+def primary_pin_cache_key(user_id) -> str:
+    """Return the cache key pinning a user to the primary database."""
+    return f"db:primary-pin:{user_id}"
+
+
+def is_pinned_to_primary(request: HttpRequest) -> bool:
+    """Return whether the client behind the request wrote recently."""
+    max_age = settings.DATABASE_PRIMARY_PIN_SECONDS
+    if request.get_signed_cookie(PRIMARY_PIN_COOKIE, default=None, max_age=max_age):
+        return True
+
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and cache.get(primary_pin_cache_key(user.pk)))
+
+
+def pin_to_primary(request: HttpRequest, response: HttpResponse) -> None:
+    """Pin the client behind the request to the primary database."""
+    max_age = settings.DATABASE_PRIMARY_PIN_SECONDS
+    response.set_signed_cookie(PRIMARY_PIN_COOKIE, str(int(time.time())), max_age=max_age, httponly=True)
+
+    user = getattr(request, "user", None)
+    if user and user.is_authenticated:
+        cache.set(primary_pin_cache_key(user.pk), True, max_age)
+
+
+def use_replica() -> Token | None:
+    """Route reads in the current context to a replica; return a token for ``release_replica``."""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return None
+    return _read_alias.set(random.choice(replicas))
+
+
+def release_replica(token: Token | None) -> None:
+    """Route reads in the current context back to the primary."""
+    if token is not None:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica chosen for the current context and writes to the primary."""
+
+    def db_for_read(self, model, **hints) -> str | None:
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints) -> str:
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        # Replicas receive the schema through replication.
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaReadMixin:
+    """Serve safe requests of a viewset from a read replica."""
+
+    _replica_token: Token | None = None
+
+    def initial(self, request, *args, **kwargs):
+        """Pick a replica once the user is known and the request is allowed."""
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request):
+            self._replica_token = use_replica()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Release the replica, or pin the client to the primary after a write."""
+        if self._replica_token is not None:
+            release_replica(self._replica_token)
+            self._replica_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request, response)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,92 @@
+"""
+Tracking of changed fields to write only what changed.
+
+Models opt in through ``DirtyFieldsMixin``. It remembers the values loaded
+from (or last written to) the database, so that ``save()`` on an existing row
+updates only the changed columns, plus the ``auto_now`` ones, and skips the
+database and the save signals entirely when nothing changed. Saves with
+explicit ``update_fields``, inserts and saves of copies (``pk`` reset or
+changed) are left to Django.
+"""
+
+from typing import Any
+
+from django.db import models
+from django.db.models.fields.files import FieldFile
+
+# Stands for a value that differs from any other, like a file not stored yet.
+_UNSAVED = object()
+
+
+def _comparable(value: Any) -> Any:
+    """Return ``value`` in a form comparable with the value loaded from the database."""
+    if isinstance(value, FieldFile):
+        return value.name if value._committed else _UNSAVED
+    return value
+
+
+class DirtyFieldsMixin:
+    """Save only the fields of a model instance that changed since it was loaded or saved."""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_fields()
+        return instance
+
+    def _tracked_fields(self) -> list[models.Field]:
+        deferred = self.get_deferred_fields()
+        return [
+            field for field in self._meta.concrete_fields if not field.primary_key and field.attname not in deferred
+        ]
+
+    def _remember_fields(self, fields: list[models.Field] | None = None) -> None:
+        """Record the current values of ``fields`` (all loaded fields by default) as saved."""
+        if fields is None or not hasattr(self, "_saved_values"):
+            self._saved_pk = self.pk
+            self._saved_values = {}
+            fields = self._tracked_fields() if fields is None else fields
+        for field in fields:
+            self._saved_values[field.attname] = _comparable(getattr(self, field.attname))
+
+    def dirty_fields(self) -> set[str]:
+        """Return the names of the loaded fields whose value changed since the last load or save."""
+        saved = getattr(self, "_saved_values", {})
+        return {
+            field.name
+            for field in self._tracked_fields()
+            if saved.get(field.attname, _UNSAVED) is _UNSAVED
+            or saved[field.attname] != _comparable(getattr(self, field.attname))
+        }
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Write the changed fields only, or nothing if none changed."""
+        tracked = not (
+            self._state.adding
+            or args
+            or kwargs.get("force_insert")
+            or kwargs.get("update_fields") is not None
+            or self.pk is None
+            or self.pk != getattr(self, "_saved_pk", None)
+        )
+        if tracked:
+            dirty = self.dirty_fields()
+            if not dirty:
+                return
+            auto_now = {field.name for field in self._meta.concrete_fields if getattr(field, "auto_now", False)}
+            kwargs["update_fields"] = dirty | auto_now
+
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            self._remember_fields()
+        else:
+            self._remember_fields([self._meta.get_field(name) for name in update_fields])
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None) -> None:
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None:
+            self._remember_fields()
+        else:
+            self._remember_fields([self._meta.get_field(name) for name in fields])
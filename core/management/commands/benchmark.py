@@ -0,0 +1,43 @@
+"""
+Django management command running the registered benchmark scenarios.
+"""
+
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.module_loading import autodiscover_modules
+
+from core import benchmarks
+
+
+class Command(BaseCommand):
+    """Command to run performance benchmarks."""
+
+    help = "Runs benchmark scenarios. Data created by a scenario is rolled back afterwards."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("scenarios", nargs="*", help="Scenarios to run (default: all).")
+        parser.add_argument("--iterations", type=int, default=1000, help="Iterations per measurement.")
+        parser.add_argument("--list", action="store_true", help="List the available scenarios.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Handle the command execution."""
+        autodiscover_modules("benchmarks")
+        registry = benchmarks.registry
+
+        if options["list"]:
+            for name, func in sorted(registry.items()):
+                self.stdout.write(f"{name}: {(func.__doc__ or '').strip()}")
+            return
+
+        names = options["scenarios"] or sorted(registry)
+        unknown = set(names) - set(registry)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {(registry[name].__doc__ or '').strip()}"))
+            with transaction.atomic():
+                registry[name](self.stdout.write, options["iterations"])
+                transaction.set_rollback(True)
@@ -0,0 +1,30 @@
+"""
+Django management command generating the OpenAPI schema files.
+"""
+
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import translation
+
+from core.schema import CachedSpectacularAPIView, get_schema, schema_key
+
+
+class Command(BaseCommand):
+    """Command to precompute the OpenAPI schema for the current code version."""
+
+    help = "Renders the OpenAPI schema in every served format into SCHEMA_CACHE_DIR."
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Handle the command execution."""
+        if not settings.SCHEMA_CACHE_DIR:
+            raise CommandError("SCHEMA_CACHE_DIR is not set.")
+
+        view = CachedSpectacularAPIView()
+        renderers = {renderer_class.format: renderer_class() for renderer_class in view.renderer_classes}
+        with translation.override(settings.LANGUAGE_CODE):
+            for file_format, renderer in renderers.items():
+                get_schema(file_format, None, lambda renderer=renderer: view.render_schema(renderer, None))
+                self.stdout.write(f"{settings.SCHEMA_CACHE_DIR}/{schema_key(file_format, None)}")
+        self.stdout.write(self.style.SUCCESS("Schema files are up to date."))
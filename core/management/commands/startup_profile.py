@@ -0,0 +1,85 @@
+"""
+Django management command profiling the startup of a web worker.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int]]:
+    """Parse ``-X importtime`` output into (module, self us, cumulative us) tuples."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if not self_us.strip().isdigit():
+            # Header line.
+            continue
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    """Command to report import times and time-to-first-response of app.wsgi."""
+
+    help = (
+        "Starts fresh interpreters importing app.wsgi and serving PATH, and reports "
+        "import time per package and module and the time to the first response."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument("--path", default="/api/menu/menus/", help="Path of the requests to time.")
+        parser.add_argument("--top", type=int, default=15, help="Number of packages and modules to list.")
+
+    def run_probe(self, path: str, *python_options: str) -> subprocess.CompletedProcess:
+        """Run ``core.startup`` in a new interpreter."""
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "app.settings")}
+        result = subprocess.run(
+            [sys.executable, *python_options, "-m", "core.startup", path],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Startup probe failed:\n{result.stderr}")
+        return result
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """Handle the command execution."""
+        top = options["top"]
+
+        # Timings come from a run without -X importtime, which slows imports down.
+        timings = json.loads(self.run_probe(options["path"]).stdout.splitlines()[-1])
+        modules = parse_importtime(self.run_probe(options["path"], "-X", "importtime").stderr)
+
+        packages: dict[str, int] = defaultdict(int)
+        for name, self_us, _ in modules:
+            packages[name.split(".")[0]] += self_us
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Time to first response"))
+        self.stdout.write(f"  import app.wsgi:       {timings['import_ms']:8.1f} ms")
+        self.stdout.write(
+            f"  first request:         {timings['first_response_ms']:8.1f} ms ({timings['first_status']})"
+        )
+        self.stdout.write(
+            f"  second request:        {timings['second_response_ms']:8.1f} ms ({timings['second_status']})"
+        )
+        self.stdout.write(f"  time to first response:{timings['time_to_first_response_ms']:8.1f} ms")
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Import time by package (total {len(modules)} modules)"))
+        for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {package}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Slowest modules (self time)"))
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: module[1], reverse=True)[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {name} (cumulative {cumulative_us / 1000:.1f} ms)")
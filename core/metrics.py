@@ -0,0 +1,311 @@
+"""
+In-process request metrics with Prometheus text exposition.
+
+Each worker aggregates observations into fixed-bucket histograms in memory.
+When ``METRICS_MULTIPROC_DIR`` is set, every worker periodically writes a
+snapshot to its own file in that directory and the scrape endpoint merges
+the snapshots of all workers, so no locking between processes is needed.
+
+The file of a worker that exited (at its exit under gunicorn, otherwise at
+the next scrape) is added to the total of the retired workers and removed,
+so the directory does not grow with every recycled worker. The total keeps
+the request histograms and counters, not the samples of the collectors.
+
+Collector samples are summed over workers, except gauges, which are combined
+as declared in ``register_collector`` like prometheus_client's
+``multiprocess_mode``.
+"""
+
+import fcntl
+import json
+import operator
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from django.conf import settings
+
+from core.timing import RequestTimings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (help, buckets)
+HISTOGRAMS = {
+    "http_request_duration_seconds": ("Total request latency.", LATENCY_BUCKETS),
+    "http_request_db_seconds": ("Time spent executing SQL.", LATENCY_BUCKETS),
+    "http_request_db_queries": ("Number of SQL queries.", QUERY_COUNT_BUCKETS),
+    "http_request_serialize_seconds": ("Time spent in the view and serialization.", LATENCY_BUCKETS),
+    "http_request_render_seconds": ("Time spent rendering the response.", LATENCY_BUCKETS),
+    "http_response_size_bytes": ("Response body size.", SIZE_BUCKETS),
+}
+REQUESTS_TOTAL = "http_requests_total"
+
+RETIRED_FILE = "metrics-retired.json"
+RETIRED_LOCK_FILE = "metrics-retired.lock"
+
+UNRESOLVED_VIEW = "<unresolved>"
+
+# How the values of a gauge are combined over workers; "all" keeps one sample per worker, labelled with its pid.
+GAUGE_MODES = {"sum": operator.add, "max": max, "min": min, "all": None}
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``counts`` has one extra slot for +Inf."""
+
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestSeries:
+    """All request histograms for one (view, method) pair."""
+
+    __slots__ = ("histograms", "ordered")
+
+    def __init__(self) -> None:
+        self.histograms = {name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()}
+        # Same order as the values passed by MetricsRegistry.observe_request.
+        self.ordered = tuple(self.histograms.values())
+
+
+class MetricsRegistry:
+    """Per-process store of request metrics."""
+
+    def __init__(self, multiprocess_dir: str = "") -> None:
+        self.multiprocess_dir = multiprocess_dir
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], RequestSeries] = {}
+        self._statuses: dict[tuple[str, str, str], int] = {}
+        self._collectors: dict[str, Callable[[], dict[str, float]]] = {}
+        self._gauges: dict[str, str] = {}
+        self._next_flush = 0.0
+
+    def register_collector(
+        self, prefix: str, collect: Callable[[], dict[str, float]], gauges: dict[str, str] | None = None
+    ) -> None:
+        """
+        Export the values returned by ``collect`` as ``<prefix>_<key>`` samples.
+
+        The values are counters, summed over workers, unless ``gauges`` maps
+        their key to one of ``GAUGE_MODES``.
+        """
+        for key, mode in (gauges or {}).items():
+            if mode not in GAUGE_MODES:
+                raise ValueError(f"Unknown gauge mode {mode!r} for {prefix}_{key}.")
+            self._gauges[f"{prefix}_{key}"] = mode
+        self._collectors[prefix] = collect
+
+    def observe_request(self, view: str, method: str, status: int, size: int, timings: RequestTimings) -> None:
+        """Record one finished request."""
+        values = (
+            timings.total,
+            timings.db,
+            timings.db_count,
+            timings.serialize,
+            timings.render,
+            size,
+        )
+        with self._lock:
+            series = self._series.get((view, method))
+            if series is None:
+                series = self._series[(view, method)] = RequestSeries()
+            for histogram, value in zip(series.ordered, values):  # noqa: B905 - same length by construction
+                histogram.counts[bisect_left(histogram.buckets, value)] += 1
+                histogram.sum += value
+
+            key = (view, method, status)
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+
+        if self.multiprocess_dir and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        """Return the metrics of this process as JSON-serializable data."""
+        with self._lock:
+            series = [
+                [view, method, {name: [*hist.counts, hist.sum] for name, hist in s.histograms.items()}]
+                for (view, method), s in self._series.items()
+            ]
+            statuses = [[view, method, str(status), count] for (view, method, status), count in self._statuses.items()]
+        samples = {
+            f"{prefix}_{key}": value for prefix, collect in self._collectors.items() for key, value in collect().items()
+        }
+        return {
+            "series": series,
+            "statuses": statuses,
+            "samples": samples,
+            "gauges": dict(self._gauges),
+            "pid": os.getpid(),
+        }
+
+    def flush(self) -> None:
+        """Write the snapshot of this process to the multiprocess directory."""
+        self._next_flush = time.monotonic() + settings.METRICS_FLUSH_INTERVAL
+        directory = Path(self.multiprocess_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"metrics-{os.getpid()}.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def retire(self, pid: int) -> None:
+        """Add the snapshot file of worker ``pid`` to the total of retired workers and remove it."""
+        directory = Path(self.multiprocess_dir)
+        path = directory / f"metrics-{pid}.json"
+        retired_path = directory / RETIRED_FILE
+        with open(directory / RETIRED_LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                snapshots = [json.loads(path.read_text())]
+            except FileNotFoundError:
+                # Retired by another process meanwhile.
+                return
+            if retired_path.exists():
+                snapshots.append(json.loads(retired_path.read_text()))
+            tmp_path = retired_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(totals(snapshots)))
+            os.replace(tmp_path, retired_path)
+            path.unlink()
+
+    def close(self) -> None:
+        """Retire the metrics of this process; called when the worker exits."""
+        if self.multiprocess_dir:
+            self.flush()
+            self.retire(os.getpid())
+
+    def collect(self) -> list[dict]:
+        """Return snapshots of all workers (or only this process without a shared directory)."""
+        if not self.multiprocess_dir:
+            return [self.snapshot()]
+
+        self.flush()
+        for path in Path(self.multiprocess_dir).glob("metrics-*.json"):
+            pid = path.stem.removeprefix("metrics-")
+            if pid.isdigit() and not is_running(int(pid)):
+                self.retire(int(pid))
+
+        snapshots = []
+        for path in Path(self.multiprocess_dir).glob("metrics-*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # A worker may be replacing its file right now.
+                continue
+        return snapshots
+
+    def reset(self) -> None:
+        """Drop all observations of this process."""
+        with self._lock:
+            self._series.clear()
+            self._statuses.clear()
+
+
+def merge(snapshots: Iterable[dict]) -> dict:
+    """
+    Sum snapshots of several workers.
+
+    Collector samples become ``{name: {labels: value}}``, with empty labels
+    unless a gauge keeps the sample of every worker.
+    """
+    series: dict[tuple[str, str], dict[str, list[float]]] = {}
+    statuses: dict[tuple[str, ...], int] = {}
+    samples: dict[str, dict[str, float]] = {}
+    gauges: dict[str, str] = {}
+
+    for snapshot in snapshots:
+        for view, method, histograms in snapshot["series"]:
+            merged = series.setdefault((view, method), {})
+            for name, values in histograms.items():
+                if name in merged:
+                    merged[name] = [a + b for a, b in zip(merged[name], values, strict=True)]
+                else:
+                    merged[name] = list(values)
+        for *key, count in snapshot["statuses"]:
+            statuses[tuple(key)] = statuses.get(tuple(key), 0) + count
+        modes = snapshot.get("gauges", {})
+        gauges.update(modes)
+        for name, value in snapshot["samples"].items():
+            values = samples.setdefault(name, {})
+            combine = GAUGE_MODES[modes.get(name, "sum")]
+            if combine is None:
+                values[f'pid="{snapshot["pid"]}"'] = value
+            elif "" in values:
+                values[""] = combine(values[""], value)
+            else:
+                values[""] = value
+
+    return {"series": series, "statuses": statuses, "samples": samples, "gauges": gauges}
+
+
+def totals(snapshots: Iterable[dict]) -> dict:
+    """Sum snapshots into one, leaving out the samples of the collectors."""
+    merged = merge(snapshots)
+    return {
+        "series": [[view, method, histograms] for (view, method), histograms in merged["series"].items()],
+        "statuses": [[*key, count] for key, count in merged["statuses"].items()],
+        "samples": {},
+    }
+
+
+def is_running(pid: int) -> bool:
+    """Return whether a process with id ``pid`` exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, but belongs to another user.
+        return True
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def exposition(snapshots: Iterable[dict]) -> str:
+    """Render snapshots in the Prometheus text exposition format."""
+    merged = merge(snapshots)
+    lines = []
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for (view, method), histograms in sorted(merged["series"].items()):
+            values = histograms.get(name)
+            if values is None:
+                continue
+            labels = f'view="{_escape(view)}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip((*buckets, "+Inf"), values[:-1], strict=True):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {values[-1]}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+    lines.append(f"# HELP {REQUESTS_TOTAL} Finished requests by status.")
+    lines.append(f"# TYPE {REQUESTS_TOTAL} counter")
+    for (view, method, status), count in sorted(merged["statuses"].items()):
+        lines.append(f'{REQUESTS_TOTAL}{{view="{_escape(view)}",method="{method}",status="{status}"}} {count}')
+
+    for name, values in sorted(merged["samples"].items()):
+        lines.append(f"# TYPE {name} {'gauge' if name in merged['gauges'] else 'untyped'}")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry(settings.METRICS_MULTIPROC_DIR)
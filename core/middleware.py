@@ -0,0 +1,233 @@
+"""
+Middleware for the project.
+"""
+
+import logging
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+from core.compression import (
+    ENCODINGS,
+    cached_compress,
+    compress_async_stream,
+    compress_stream,
+    encode_etag,
+    negotiate,
+    split_etag,
+)
+from core.metrics import UNRESOLVED_VIEW, registry
+from core.profiling import (
+    PROFILE_ID_HEADER,
+    SamplingProfiler,
+    get_staff_user,
+    profile_requested,
+    profile_slots,
+    save_profile,
+)
+from core.timing import RequestTimings, start_timings, stop_timings
+
+logger = logging.getLogger(__name__)
+
+# Content types worth compressing; any "+json" or "+xml" type is too.
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/yaml",
+    "application/vnd.oai.openapi",
+)
+
+
+def server_timing(timings: RequestTimings) -> str:
+    """Format the phases of a request as a ``Server-Timing`` header value (in milliseconds)."""
+    return (
+        f"auth;dur={timings.auth * 1000:.2f}, "
+        f'db;dur={timings.db * 1000:.2f};desc="{timings.db_count} queries", '
+        f"serialize;dur={timings.serialize * 1000:.2f}, "
+        f"render;dur={timings.render * 1000:.2f}, "
+        f"total;dur={timings.total * 1000:.2f}"
+    )
+
+
+class RequestTimingMiddleware:
+    """
+    Time every request and record it in the request metrics.
+
+    Should be the first middleware so the total latency covers the whole stack.
+    With ``SERVER_TIMING_ENABLED`` responses of the ``SERVER_TIMING_NAMESPACES``
+    views also get a ``Server-Timing`` header and a matching log line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.registry = registry
+        self.enabled = settings.METRICS_ENABLED
+        self.server_timing_namespaces = (
+            frozenset(settings.SERVER_TIMING_NAMESPACES) if settings.SERVER_TIMING_ENABLED else frozenset()
+        )
+
+    def __call__(self, request):
+        timings, token = start_timings()
+        request.timings = timings
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timings(timings, token)
+
+        match = request.resolver_match
+        if match and match.namespace in self.server_timing_namespaces:
+            self.add_server_timing(request, response, timings)
+
+        if self.enabled:
+            self.registry.observe_request(
+                match.view_name if match else UNRESOLVED_VIEW,
+                request.method,
+                response.status_code,
+                int(response.headers.get("Content-Length", 0)),
+                timings,
+            )
+
+        return response
+
+    def add_server_timing(self, request, response, timings: RequestTimings) -> None:
+        """Expose the phases of the request in a header and a log line."""
+        response["Server-Timing"] = server_timing(timings)
+        fields = {
+            "view": request.resolver_match.view_name,
+            "method": request.method,
+            "status": response.status_code,
+            "auth_ms": round(timings.auth * 1000, 2),
+            "db_ms": round(timings.db * 1000, 2),
+            "db_queries": timings.db_count,
+            "serialize_ms": round(timings.serialize * 1000, 2),
+            "render_ms": round(timings.render * 1000, 2),
+            "total_ms": round(timings.total * 1000, 2),
+        }
+        logger.info("server_timing %s", " ".join(f"{key}={value}" for key, value in fields.items()), extra=fields)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_start = perf_counter()
+        request.timings.view_name = request.resolver_match.view_name
+
+
+class ProfilingMiddleware:
+    """
+    Profile single requests of staff users on demand.
+
+    Must come after ``AuthenticationMiddleware`` and ``RequestTimingMiddleware``.
+    Requests without the profiling flag are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profile_requested(request):
+            return self.get_response(request)
+
+        user = get_staff_user(request)
+        if user is None or not profile_slots.acquire(blocking=False):
+            return self.get_response(request)
+
+        try:
+            timings = request.timings
+            timings.queries = []
+            with SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL) as profiler:
+                response = self.get_response(request)
+            profile = save_profile(request, response, user, profiler, timings)
+        finally:
+            profile_slots.release()
+
+        response[PROFILE_ID_HEADER] = str(profile.pk)
+        return response
+
+
+class CompressionMiddleware:
+    """
+    Compress responses under ``COMPRESSION_PATH_PREFIXES`` with the best encoding the client accepts.
+
+    Must come right after ``RequestTimingMiddleware``. Each distinct body is
+    compressed once per encoding (see ``cached_compress``); a strong ETag gets
+    the encoding appended; If-None-Match values are mapped back
+    to the view's ETags, and a 304 gets the variant the client sent. Streamed
+    responses are compressed chunk by chunk. Responses that already have a
+    ``Content-Encoding`` are passed through.
+    """
+
+    def __init__(self, get_response):
+        if not settings.COMPRESSION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.path_prefixes = tuple(settings.COMPRESSION_PATH_PREFIXES)
+        self.min_bytes = settings.COMPRESSION_MIN_BYTES
+
+    def __call__(self, request):
+        if not request.path.startswith(self.path_prefixes):
+            return self.get_response(request)
+
+        client_etags = self.decode_if_none_match(request)
+        response = self.get_response(request)
+        if response.status_code == 304:
+            etag = response.get("ETag")
+            if etag in client_etags:
+                response["ETag"] = client_etags[etag]
+            return response
+        if not self.compressible(response):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.headers.get("Accept-Encoding", ""), ENCODINGS)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = compress_async_stream(response.streaming_content, encoding)
+            else:
+                response.streaming_content = compress_stream(response.streaming_content, encoding)
+            del response["Content-Length"]
+        else:
+            body = cached_compress(response.content, encoding)
+            if len(body) >= len(response.content):
+                return response
+            response.content = body
+            response["Content-Length"] = str(len(body))
+        if response.has_header("ETag"):
+            response["ETag"] = encode_etag(response["ETag"], encoding)
+        response["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def decode_if_none_match(request) -> dict[str, str]:
+        """Replace ETags of compressed variants in If-None-Match by the originals; return the replaced ones."""
+        header = request.META.get("HTTP_IF_NONE_MATCH")
+        if not header:
+            return {}
+        etags, client_etags = [], {}
+        for client_etag in parse_etags(header):
+            etag, encoding = split_etag(client_etag)
+            if encoding is not None:
+                client_etags[etag] = client_etag
+            etags.append(etag)
+        if client_etags:
+            request.META["HTTP_IF_NONE_MATCH"] = ", ".join(etags)
+            # Drop the headers cached from the original META.
+            request.__dict__.pop("headers", None)
+        return client_etags
+
+    def compressible(self, response) -> bool:
+        """Return whether the response is worth compressing."""
+        if response.has_header("Content-Encoding") or response.status_code < 200 or response.status_code == 204:
+            return False
+        if "no-transform" in response.get("Cache-Control", ""):
+            return False
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not (content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(("+json", "+xml"))):
+            return False
+        return response.streaming or len(response.content) >= self.min_bytes
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:40
+
+import core.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('method', models.CharField(max_length=10, verbose_name='method')),
+                ('path', models.CharField(max_length=2000, verbose_name='path')),
+                ('view_name', models.CharField(blank=True, max_length=255, verbose_name='view name')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='status code')),
+                ('duration_ms', models.FloatField(verbose_name='duration (ms)')),
+                ('sample_count', models.PositiveIntegerField(verbose_name='samples')),
+                ('query_count', models.PositiveIntegerField(verbose_name='queries')),
+                ('stacks', models.FileField(upload_to=core.models.profile_file_path, verbose_name='collapsed stacks')),
+                ('sql_log', models.TextField(blank=True, verbose_name='SQL log')),
+                ('size', models.PositiveIntegerField(verbose_name='size (bytes)')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='user')),
+            ],
+            options={
+                'verbose_name': 'request profile',
+                'verbose_name_plural': 'request profiles',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+"""
+Database models for the Core app.
+"""
+
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+def profile_file_path(instance: "RequestProfile", filename: str) -> str:
+    """Generate file path for new collapsed stacks."""
+    ext = Path(filename).suffix
+    filename = f"{uuid.uuid4()}{ext}"
+    return str(Path("profiles") / filename)
+
+
+class RequestProfile(models.Model):
+    """Profile of a single request captured on demand by a staff user."""
+
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name="+",
+        null=True,
+        on_delete=models.SET_NULL,
+        verbose_name=_("user"),
+    )
+    method = models.CharField(_("method"), max_length=10)
+    path = models.CharField(_("path"), max_length=2000)
+    view_name = models.CharField(_("view name"), max_length=255, blank=True)
+    status_code = models.PositiveSmallIntegerField(_("status code"))
+    duration_ms = models.FloatField(_("duration (ms)"))
+    sample_count = models.PositiveIntegerField(_("samples"))
+    query_count = models.PositiveIntegerField(_("queries"))
+    stacks = models.FileField(_("collapsed stacks"), upload_to=profile_file_path)
+    sql_log = models.TextField(_("SQL log"), blank=True)
+    size = models.PositiveIntegerField(_("size (bytes)"))
+
+    class Meta:
+        verbose_name = _("request profile")
+        verbose_name_plural = _("request profiles")
+        ordering = ("-created_at",)
+
+    def __str__(self) -> str:
+        return f"{self.method} {self.path}"
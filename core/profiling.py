@@ -0,0 +1,136 @@
+"""
+On-demand profiling of single requests.
+
+``ProfilingMiddleware`` profiles a request when a staff user sends the
+``X-Profile`` header or the ``_profile`` query parameter with a true value
+(``1``, ``true``, ``yes`` or ``on``). A background thread
+samples the stack of the request thread, so several requests can be profiled
+at once; the result is stored as a ``RequestProfile`` holding the collapsed
+stacks (the input format of flamegraph tools) and the SQL log.
+"""
+
+import sys
+import threading
+from collections import Counter
+from urllib.parse import parse_qsl
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Sum
+from rest_framework.exceptions import APIException
+
+from core.timing import untimed
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_QUERY_PARAM = "_profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+# Values of the flag that turn profiling on, compared in lower case.
+TRUE_VALUES = frozenset({"1", "true", "yes", "on"})
+
+
+class SamplingProfiler:
+    """Collect the stacks of one thread at a fixed interval from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Return the samples as collapsed stacks, one ``frame;frame;... count`` line per stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+# Bounds the number of requests profiled at the same time in this process.
+profile_slots = threading.BoundedSemaphore(settings.PROFILE_MAX_CONCURRENT)
+
+
+def profile_requested(request) -> bool:
+    """Return whether the request asks to be profiled, without parsing its body or building ``request.GET``."""
+    if request.META.get(PROFILE_HEADER, "").lower() in TRUE_VALUES:
+        return True
+    query = request.META.get("QUERY_STRING", "")
+    if PROFILE_QUERY_PARAM not in query:
+        return False
+    return any(
+        name == PROFILE_QUERY_PARAM and value.lower() in TRUE_VALUES
+        for name, value in parse_qsl(query, keep_blank_values=True)
+    )
+
+
+def get_staff_user(request):
+    """Return the staff user sending the request (session or JWT), or None."""
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        from user.authentication import ClaimsJWTAuthentication
+
+        try:
+            result = ClaimsJWTAuthentication().authenticate(request)
+        except APIException:
+            return None
+        user = result[0] if result else None
+    return user if user is not None and user.is_staff else None
+
+
+def prune_profiles() -> None:
+    """Delete the oldest profiles until the stored ones fit in ``PROFILE_MAX_BYTES``."""
+    from core.models import RequestProfile
+
+    total = RequestProfile.objects.aggregate(total=Sum("size"))["total"] or 0
+    for profile in RequestProfile.objects.order_by("created_at", "id").only("id", "size", "stacks"):
+        if total <= settings.PROFILE_MAX_BYTES:
+            break
+        total -= profile.size
+        profile.delete()
+
+
+def save_profile(request, response, user, profiler: SamplingProfiler, timings):
+    """Store the profile of a finished request and enforce the disk cap, outside the request's timings."""
+    with untimed():
+        return _save_profile(request, response, user, profiler, timings)
+
+
+def _save_profile(request, response, user, profiler: SamplingProfiler, timings):
+    from core.models import RequestProfile
+
+    stacks = profiler.collapsed().encode()
+    sql_log = "".join(f"{duration * 1000:.2f}ms {sql}\n" for sql, duration in timings.queries)
+    profile = RequestProfile(
+        user_id=user.pk,
+        method=request.method,
+        path=request.get_full_path()[:2000],
+        view_name=request.resolver_match.view_name if request.resolver_match else "",
+        status_code=response.status_code,
+        duration_ms=timings.total * 1000,
+        sample_count=sum(profiler.samples.values()),
+        query_count=len(timings.queries),
+        sql_log=sql_log,
+        size=len(stacks) + len(sql_log.encode()),
+    )
+    profile.stacks.save(f"{profile.method.lower()}.folded", ContentFile(stacks), save=False)
+    profile.save()
+    prune_profiles()
+    return profile
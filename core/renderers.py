@@ -0,0 +1,15 @@
+"""
+Renderers for the API.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+from core.timing import TimedPhase
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON renderer recording its duration in the request timings."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with TimedPhase("render"):
+            return super().render(data, accepted_media_type, renderer_context)
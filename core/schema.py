@@ -0,0 +1,152 @@
+"""
+Precomputed OpenAPI schema and the views serving it.
+
+Generating the schema introspects every view and serializer, so it is done
+once per code version: ``manage.py build_schema`` writes the rendered schema
+to ``SCHEMA_CACHE_DIR`` at build time, and otherwise the first request
+generates it. Each process keeps the rendered bytes in memory and serves
+them with an ETag.
+
+Importing this module loads drf-spectacular and the ``schema`` module of every
+installed app, where schema extensions are declared.
+"""
+
+import hashlib
+import logging
+import threading
+from functools import cache
+from importlib.metadata import version
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils import translation
+from django.utils.http import parse_etags
+from django.utils.module_loading import autodiscover_modules
+from drf_spectacular.views import SpectacularAPIView
+
+logger = logging.getLogger(__name__)
+
+autodiscover_modules("schema")
+
+
+class CachedSchema(NamedTuple):
+    """A rendered schema and its ETag."""
+
+    body: bytes
+    etag: str
+
+
+@cache
+def code_version() -> str:
+    """
+    Return the version of the code the schema is generated from.
+
+    ``APP_CODE_VERSION`` (e.g. the git commit) if set, otherwise a digest of
+    the project sources and the schema libraries.
+    """
+    if settings.APP_CODE_VERSION:
+        return settings.APP_CODE_VERSION
+
+    digest = hashlib.sha256()
+    for package in ("django", "djangorestframework", "drf-spectacular"):
+        digest.update(f"{package}=={version(package)}\n".encode())
+    base_dir = Path(settings.BASE_DIR)
+    sources = {base_dir / "app"} | {Path(config.path) for config in apps.get_app_configs()}
+    for directory in sorted(path for path in sources if path.is_relative_to(base_dir)):
+        for path in sorted(directory.rglob("*.py")):
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_key(file_format: str, api_version: str | None) -> str:
+    """Return the name identifying a rendered schema variant of the current code."""
+    return f"{code_version()}-{api_version or 'default'}-{translation.get_language()}.{file_format}"
+
+
+_schemas: dict[str, CachedSchema] = {}
+_lock = threading.Lock()
+
+
+def _cached(body: bytes) -> CachedSchema:
+    return CachedSchema(body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def get_schema(file_format: str, api_version: str | None, render) -> CachedSchema:
+    """
+    Return the rendered schema for the current code version.
+
+    Looked up in memory, then in ``SCHEMA_CACHE_DIR``; ``render`` is only
+    called (once per process) when neither has it.
+    """
+    key = schema_key(file_format, api_version)
+    schema = _schemas.get(key)
+    if schema is not None:
+        return schema
+
+    with _lock:
+        if key in _schemas:
+            return _schemas[key]
+
+        path = Path(settings.SCHEMA_CACHE_DIR) / key if settings.SCHEMA_CACHE_DIR else None
+        if path is not None and path.exists():
+            body = path.read_bytes()
+        else:
+            start = perf_counter()
+            body = render()
+            duration_ms = (perf_counter() - start) * 1000
+            logger.info(
+                "openapi schema %s generated in %.1f ms",
+                key,
+                duration_ms,
+                extra={"schema": key, "duration_ms": duration_ms},
+            )
+            if path is not None:
+                write_schema(path, body)
+
+        schema = _schemas[key] = _cached(body)
+        return schema
+
+
+def write_schema(path: Path, body: bytes) -> None:
+    """Atomically write a rendered schema file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    tmp_path.write_bytes(body)
+    tmp_path.replace(path)
+
+
+def clear_schemas() -> None:
+    """Drop the schemas held in memory."""
+    with _lock:
+        _schemas.clear()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Schema view serving the schema generated once per code version."""
+
+    def _get_schema_response(self, request):
+        api_version = self.api_version or request.version or self._get_version_parameter(request)
+        renderer = request.accepted_renderer
+        schema = get_schema(renderer.format, api_version, lambda: self.render_schema(renderer, api_version))
+
+        if schema.etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f"; charset={renderer.charset}"
+            response = HttpResponse(schema.body, content_type=content_type)
+            response["Content-Disposition"] = f'inline; filename="{self._get_filename(request, api_version)}"'
+        response["ETag"] = schema.etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    def render_schema(self, renderer, api_version: str | None) -> bytes:
+        """Generate and render the schema independently of any request."""
+        generator = self.generator_class(urlconf=self.urlconf, api_version=api_version, patterns=self.patterns)
+        return renderer.render(generator.get_schema(request=None, public=self.serve_public), renderer.media_type, {})
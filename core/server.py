@@ -0,0 +1,61 @@
+"""
+Helpers for the gunicorn configuration (``gunicorn.conf.py``).
+
+Imported by the gunicorn master before Django is set up, so nothing here may
+touch settings or models.
+"""
+
+import os
+import resource
+import sys
+
+# WEB_WORKER_CLASS: (gunicorn worker class, application)
+WORKER_CLASSES = {
+    "sync": ("sync", "app.wsgi:application"),
+    "gthread": ("gthread", "app.wsgi:application"),
+    "asgi": ("uvicorn_worker.UvicornWorker", "app.asgi:application"),
+}
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def select_worker(kind: str) -> tuple[str, str]:
+    """Return the gunicorn worker class and application for a ``WEB_WORKER_CLASS`` value."""
+    try:
+        worker_class, application = WORKER_CLASSES[kind]
+    except KeyError:
+        raise ValueError(f"WEB_WORKER_CLASS must be one of {', '.join(WORKER_CLASSES)}, not {kind!r}.") from None
+
+    if kind == "asgi":
+        try:
+            import uvicorn_worker  # noqa: F401
+        except ImportError:
+            raise ValueError("WEB_WORKER_CLASS=asgi requires the uvicorn-worker package.") from None
+    return worker_class, application
+
+
+def default_workers() -> int:
+    """Return the usual ``2 * CPUs + 1`` worker count."""
+    return 2 * (os.cpu_count() or 1) + 1
+
+
+def current_rss_mb() -> float:
+    """Return the resident memory of this process in MiB."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # Peak instead of current usage; ru_maxrss is in bytes on macOS, KiB elsewhere.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def over_memory_limit(limit_mb: float) -> bool:
+    """Return whether this process uses more than ``limit_mb`` (``0`` disables the limit)."""
+    return limit_mb > 0 and current_rss_mb() > limit_mb
@@ -0,0 +1,14 @@
+"""
+Signal receivers for the Core app.
+"""
+
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from core.models import RequestProfile
+
+
+@receiver(post_delete, sender=RequestProfile)
+def delete_profile_file(sender, instance: RequestProfile, **kwargs) -> None:
+    """Remove the stacks file of a deleted profile."""
+    instance.stacks.delete(save=False)
@@ -0,0 +1,256 @@
+"""
+Slow query log.
+
+An execute wrapper installed on every connection times each query. Queries
+slower than ``SLOW_QUERY_THRESHOLD_MS`` touching the tables of the
+``SLOW_QUERY_APPS`` are grouped by a normalized SQL fingerprint. The first
+occurrence of a fingerprint is logged at once with its call site (view or
+Celery task), redacted parameters and ``EXPLAIN`` output; the statistics of
+all fingerprints are logged every ``SLOW_QUERY_FLUSH_INTERVAL`` seconds by a
+background thread of each process, started with its first slow query.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+
+from core.timing import current_timings
+
+logger = logging.getLogger(__name__)
+
+_task_name: ContextVar[str | None] = ContextVar("slow_query_task", default=None)
+_explaining: ContextVar[bool] = ContextVar("slow_query_explaining", default=False)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%s|\?")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql: str) -> str:
+    """Normalize SQL so queries differing only in literals and list lengths match."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint_id(normalized: str) -> str:
+    """Return a short stable id of a fingerprint for log searches."""
+    return hashlib.sha1(normalized.encode(), usedforsecurity=False).hexdigest()[:12]
+
+
+def redact_params(params) -> list | None:
+    """Keep ids, flags and nulls of the parameters; replace anything else by its type and size."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = params.values()
+    redacted = []
+    for param in params:
+        if param is None or isinstance(param, bool | int):
+            redacted.append(param)
+        elif isinstance(param, str | bytes):
+            redacted.append(f"<{type(param).__name__}:{len(param)}>")
+        else:
+            redacted.append(f"<{type(param).__name__}>")
+    return redacted
+
+
+def call_site() -> str:
+    """Return the view or Celery task issuing queries in the current context."""
+    timings = current_timings()
+    if timings is not None and timings.view_name:
+        return f"view:{timings.view_name}"
+    task = _task_name.get()
+    if task is not None:
+        return f"task:{task}"
+    return "other"
+
+
+def task_started(sender=None, task=None, **kwargs) -> None:
+    """``task_prerun`` receiver recording the running task as call site."""
+    task.request.slow_query_token = _task_name.set(task.name)
+
+
+def task_finished(sender=None, task=None, **kwargs) -> None:
+    """``task_postrun`` receiver clearing the call site."""
+    token = getattr(task.request, "slow_query_token", None)
+    if token is not None:
+        _task_name.reset(token)
+
+
+def explain(connection, sql: str, params) -> str:
+    """Return the plan of a query, or an empty string for statements that are not plain reads."""
+    if not sql.lstrip().upper().startswith("SELECT"):
+        return ""
+
+    if connection.vendor == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN"
+    elif connection.vendor == "postgresql" and settings.SLOW_QUERY_EXPLAIN_ANALYZE:
+        prefix = "EXPLAIN (ANALYZE, BUFFERS)"
+    else:
+        prefix = "EXPLAIN"
+
+    token = _explaining.set(True)
+    try:
+        # In a savepoint: on PostgreSQL a failed statement would abort the transaction of the request.
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {sql}", params)
+            rows = cursor.fetchall()
+    except Exception as e:
+        # The plan is best effort, e.g. some statements cannot be explained.
+        return f"<explain failed: {e}>"
+    finally:
+        _explaining.reset(token)
+    return "\n".join(" ".join(str(value) for value in row) for row in rows)
+
+
+class FingerprintStats:
+    """Aggregated slow executions of one fingerprint."""
+
+    __slots__ = ("call_sites", "count", "max", "total")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.call_sites: Counter[str] = Counter()
+
+
+class SlowQueryLog:
+    """Per-process aggregation of slow queries by fingerprint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stats: dict[str, FingerprintStats] = {}
+        self._flusher_pid: int | None = None
+        self._tables: tuple[str, ...] | None = None
+
+    @property
+    def tables(self) -> tuple[str, ...]:
+        """Tables of the watched apps."""
+        if self._tables is None:
+            self._tables = tuple(
+                model._meta.db_table
+                for label in settings.SLOW_QUERY_APPS
+                for model in apps.get_app_config(label).get_models()
+            )
+        return self._tables
+
+    def record(self, connection, sql: str, params, duration: float) -> None:
+        """Account one slow execution; explain and log it if its fingerprint is new."""
+        if not any(table in sql for table in self.tables):
+            return
+
+        normalized = fingerprint(sql)
+        site = call_site()
+        with self._lock:
+            stats = self._stats.get(normalized)
+            is_new = stats is None
+            if is_new:
+                stats = self._stats[normalized] = FingerprintStats()
+            stats.count += 1
+            stats.total += duration
+            stats.max = max(stats.max, duration)
+            stats.call_sites[site] += 1
+
+        if is_new:
+            fields = {
+                "fingerprint_id": fingerprint_id(normalized),
+                "fingerprint": normalized,
+                "duration_ms": round(duration * 1000, 2),
+                "call_site": site,
+                "params": redact_params(params),
+                "plan": explain(connection, sql, params),
+            }
+            logger.warning(
+                "slow_query id=%s duration_ms=%s call_site=%s params=%s sql=%s\n%s",
+                fields["fingerprint_id"],
+                fields["duration_ms"],
+                site,
+                fields["params"],
+                normalized,
+                fields["plan"],
+                extra=fields,
+            )
+        self.start_flusher()
+
+    def start_flusher(self) -> None:
+        """Start the thread flushing the statistics, unless this process has one."""
+        # Threads do not survive fork, so a worker forked after a slow query in the master starts its own.
+        pid = os.getpid()
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(target=self._flush_periodically, name="slow-query-flush", daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            time.sleep(settings.SLOW_QUERY_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("flushing the slow query statistics failed")
+
+    def flush(self) -> None:
+        """Log the statistics of every fingerprint seen since the last flush and reset them."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+
+        for normalized, entry in sorted(stats.items(), key=lambda item: item[1].total, reverse=True):
+            fields = {
+                "fingerprint_id": fingerprint_id(normalized),
+                "fingerprint": normalized,
+                "count": entry.count,
+                "total_ms": round(entry.total * 1000, 2),
+                "max_ms": round(entry.max * 1000, 2),
+                "call_sites": dict(entry.call_sites),
+            }
+            logger.info(
+                "slow_query_stats id=%s count=%d total_ms=%s max_ms=%s call_sites=%s sql=%s",
+                fields["fingerprint_id"],
+                entry.count,
+                fields["total_ms"],
+                fields["max_ms"],
+                fields["call_sites"],
+                normalized,
+                extra=fields,
+            )
+
+    def snapshot(self) -> dict[str, FingerprintStats]:
+        """Return the statistics gathered since the last flush."""
+        with self._lock:
+            return dict(self._stats)
+
+
+slow_query_log = SlowQueryLog()
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper recording queries over the threshold."""
+    start = perf_counter()
+    result = execute(sql, params, many, context)
+    duration = perf_counter() - start
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS and not many and not _explaining.get():
+        slow_query_log.record(context["connection"], sql, params, duration)
+    return result
+
+
+def install_execute_wrapper(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver adding ``execute_wrapper`` to new connections."""
+    if settings.SLOW_QUERY_THRESHOLD_MS > 0 and execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
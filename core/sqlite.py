@@ -0,0 +1,152 @@
+"""
+SQLite tuning for single-node deployments.
+
+``tuned_options`` returns the database ``OPTIONS`` applied to every new
+connection when ``DATABASE_SQLITE_TUNING`` is on. It is used by the settings,
+so nothing at module level may need Django to be set up.
+
+``stress`` runs concurrent readers and writers against a SQLite file; it backs
+the ``sqlite`` benchmark and the concurrency tests.
+"""
+
+import copy
+import threading
+from time import perf_counter
+from typing import NamedTuple
+
+MMAP_SIZE = 128 * 1024 * 1024
+CACHE_SIZE_KIB = 16 * 1024
+
+
+def tuned_options(busy_timeout_ms: int) -> dict:
+    """Return the SQLite ``OPTIONS`` for concurrent readers and writers."""
+    pragmas = (
+        # Readers see the last commit and never wait for the writer.
+        "journal_mode=WAL",
+        # With WAL, only checkpoints fsync; a power loss may drop the last commits but not corrupt the file.
+        "synchronous=NORMAL",
+        # Wait for the write lock instead of failing with "database is locked".
+        f"busy_timeout={busy_timeout_ms}",
+        f"mmap_size={MMAP_SIZE}",
+        f"cache_size={-CACHE_SIZE_KIB}",
+    )
+    return {
+        # Take the write lock at BEGIN: a deferred transaction that reads first
+        # cannot upgrade to a writer while another one writes and fails at once,
+        # without waiting for the busy timeout.
+        "transaction_mode": "IMMEDIATE",
+        "init_command": ";".join(f"PRAGMA {pragma}" for pragma in pragmas),
+    }
+
+
+class StressResult(NamedTuple):
+    """Outcome of a ``stress`` run."""
+
+    reads: int
+    writes: int
+    errors: int
+    max_read_ms: float
+    duration: float
+
+    @property
+    def reads_per_second(self) -> float:
+        return self.reads / self.duration
+
+    @property
+    def writes_per_second(self) -> float:
+        return self.writes / self.duration
+
+
+class _Counters:
+    """Thread-safe totals of a ``stress`` run."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.reads = self.writes = self.errors = 0
+        self.max_read = 0.0
+
+    def add(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def read(self, duration: float) -> None:
+        with self.lock:
+            self.reads += 1
+            self.max_read = max(self.max_read, duration)
+
+
+def _write(alias: str, stop: threading.Event, counters: _Counters) -> None:
+    from django.db import OperationalError, connections, transaction
+
+    while not stop.is_set():
+        try:
+            with transaction.atomic(using=alias), connections[alias].cursor() as cursor:
+                cursor.execute("SELECT COALESCE(MAX(value), 0) FROM stress_item")
+                (value,) = cursor.fetchone()
+                cursor.execute("INSERT INTO stress_item (value) VALUES (%s)", [value + 1])
+        except OperationalError:
+            counters.add("errors")
+        else:
+            counters.add("writes")
+
+
+def _read(alias: str, stop: threading.Event, counters: _Counters) -> None:
+    from django.db import OperationalError, connections
+
+    while not stop.is_set():
+        start = perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT COUNT(*), SUM(value) FROM stress_item")
+                cursor.fetchone()
+        except OperationalError:
+            counters.add("errors")
+        else:
+            counters.read(perf_counter() - start)
+
+
+def _run(target, alias: str, stop: threading.Event, counters: _Counters) -> None:
+    from django.db import connections
+
+    try:
+        target(alias, stop, counters)
+    finally:
+        connections[alias].close()
+
+
+def stress(name: str, options: dict, readers: int = 4, writers: int = 4, duration: float = 1.0) -> StressResult:
+    """
+    Run ``readers`` and ``writers`` threads against the SQLite file ``name`` for ``duration`` seconds.
+
+    Writers run read-then-write transactions (like a view updating a row it
+    loaded); readers time an aggregate over the written table. Failed
+    statements (``database is locked``) are counted as errors.
+    """
+    from django.db import connections
+
+    alias = f"sqlite_stress_{threading.get_ident()}"
+    config = copy.deepcopy(connections.settings["default"])
+    config.update(ENGINE="django.db.backends.sqlite3", NAME=name, OPTIONS=options)
+    connections.settings[alias] = config
+
+    counters = _Counters()
+    stop = threading.Event()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute("CREATE TABLE IF NOT EXISTS stress_item (id INTEGER PRIMARY KEY, value INTEGER)")
+        targets = [_read] * readers + [_write] * writers
+        threads = [threading.Thread(target=_run, args=(target, alias, stop, counters)) for target in targets]
+        start = perf_counter()
+        for thread in threads:
+            thread.start()
+        stop.wait(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = perf_counter() - start
+    finally:
+        connections[alias].close()
+        del connections[alias]
+        del connections.settings[alias]
+
+    return StressResult(counters.reads, counters.writes, counters.errors, counters.max_read * 1000, elapsed)
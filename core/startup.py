@@ -0,0 +1,165 @@
+"""
+Worker startup helpers.
+
+``start_up`` runs when ``app.wsgi`` or ``app.asgi`` is imported. With
+``WARMUP_ENABLED`` it first initializes lazily loaded state (URL resolver,
+serializer fields, translations, DRF settings, the first database queries) so
+that workers forked from a preloaded master start warm. Database connections
+and connection pools are closed afterwards, as sockets must not be shared
+across the fork. The process reports ready (``/readyz``) only afterwards.
+
+Run as ``python -m core.startup <path>`` it measures a cold start: the time
+to import ``app.wsgi`` and to serve the first and second request, printed as
+JSON (used by ``manage.py startup_profile``).
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from io import BytesIO
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+
+
+def wsgi_get(application, path: str) -> str:
+    """Send a GET request through a WSGI application and return the response status."""
+    from django.conf import settings
+
+    host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")), "localhost")
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "REMOTE_ADDR": "127.0.0.1",
+        "HTTP_HOST": host,
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": False,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    statuses = []
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return statuses[0]
+
+
+def is_ready() -> bool:
+    """Return whether the process finished starting up."""
+    return _ready.is_set()
+
+
+def load_urls_and_serializers() -> None:
+    """Populate the URL resolver and build the fields of every routed view's serializer."""
+    from django.urls import URLResolver, get_resolver
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            else:
+                yield pattern
+
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 - populates the resolver
+    serializer_classes = {
+        view_class.serializer_class
+        for pattern in walk(resolver.url_patterns)
+        if (view_class := getattr(pattern.callback, "cls", None)) is not None
+        and getattr(view_class, "serializer_class", None) is not None
+    }
+    for serializer_class in serializer_classes:
+        serializer_class().fields  # noqa: B018 - builds and caches the fields
+
+
+def close_pools() -> None:
+    """
+    Close the psycopg connection pools (``DATABASE_POOL``).
+
+    ``connections.close_all()`` only returns pooled connections to their pool.
+    A pool opened in a preloaded master would be inherited by the forked
+    workers with its open sockets but without its maintenance threads, so it
+    is closed; each worker opens its own on its first query.
+    """
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        if connection.settings_dict["OPTIONS"].get("pool") and hasattr(connection, "close_pool"):
+            connection.close_pool()
+
+
+def warm_up() -> None:
+    """Serve ``WARMUP_PATHS`` once, then drop the state that must not be shared with forked workers."""
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connections
+
+    from core.metrics import registry
+
+    load_urls_and_serializers()
+    application = WSGIHandler()
+    for path in settings.WARMUP_PATHS:
+        status = wsgi_get(application, path)
+        if not status.startswith("2"):
+            logger.warning("warm-up request to %s returned %s", path, status)
+
+    connections.close_all()
+    close_pools()
+    registry.reset()
+
+
+def start_up() -> None:
+    """Warm up if enabled, then mark the process ready."""
+    from django.conf import settings
+
+    if settings.WARMUP_ENABLED:
+        warm_up()
+    _ready.set()
+
+
+def measure(path: str) -> dict:
+    """Import the WSGI application and time the first two requests to ``path``."""
+    start = perf_counter()
+    from app.wsgi import application
+
+    imported = perf_counter()
+    from django.conf import settings
+
+    if not settings.ALLOWED_HOSTS:
+        # Let the probe through without DEBUG; only this process is affected.
+        settings.ALLOWED_HOSTS = ["localhost"]
+    first_status = wsgi_get(application, path)
+    first = perf_counter()
+    second_status = wsgi_get(application, path)
+    second = perf_counter()
+
+    return {
+        "path": path,
+        "import_ms": (imported - start) * 1000,
+        "first_response_ms": (first - imported) * 1000,
+        "first_status": first_status,
+        "second_response_ms": (second - first) * 1000,
+        "second_status": second_status,
+        "time_to_first_response_ms": (first - start) * 1000,
+    }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    print(json.dumps(measure(sys.argv[1])))  # noqa: T201
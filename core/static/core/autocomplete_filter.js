@@ -0,0 +1,7 @@
+'use strict';
+{
+    // Apply an AutocompleteFilter as soon as a value is picked.
+    django.jQuery(document).on('change', '.autocomplete-filter select', function() {
+        this.form.submit();
+    });
+}
@@ -0,0 +1,219 @@
+"""
+Tests for the batch endpoint.
+"""
+
+import threading
+from time import sleep
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.batch import get_executor
+from core.metrics import registry
+from core.timing import current_timings
+from menu.models import Dish, Menu
+from menu.views import MenuViewSet
+from user.authentication import ClaimsJWTAuthentication
+
+BATCH_URL = reverse("api-batch")
+
+
+def batch(client: APIClient, *paths: str):
+    """Post a batch of GET requests to ``paths``."""
+    return client.post(BATCH_URL, {"requests": [{"path": path} for path in paths]}, format="json")
+
+
+def finish_abandoned(threads: int) -> None:
+    """Wait for the sub-requests left running by timed-out batches, before the database is flushed."""
+    # Each of the pool's threads takes one barrier party once its earlier work is done.
+    barrier = threading.Barrier(threads)
+    for future in [get_executor().submit(barrier.wait, 5) for _ in range(threads)]:
+        future.result()
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with a dish."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+    return menu
+
+
+@pytest.mark.django_db
+class TestBatch:
+    """Test answering many GET requests in one round trip."""
+
+    def test_responses_in_order(self, menu):
+        """Test that every sub-request gets the response it would get on its own."""
+        client = APIClient()
+        paths = (
+            reverse("menu:menu-list"),
+            reverse("menu:menu-detail", args=[menu.pk]),
+            f"{reverse('menu:dish-list')}?menu={menu.pk}&ordering=-price",
+            reverse("menu:menu-detail", args=[999]),
+        )
+
+        res = batch(client, *paths)
+
+        assert res.status_code == 200
+        responses = res.json()["responses"]
+        assert [response["path"] for response in responses] == list(paths)
+        for path, response in zip(paths, responses, strict=True):
+            alone = client.get(path)
+            assert response["status"] == alone.status_code
+            assert response["body"] == alone.json()
+
+    def test_authenticated_once(self, menu, monkeypatch):
+        """Test that the batch authenticates once and its user reaches every sub-request."""
+        user = get_user_model().objects.create_user("user@example.com", "testpass123", name="Test User")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        calls = []
+        original = ClaimsJWTAuthentication.authenticate
+
+        def authenticate(self, request):
+            calls.append(request.path)
+            return original(self, request)
+
+        monkeypatch.setattr(ClaimsJWTAuthentication, "authenticate", authenticate)
+
+        res = batch(client, reverse("user:me"), reverse("menu:menu-list"), reverse("user:me"))
+
+        assert [response["status"] for response in res.json()["responses"]] == [200, 200, 200]
+        assert res.json()["responses"][0]["body"]["email"] == "user@example.com"
+        assert calls == [BATCH_URL]
+
+    def test_anonymous_permissions(self):
+        """Test that sub-requests keep the permissions of their views."""
+        res = batch(APIClient(), reverse("user:me"))
+
+        assert res.json()["responses"][0]["status"] == 401
+
+    @pytest.mark.parametrize("path", ["/api/batch/", "/admin/", "/metrics/", "/api/unknown/"])
+    def test_outside_namespaces(self, path):
+        """Test that only the menu and user APIs can be reached."""
+        res = batch(APIClient(), path)
+
+        assert res.json()["responses"][0]["status"] == 404
+
+    @pytest.mark.parametrize(
+        "payload",
+        [{}, {"requests": []}, {"requests": [{"path": "api/menu/menus/"}]}, {"requests": [{"url": "/"}]}],
+    )
+    def test_invalid(self, payload):
+        """Test that malformed batches are rejected."""
+        res = APIClient().post(BATCH_URL, payload, format="json")
+
+        assert res.status_code == 400
+
+    def test_size_limit(self, settings):
+        """Test that batches larger than BATCH_MAX_REQUESTS are rejected."""
+        settings.BATCH_MAX_REQUESTS = 2
+
+        res = batch(APIClient(), *[reverse("menu:menu-list")] * 3)
+
+        assert res.status_code == 400
+
+    def test_time_limit(self, settings, menu, monkeypatch):
+        """Test that sub-requests not started within BATCH_TIMEOUT_SECONDS get a 504."""
+        settings.BATCH_TIMEOUT_SECONDS = 0.05
+        original = MenuViewSet.list
+
+        def slow_list(self, request, *args, **kwargs):
+            sleep(0.1)
+            return original(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(MenuViewSet, "list", slow_list)
+
+        res = batch(APIClient(), reverse("menu:menu-list"), reverse("menu:dish-list"))
+
+        assert [response["status"] for response in res.json()["responses"]] == [200, 504]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentBatch:
+    """Test answering the sub-requests of a batch on several threads."""
+
+    def test_concurrent(self, settings, menu, monkeypatch):
+        """Test that sub-requests overlap and still answer in order."""
+        settings.BATCH_CONCURRENCY = 4
+        original = MenuViewSet.retrieve
+
+        def slow_retrieve(self, request, *args, **kwargs):
+            sleep(0.2)
+            return original(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(MenuViewSet, "retrieve", slow_retrieve)
+        paths = [reverse("menu:menu-detail", args=[menu.pk])] * 4 + [reverse("menu:dish-list")]
+
+        res = batch(APIClient(), *paths)
+
+        responses = res.json()["responses"]
+        assert [response["status"] for response in responses] == [200] * 5
+        assert responses[0]["body"]["name"] == "Lunch"
+        assert responses[4]["body"][0]["name"] == "Soup"
+
+    def test_concurrent_time_limit(self, settings, menu, monkeypatch):
+        """Test that sub-requests still running at BATCH_TIMEOUT_SECONDS get a 504."""
+        settings.BATCH_CONCURRENCY = 2
+        settings.BATCH_TIMEOUT_SECONDS = 0.1
+        original = MenuViewSet.retrieve
+
+        def slow_retrieve(self, request, *args, **kwargs):
+            sleep(0.3)
+            return original(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(MenuViewSet, "retrieve", slow_retrieve)
+
+        res = batch(APIClient(), reverse("menu:menu-list"), reverse("menu:menu-detail", args=[menu.pk]))
+
+        assert [response["status"] for response in res.json()["responses"]] == [200, 504]
+        finish_abandoned(settings.BATCH_CONCURRENCY)
+
+    def test_timings_per_sub_request(self, settings, menu, monkeypatch):
+        """Test that each thread times its sub-request apart and the batch counts all of their queries."""
+        original = MenuViewSet.retrieve
+        seen = []
+
+        def retrieve(self, request, *args, **kwargs):
+            seen.append(current_timings())
+            return original(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(MenuViewSet, "retrieve", retrieve)
+        menus = [menu, *(Menu.objects.create(name=f"Menu {index}") for index in range(3))]
+        # Different paths, so that the concurrent reads are not coalesced into one.
+        paths = [reverse("menu:menu-detail", args=[other.pk]) for other in menus]
+        queries = []
+        for concurrency in (1, 4):
+            settings.BATCH_CONCURRENCY = concurrency
+            registry.reset()
+            cache.clear()
+            batch(APIClient(), *paths)
+            (series,) = [histograms for view, _, histograms in registry.snapshot()["series"] if view == "api-batch"]
+            queries.append(series["http_request_db_queries"][-1])
+
+        assert queries[0] == queries[1] > 4
+        assert len({id(timings) for timings in seen[4:]}) == 4
+
+    def test_threads_shared(self, settings, menu, monkeypatch):
+        """Test that batches share one pool, so abandoned sub-requests do not add threads."""
+        settings.BATCH_CONCURRENCY = 2
+        settings.BATCH_TIMEOUT_SECONDS = 0.05
+        original = MenuViewSet.retrieve
+
+        def slow_retrieve(self, request, *args, **kwargs):
+            sleep(0.2)
+            return original(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(MenuViewSet, "retrieve", slow_retrieve)
+        paths = [reverse("menu:menu-detail", args=[menu.pk])] * 3
+
+        responses = [batch(APIClient(), *paths).json()["responses"] for _ in range(3)]
+
+        assert all(response["status"] == 504 for batch_responses in responses for response in batch_responses)
+        assert len([thread for thread in threading.enumerate() if thread.name.startswith("batch")]) == 2
+        finish_abandoned(settings.BATCH_CONCURRENCY)
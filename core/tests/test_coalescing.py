@@ -0,0 +1,205 @@
+"""
+Tests for the coalescing of identical concurrent reads.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.coalescing import LOCK_CACHE_KEY, RESULT_CACHE_KEY, SingleFlight, shared_do
+from menu.models import Dish, Menu
+from menu.views import MenuViewSet
+
+BURST = 8
+
+
+def burst(func, count: int = BURST) -> list:
+    """Call ``func`` from ``count`` threads released at the same time."""
+    barrier = threading.Barrier(count)
+
+    def call():
+        barrier.wait()
+        try:
+            return func()
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(count) as executor:
+        futures = [executor.submit(call) for _ in range(count)]
+        return [future.result() for future in futures]
+
+
+class TestSingleFlight:
+    """Test coalescing calls within a process."""
+
+    def test_concurrent_calls_run_once(self):
+        """Test that a burst of identical calls runs the function once and shares its result."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            sleep(0.2)
+            return object()
+
+        flight = SingleFlight()
+        results = burst(lambda: flight.do("key", compute, wait=5))
+
+        assert len(calls) == 1
+        assert len({id(result) for result in results}) == 1
+
+    def test_different_keys_not_coalesced(self):
+        """Test that calls with different keys run independently."""
+        flight = SingleFlight()
+
+        results = burst(lambda: flight.do(threading.current_thread().name, threading.get_ident, wait=5), count=3)
+
+        assert len(set(results)) == 3
+
+    def test_wait_bounded(self):
+        """Test that followers run the function themselves when the leader takes too long."""
+        release = threading.Event()
+        started = threading.Event()
+        flight = SingleFlight()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "leader"
+
+        leader = threading.Thread(target=flight.do, args=("key", slow, 5))
+        leader.start()
+        started.wait(5)
+        try:
+            assert flight.do("key", lambda: "follower", wait=0.05) == "follower"
+        finally:
+            release.set()
+            leader.join()
+
+    def test_leader_failure(self):
+        """Test that followers recover when the leader raises."""
+        started = threading.Event()
+        flight = SingleFlight()
+        errors = []
+
+        def failing():
+            started.set()
+            sleep(0.1)
+            raise RuntimeError("boom")
+
+        def lead():
+            try:
+                flight.do("key", failing, 5)
+            except RuntimeError as error:
+                errors.append(error)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait(5)
+        result = flight.do("key", lambda: "recovered", wait=5)
+        leader.join()
+
+        assert result == "recovered"
+        assert len(errors) == 1
+
+
+class TestSharedFlight:
+    """Test coalescing calls across processes through the cache."""
+
+    def test_leader_publishes_result(self):
+        """Test that the leader stores its result under its token and releases the lock."""
+        assert shared_do("key", lambda: {"menus": 1}, wait=1) == {"menus": 1}
+        assert cache.get(LOCK_CACHE_KEY.format(key="key")) is None
+
+    def test_follower_reuses_result_of_other_worker(self):
+        """Test that a follower reuses the result of a leader in another process."""
+        cache.set(LOCK_CACHE_KEY.format(key="key"), "token")
+        cache.set(RESULT_CACHE_KEY.format(token="token"), ({"menus": 2},))
+
+        assert shared_do("key", lambda: pytest.fail("computed again"), wait=1) == {"menus": 2}
+
+    def test_follower_falls_back(self, settings):
+        """Test that a follower computes the result itself when the leader does not publish in time."""
+        settings.COALESCE_POLL_INTERVAL = 0.01
+        cache.set(LOCK_CACHE_KEY.format(key="key"), "token")
+
+        assert shared_do("key", lambda: "own", wait=0.05) == "own"
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCoalescedViews:
+    """Test coalescing a burst of identical API requests."""
+
+    @pytest.fixture
+    def list_calls(self, monkeypatch) -> list[int]:
+        """Count the menu list queries and make them slow enough to overlap."""
+        calls = []
+        original = MenuViewSet.filter_queryset
+
+        def filter_queryset(self, queryset):
+            calls.append(1)
+            sleep(0.2)
+            return original(self, queryset)
+
+        monkeypatch.setattr(MenuViewSet, "filter_queryset", filter_queryset)
+        return calls
+
+    @pytest.fixture
+    def menus(self) -> None:
+        """Fixture creating two menus with dishes."""
+        for name in ("Lunch", "Dinner"):
+            Dish.objects.create(menu=Menu.objects.create(name=name), name="Soup", price=5, prep_time=10)
+
+    def test_burst_runs_query_once(self, menus, list_calls):
+        """Test that concurrent identical anonymous requests run the list query once."""
+        responses = burst(lambda: APIClient().get(reverse("menu:menu-list")))
+
+        assert len(list_calls) == 1
+        assert {response.status_code for response in responses} == {200}
+        assert len({response.content for response in responses}) == 1
+        assert {menu["name"] for menu in responses[0].json()} == {"Lunch", "Dinner"}
+
+    def test_different_queries_not_coalesced(self, menus, list_calls):
+        """Test that requests with different query strings are answered separately."""
+        responses = burst(
+            lambda: APIClient().get(reverse("menu:menu-list"), {"search": threading.current_thread().name}), count=3
+        )
+
+        assert len(list_calls) == 3
+        assert {response.status_code for response in responses} == {200}
+
+    def test_different_hosts_not_coalesced(self, settings, menus, list_calls):
+        """Test that requests for the same path on different hosts are answered separately."""
+        settings.ALLOWED_HOSTS = [".example.com"]
+
+        def get():
+            thread = threading.current_thread().name[-1]
+            return APIClient().get(reverse("menu:menu-list"), HTTP_HOST=f"{thread}.example.com")
+
+        responses = burst(get, count=3)
+
+        assert len(list_calls) == 3
+        assert {response.status_code for response in responses} == {200}
+
+    def test_different_schemes_not_coalesced(self, menus, list_calls):
+        """Test that HTTP and HTTPS requests for the same URL are answered separately."""
+        responses = burst(
+            lambda: APIClient().get(reverse("menu:menu-list"), secure=threading.current_thread().name.endswith("0")),
+            count=2,
+        )
+
+        assert len(list_calls) == 2
+        assert {response.status_code for response in responses} == {200}
+
+    def test_disabled(self, settings, menus, list_calls):
+        """Test that every request runs the query with coalescing turned off."""
+        settings.COALESCE_ENABLED = False
+
+        burst(lambda: APIClient().get(reverse("menu:menu-list")), count=3)
+
+        assert len(list_calls) == 3
@@ -0,0 +1,198 @@
+"""
+Tests for the compression of API responses.
+"""
+
+import gzip
+import json
+
+import brotli
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import compression
+from core.compression import encode_etag, negotiate, split_etag
+from core.middleware import CompressionMiddleware
+from menu.models import Dish, Menu
+
+BODY = json.dumps([{"name": f"Dish {index}", "description": "Fresh and seasonal"} for index in range(100)]).encode()
+
+
+@pytest.fixture
+def compress_calls(monkeypatch) -> list[str]:
+    """Record every compression of a whole body."""
+    calls = []
+    original = compression.compress
+
+    def compress(body, encoding):
+        calls.append(encoding)
+        return original(body, encoding)
+
+    monkeypatch.setattr(compression, "compress", compress)
+    return calls
+
+
+def middleware(response_factory) -> CompressionMiddleware:
+    """Return the middleware around a view returning ``response_factory(request)``."""
+    return CompressionMiddleware(response_factory)
+
+
+def json_response(request, etag: str | None = '"v1"') -> HttpResponse:
+    """Return a large JSON response, with a strong ETag by default."""
+    response = HttpResponse(BODY, content_type="application/json")
+    if etag:
+        response["ETag"] = etag
+    return response
+
+
+def get(path: str = "/api/menu/menus/", **headers):
+    """Build a GET request."""
+    return RequestFactory().get(path, **headers)
+
+
+class TestNegotiation:
+    """Test choosing an encoding and naming its ETag."""
+
+    def test_negotiate(self):
+        """Test that quality values, wildcards and preference order are respected."""
+        assert negotiate("gzip, deflate", ("br", "gzip")) == "gzip"
+        assert negotiate("br;q=0.5, gzip;q=0.8", ("br", "gzip")) == "gzip"
+        assert negotiate("br, gzip", ("br", "gzip")) == "br"
+        assert negotiate("*", ("br", "gzip")) == "br"
+        assert negotiate("*, br;q=0", ("br", "gzip")) == "gzip"
+        assert negotiate("gzip;q=0, identity", ("br", "gzip")) is None
+        assert negotiate("", ("br", "gzip")) is None
+
+    def test_etags(self):
+        """Test that encoded ETags round-trip and weak ETags are left alone."""
+        assert encode_etag('"abc"', "gzip") == '"abc-gzip"'
+        assert split_etag('"abc-gzip"') == ('"abc"', "gzip")
+        assert split_etag('"abc-br"') == ('"abc"', "br")
+        assert split_etag('"abc"') == ('"abc"', None)
+        assert encode_etag('W/"abc"', "gzip") == 'W/"abc"'
+        assert encode_etag('"abc"', None) == '"abc"'
+
+
+@pytest.mark.django_db
+class TestCompressionMiddleware:
+    """Test compressing responses."""
+
+    def test_gzip(self):
+        """Test that a large JSON response is gzipped for clients accepting it."""
+        response = middleware(json_response)(get(HTTP_ACCEPT_ENCODING="gzip"))
+
+        assert response["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.content) == BODY
+        assert response["Content-Length"] == str(len(response.content))
+        assert response["ETag"] == '"v1-gzip"'
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_identity(self):
+        """Test that clients not accepting an encoding get the plain body, with Vary set."""
+        response = middleware(json_response)(get())
+
+        assert response.content == BODY
+        assert not response.has_header("Content-Encoding")
+        assert response["ETag"] == '"v1"'
+        assert "Accept-Encoding" in response["Vary"]
+
+    def test_compressed_once_per_body(self, compress_calls):
+        """Test that a body is compressed once per encoding and then served from the cache."""
+        responses = [middleware(json_response)(get(HTTP_ACCEPT_ENCODING="gzip")) for _ in range(3)]
+
+        assert compress_calls == ["gzip"]
+        assert len({response.content for response in responses}) == 1
+
+    def test_without_etag_cached(self, compress_calls):
+        """Test that live views without an ETag share the cached body too, but different bodies do not."""
+        view = middleware(lambda request: json_response(request, etag=None))
+        for _ in range(2):
+            view(get(HTTP_ACCEPT_ENCODING="gzip"))
+        other = middleware(lambda request: HttpResponse(BODY + b" ", content_type="application/json"))
+        response = other(get(HTTP_ACCEPT_ENCODING="gzip"))
+
+        assert compress_calls == ["gzip", "gzip"]
+        assert gzip.decompress(response.content) == BODY + b" "
+
+    def test_brotli(self):
+        """Test that clients accepting br get Brotli."""
+        response = middleware(json_response)(get(HTTP_ACCEPT_ENCODING="gzip, br"))
+
+        assert response["Content-Encoding"] == "br"
+        assert brotli.decompress(response.content) == BODY
+        assert response["ETag"] == '"v1-br"'
+
+    @pytest.mark.parametrize(
+        "response",
+        [
+            HttpResponse(b"{}", content_type="application/json"),
+            HttpResponse(BODY, content_type="image/png"),
+            HttpResponse(gzip.compress(BODY), content_type="application/json", headers={"Content-Encoding": "gzip"}),
+            HttpResponse(BODY, content_type="application/json", headers={"Cache-Control": "no-transform"}),
+        ],
+        ids=["small", "binary", "encoded", "no-transform"],
+    )
+    def test_skipped(self, response):
+        """Test that small, binary, already encoded and no-transform responses are passed through."""
+        body = response.content
+
+        result = middleware(lambda request: response)(get(HTTP_ACCEPT_ENCODING="gzip"))
+
+        assert result.content == body
+        assert result.get("Content-Encoding") in (None, "gzip")
+        assert result.get("ETag") is None
+
+    def test_other_paths_skipped(self):
+        """Test that responses outside COMPRESSION_PATH_PREFIXES are not compressed."""
+        response = middleware(json_response)(get("/admin/", HTTP_ACCEPT_ENCODING="gzip"))
+
+        assert not response.has_header("Content-Encoding")
+
+    def test_streaming(self):
+        """Test that streamed responses are compressed chunk by chunk."""
+        chunks = [BODY[:1000], BODY[1000:]]
+        view = middleware(lambda request: StreamingHttpResponse(iter(chunks), content_type="application/json"))
+
+        response = view(get(HTTP_ACCEPT_ENCODING="gzip"))
+        parts = list(response.streaming_content)
+
+        assert response["Content-Encoding"] == "gzip"
+        assert len(parts) == 3
+        assert gzip.decompress(b"".join(parts)) == BODY
+
+    def test_revalidation(self):
+        """Test that the ETag of a compressed variant revalidates against the view's ETag."""
+        seen = []
+
+        def view(request):
+            seen.append(request.headers["If-None-Match"])
+            response = HttpResponseNotModified()
+            response["ETag"] = '"v1"'
+            return response
+
+        response = middleware(view)(get(HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH='"v1-gzip"'))
+
+        assert seen == ['"v1"']
+        assert response.status_code == 304
+        assert response["ETag"] == '"v1-gzip"'
+
+    def test_disabled(self, settings):
+        """Test that the middleware can be turned off."""
+        settings.COMPRESSION_ENABLED = False
+
+        with pytest.raises(MiddlewareNotUsed):
+            middleware(json_response)
+
+    def test_api(self):
+        """Test that API responses are compressed through the whole stack."""
+        menu = Menu.objects.create(name="Lunch")
+        for index in range(20):
+            Dish.objects.create(menu=menu, name=f"Dish {index}", price=10, prep_time=5)
+
+        res = APIClient().get(reverse("menu:dish-list"), HTTP_ACCEPT_ENCODING="gzip")
+
+        assert res["Content-Encoding"] == "gzip"
+        assert len(json.loads(gzip.decompress(res.content))) == 20
@@ -0,0 +1,157 @@
+"""
+Tests for routing reads between the primary and a read replica.
+
+The replica is simulated with a separate SQLite file holding different data,
+so every response shows which database served it.
+"""
+
+import copy
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db_router import PRIMARY_PIN_COOKIE, PrimaryReplicaRouter, release_replica, use_replica
+from menu.models import Dish, Menu
+
+REPLICA_ALIAS = "replica_test"
+
+MENU_URL = reverse("menu:menu-list")
+
+
+@pytest.fixture(scope="module")
+def replica_database(django_db_setup, tmp_path_factory, django_db_blocker):
+    """Register a second SQLite file as a database alias with the menu tables."""
+    config = copy.deepcopy(connections.settings["default"])
+    config["NAME"] = str(tmp_path_factory.mktemp("replica") / "replica.sqlite3")
+    connections.settings[REPLICA_ALIAS] = config
+
+    with django_db_blocker.unblock(), connections[REPLICA_ALIAS].schema_editor() as editor:
+        editor.create_model(Menu)
+        editor.create_model(Dish)
+
+    yield REPLICA_ALIAS
+
+    connections[REPLICA_ALIAS].close()
+    del connections[REPLICA_ALIAS]
+    del connections.settings[REPLICA_ALIAS]
+
+
+@pytest.fixture
+def replica(replica_database, settings):
+    """Use the replica database with its own menu for reads."""
+    settings.DATABASE_REPLICAS = [replica_database]
+    menu = Menu.objects.using(replica_database).create(name="Replica menu")
+    Dish.objects.using(replica_database).create(menu=menu, name="Replica dish", price=10, prep_time=5)
+    return replica_database
+
+
+@pytest.fixture
+def primary_menu() -> Menu:
+    """Fixture creating a menu that only exists on the primary."""
+    menu = Menu.objects.create(name="Primary menu")
+    Dish.objects.create(menu=menu, name="Primary dish", price=10, prep_time=5)
+    return menu
+
+
+@pytest.fixture
+def user():
+    """Fixture for creating a test user."""
+    return get_user_model().objects.create_user("test@example.com", "testpass123", name="Test User")
+
+
+def menu_names(res) -> list[str]:
+    """Return menu names from a list response."""
+    return [menu["name"] for menu in res.data]
+
+
+class TestPrimaryReplicaRouter:
+    """Test the router decisions."""
+
+    def test_reads_use_primary_by_default(self, settings):
+        """Test that reads go to the primary outside a replica context."""
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        router = PrimaryReplicaRouter()
+
+        assert router.db_for_read(Menu) is None
+        assert router.db_for_write(Menu) == "default"
+
+    def test_reads_use_replica_in_context(self, settings):
+        """Test that reads go to a configured replica inside a replica context."""
+        settings.DATABASE_REPLICAS = ["replica_1", "replica_2"]
+        router = PrimaryReplicaRouter()
+
+        token = use_replica()
+        try:
+            assert router.db_for_read(Menu) in settings.DATABASE_REPLICAS
+            assert router.db_for_write(Menu) == "default"
+        finally:
+            release_replica(token)
+
+        assert router.db_for_read(Menu) is None
+
+    def test_no_replicas_configured(self, settings):
+        """Test that without replicas the context keeps using the primary."""
+        settings.DATABASE_REPLICAS = []
+
+        assert use_replica() is None
+        assert PrimaryReplicaRouter().db_for_read(Menu) is None
+
+    def test_migrations_skip_replicas(self, settings):
+        """Test that migrations only run on the primary."""
+        settings.DATABASE_REPLICAS = ["replica_1"]
+        router = PrimaryReplicaRouter()
+
+        assert router.allow_migrate("default", "menu") is True
+        assert router.allow_migrate("replica_1", "menu") is False
+
+
+@pytest.mark.django_db(databases=["default", REPLICA_ALIAS])
+class TestReplicaReads:
+    """Test the menu API against a primary and a replica database."""
+
+    def test_safe_requests_read_from_replica(self, replica, primary_menu):
+        """Test that public reads are served by the replica."""
+        res = APIClient().get(MENU_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert menu_names(res) == ["Replica menu"]
+
+    def test_writes_go_to_primary_and_pin_client(self, replica, user):
+        """Test that a client reads its own write from the primary after writing."""
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(MENU_URL, {"name": "Fresh menu"})
+        assert res.status_code == status.HTTP_201_CREATED
+        assert Menu.objects.filter(name="Fresh menu").exists()
+        assert PRIMARY_PIN_COOKIE in res.cookies
+
+        res = client.get(MENU_URL)
+        assert "Fresh menu" in menu_names(res)
+
+    def test_pin_follows_token_user_without_cookie(self, replica, user):
+        """Test that a user pinned by a write stays on the primary on another connection."""
+        writer = APIClient()
+        writer.force_authenticate(user)
+        writer.post(MENU_URL, {"name": "Fresh menu"})
+
+        reader = APIClient()
+        reader.force_authenticate(user)
+        res = reader.get(MENU_URL)
+
+        assert "Fresh menu" in menu_names(res)
+
+    def test_pin_expires(self, replica, user, settings):
+        """Test that clients return to the replica once the pin window passed."""
+        settings.DATABASE_PRIMARY_PIN_SECONDS = 0
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post(MENU_URL, {"name": "Fresh menu"})
+
+        res = client.get(MENU_URL)
+
+        assert menu_names(res) == ["Replica menu"]
@@ -0,0 +1,141 @@
+"""
+Tests for saving only the changed fields of models.
+"""
+
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from menu.models import Dish, Menu
+
+
+@pytest.fixture
+def dish() -> Dish:
+    """Fixture for a dish loaded from the database."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=Decimal("4.50"), prep_time=10)
+    return Dish.objects.get()
+
+
+def updates(queries: CaptureQueriesContext) -> list[str]:
+    """Return the UPDATE statements among ``queries``."""
+    return [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+
+
+@pytest.mark.django_db
+class TestDirtyFields:
+    """Test tracking the changed fields of a model instance."""
+
+    def test_unchanged_save_skipped(self, dish):
+        """Test that saving an unchanged instance neither writes nor sends signals."""
+        updated_at = dish.updated_at
+        saved = []
+        post_save.connect(saved.append, sender=Dish)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                dish.price = Decimal("4.5")
+                dish.save()
+        finally:
+            post_save.disconnect(saved.append, sender=Dish)
+
+        assert len(queries) == 0
+        assert saved == []
+        assert Dish.objects.get().updated_at == updated_at
+
+    def test_changed_columns_only(self, dish):
+        """Test that only the changed columns and updated_at are written."""
+        dish.name = "Broth"
+        assert dish.dirty_fields() == {"name"}
+
+        with CaptureQueriesContext(connection) as queries:
+            dish.save()
+
+        [sql] = updates(queries)
+        assert '"name"' in sql
+        assert '"updated_at"' in sql
+        assert '"price"' not in sql
+        assert dish.dirty_fields() == set()
+
+    def test_foreign_key(self, dish):
+        """Test that moving a dish to another menu writes the menu column."""
+        dish.menu = Menu.objects.create(name="Dinner")
+
+        assert dish.dirty_fields() == {"menu"}
+
+    def test_new_file(self, dish):
+        """Test that assigning a file not stored yet marks the field as changed."""
+        dish.image = SimpleUploadedFile("soup.jpg", b"jpeg", content_type="image/jpeg")
+        dish.save()
+
+        assert Dish.objects.get().image.name == dish.image.name
+        assert dish.dirty_fields() == set()
+
+    def test_tracked_after_create(self):
+        """Test that instances are tracked after being inserted."""
+        menu = Menu.objects.create(name="Lunch")
+
+        with CaptureQueriesContext(connection) as queries:
+            menu.save()
+
+        assert len(queries) == 0
+
+    def test_copy_inserted(self, dish):
+        """Test that saving a dish with its primary key reset inserts a copy."""
+        dish.pk = None
+        dish.save()
+
+        assert Dish.objects.count() == 2
+
+    def test_deferred_fields(self, dish):
+        """Test that deferred fields count as unchanged until loaded."""
+        dish = Dish.objects.only("name").get()
+        dish.name = "Broth"
+
+        assert dish.dirty_fields() == {"name"}
+        dish.save()
+        assert dish.description == ""
+        assert dish.dirty_fields() == set()
+
+    def test_refresh_from_db(self, dish):
+        """Test that refreshed values count as saved."""
+        Dish.objects.update(name="Broth")
+        dish.refresh_from_db()
+
+        assert dish.dirty_fields() == set()
+
+
+@pytest.mark.django_db
+class TestDirtyFieldsApi:
+    """Test partial updates through the API."""
+
+    @pytest.fixture
+    def client(self) -> APIClient:
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("user@example.com", "testpass123"))
+        return client
+
+    def test_noop_patch(self, client, dish):
+        """Test that a PATCH changing nothing does not write nor bump updated_at."""
+        with CaptureQueriesContext(connection) as queries:
+            res = client.patch(reverse("menu:dish-detail", args=[dish.pk]), {"name": "Soup", "price": "4.50"})
+
+        assert res.status_code == 200
+        assert res.json()["updated_at"] == client.get(reverse("menu:dish-detail", args=[dish.pk])).json()["updated_at"]
+        assert updates(queries) == []
+
+    def test_menu_patch(self, client, dish):
+        """Test that a PATCH writes only the fields it changes."""
+        with CaptureQueriesContext(connection) as queries:
+            res = client.patch(reverse("menu:menu-detail", args=[dish.menu_id]), {"description": "Daily"})
+
+        assert res.status_code == 200
+        [sql] = updates(queries)
+        assert '"name"' not in sql
+        assert '"description"' in sql
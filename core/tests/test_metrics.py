@@ -0,0 +1,231 @@
+"""
+Tests for request timings, metrics and the metrics endpoint.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.module_loading import autodiscover_modules
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from app import settings as project_settings
+from core import benchmarks
+from core.metrics import RETIRED_FILE, MetricsRegistry, exposition, registry
+from core.timing import RequestTimings, TimedPhase, current_timings, start_timings, stop_timings
+from menu.models import Dish, Menu
+
+MENU_URL = reverse("menu:menu-list")
+
+autodiscover_modules("benchmarks")
+# Scenarios opening their own connections to temporary files, which database tests forbid.
+DATABASE_FREE_SCENARIOS = {"sqlite"}
+METRICS_URL = reverse("metrics")
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    """Start every test with empty metrics."""
+    registry.reset()
+    yield
+    registry.reset()
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with a dish."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+    return menu
+
+
+class TestTimings:
+    """Test the timing helpers."""
+
+    def test_timed_phase_adds_to_current_request(self):
+        """Test that a timed block is added to the phase of the current request."""
+        timings, token = start_timings()
+        try:
+            assert current_timings() is timings
+            with TimedPhase("render"):
+                pass
+        finally:
+            stop_timings(timings, token)
+
+        assert timings.render > 0
+        assert current_timings() is None
+
+    def test_timed_phase_outside_request(self):
+        """Test that timed blocks outside a request are ignored."""
+        with TimedPhase("render"):
+            pass
+
+        assert current_timings() is None
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    """Test the metrics recorded by RequestTimingMiddleware."""
+
+    def test_request_recorded_by_view_name(self, menu):
+        """Test that a request is recorded under its view name with its queries."""
+        res = APIClient().get(MENU_URL)
+        assert res.status_code == status.HTTP_200_OK
+
+        snapshot = registry.snapshot()
+        (view, method, histograms) = snapshot["series"][0]
+        assert (view, method) == ("menu:menu-list", "GET")
+        # The last value of each histogram is its sum.
+        assert histograms["http_request_db_queries"][-1] >= 1
+        assert histograms["http_request_duration_seconds"][-1] > 0
+        assert histograms["http_response_size_bytes"][-1] == len(res.content)
+        assert snapshot["statuses"] == [["menu:menu-list", "GET", "200", 1]]
+
+    def test_disabled(self, menu, settings):
+        """Test that nothing is recorded when metrics are disabled."""
+        settings.METRICS_ENABLED = False
+
+        APIClient().get(MENU_URL)
+
+        assert registry.snapshot()["series"] == []
+
+    def test_endpoint_exposition(self, menu):
+        """Test that the endpoint renders the recorded requests for Prometheus."""
+        APIClient().get(MENU_URL)
+
+        res = APIClient().get(METRICS_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = res.content.decode()
+        assert 'http_request_duration_seconds_count{view="menu:menu-list",method="GET"} 1' in body
+        assert 'http_requests_total{view="menu:menu-list",method="GET",status="200"} 1' in body
+        assert "password_hash_" in body
+
+    def test_endpoint_token(self, settings):
+        """Test that a configured token is required by the endpoint."""
+        settings.METRICS_TOKEN = "secret"
+
+        assert APIClient().get(METRICS_URL).status_code == status.HTTP_403_FORBIDDEN
+        res = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION="Bearer secret")
+        assert res.status_code == status.HTTP_200_OK
+
+    @pytest.mark.parametrize(
+        "headers",
+        [{"REMOTE_ADDR": "10.0.0.7"}, {"REMOTE_ADDR": "203.0.113.5"}, {"HTTP_X_FORWARDED_FOR": "203.0.113.5"}],
+    )
+    def test_endpoint_local_without_token(self, headers):
+        """Test that without a token only direct requests from the loopback address are answered."""
+        assert APIClient().get(METRICS_URL).status_code == status.HTTP_200_OK
+        assert APIClient().get(METRICS_URL, **headers).status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestMultiprocess:
+    """Test merging the metrics of several workers."""
+
+    def test_collect_merges_worker_files(self, tmp_path):
+        """Test that snapshots written by other workers are summed."""
+        worker = MetricsRegistry(str(tmp_path))
+        timings = RequestTimings()
+        worker.observe_request("menu:menu-list", "GET", 200, 100, timings)
+        (tmp_path / "metrics-1.json").write_text(json.dumps(worker.snapshot()))
+
+        local = MetricsRegistry(str(tmp_path))
+        local.observe_request("menu:menu-list", "GET", 200, 100, timings)
+        body = exposition(local.collect())
+
+        assert 'http_requests_total{view="menu:menu-list",method="GET",status="200"} 2' in body
+        assert 'http_response_size_bytes_bucket{view="menu:menu-list",method="GET",le="256"} 2' in body
+
+    def test_gauges_combined_by_mode(self, tmp_path):
+        """Test that collector counters are summed and gauges combined as registered."""
+        stats = iter([{"done": 3, "busy": 2, "limit": 4, "mine": 1}, {"done": 5, "busy": 1, "limit": 4, "mine": 7}])
+        gauges = {"busy": "sum", "limit": "max", "mine": "all"}
+        snapshots = []
+        for pid in (11, 12):
+            worker = MetricsRegistry(str(tmp_path))
+            worker.register_collector("pool", lambda: next(stats), gauges=gauges)
+            snapshots.append({**worker.snapshot(), "pid": pid})
+
+        body = exposition(snapshots)
+
+        assert "# TYPE pool_done untyped\npool_done 8\n" in body
+        assert "# TYPE pool_busy gauge\npool_busy 3\n" in body
+        assert "# TYPE pool_limit gauge\npool_limit 4\n" in body
+        assert 'pool_mine{pid="11"} 1\npool_mine{pid="12"} 7\n' in body
+
+    def test_unknown_gauge_mode(self):
+        """Test that registering a gauge with an unknown mode fails."""
+        with pytest.raises(ValueError, match="pool_busy"):
+            MetricsRegistry().register_collector("pool", dict, gauges={"busy": "latest"})
+
+    def test_exited_workers_retired(self, tmp_path):
+        """Test that the files of exited workers are folded into one retired total."""
+        timings = RequestTimings()
+        for _ in range(2):
+            worker = MetricsRegistry(str(tmp_path))
+            worker.observe_request("menu:menu-list", "GET", 200, 100, timings)
+            exited = subprocess.Popen([sys.executable, "-c", ""])
+            exited.wait()
+            (tmp_path / f"metrics-{exited.pid}.json").write_text(json.dumps(worker.snapshot()))
+
+        local = MetricsRegistry(str(tmp_path))
+        local.observe_request("menu:menu-list", "GET", 200, 100, timings)
+        body = exposition(local.collect())
+
+        assert 'http_requests_total{view="menu:menu-list",method="GET",status="200"} 3' in body
+        assert sorted(path.name for path in tmp_path.glob("*.json")) == sorted(
+            [RETIRED_FILE, f"metrics-{os.getpid()}.json"]
+        )
+
+    def test_close_retires_own_file(self, tmp_path):
+        """Test that a worker exiting adds its metrics to the retired total."""
+        worker = MetricsRegistry(str(tmp_path))
+        worker.observe_request("menu:menu-list", "GET", 200, 100, RequestTimings())
+
+        worker.close()
+
+        assert [path.name for path in tmp_path.glob("*.json")] == [RETIRED_FILE]
+        body = exposition(MetricsRegistry(str(tmp_path)).collect())
+        assert 'http_requests_total{view="menu:menu-list",method="GET",status="200"} 1' in body
+
+
+@pytest.mark.django_db
+class TestBenchmarkCommand:
+    """Test the benchmark management command."""
+
+    def test_instrumentation_scenario(self):
+        """Test that the instrumentation scenario reports its overhead."""
+        out = StringIO()
+
+        call_command("benchmark", "instrumentation", iterations=10, stdout=out)
+
+        assert "overhead:" in out.getvalue()
+
+    @pytest.mark.parametrize("name", sorted(set(benchmarks.registry) - DATABASE_FREE_SCENARIOS))
+    def test_scenario_runs(self, settings, name):
+        """Test that the scenario runs under the project's ALLOWED_HOSTS, without the test runner's 'testserver'."""
+        settings.ALLOWED_HOSTS = project_settings.ALLOWED_HOSTS
+        out = StringIO()
+
+        call_command("benchmark", name, iterations=1, stdout=out)
+
+        assert out.getvalue().count("\n") > 1
+
+
+@pytest.mark.parametrize("name", sorted(DATABASE_FREE_SCENARIOS))
+def test_database_free_scenario_runs(settings, django_db_blocker, name):
+    """Test that the scenario, run outside the test database, reports its results."""
+    settings.ALLOWED_HOSTS = project_settings.ALLOWED_HOSTS
+    lines = []
+
+    with django_db_blocker.unblock():
+        benchmarks.registry[name](lines.append, 1)
+
+    assert lines
@@ -0,0 +1,222 @@
+"""
+Tests for on-demand request profiling.
+"""
+
+import threading
+import time
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import RequestProfile
+from core.profiling import PROFILE_ID_HEADER, SamplingProfiler, profile_requested, profile_slots, prune_profiles
+from menu.models import Dish, Menu
+from user.serializers import ClaimsTokenObtainPairSerializer
+from user.token_versions import get_token_version
+
+User = get_user_model()
+
+MENU_URL = reverse("menu:menu-list")
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with a dish."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+    return menu
+
+
+@pytest.fixture
+def staff_user():
+    """Fixture creating a staff user."""
+    return User.objects.create_user("staff@example.com", "password123", name="Staff", is_staff=True)
+
+
+@pytest.fixture
+def regular_user():
+    """Fixture creating a regular user."""
+    return User.objects.create_user("user@example.com", "password123", name="Test User")
+
+
+def bearer_client(user) -> APIClient:
+    """Return a client sending a claims access token of the user."""
+    client = APIClient()
+    access = ClaimsTokenObtainPairSerializer.get_token(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+    return client
+
+
+def create_profile(size: int) -> RequestProfile:
+    """Create a profile with stacks of the given size."""
+    profile = RequestProfile(
+        method="GET",
+        path=MENU_URL,
+        status_code=200,
+        duration_ms=1.0,
+        sample_count=1,
+        query_count=0,
+        size=size,
+    )
+    profile.stacks.save("get.folded", ContentFile(b"x" * size))
+    return profile
+
+
+def busy_wait(seconds: float) -> None:
+    """Keep the thread busy so the profiler has something to sample."""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSamplingProfiler:
+    """Test the stack sampler."""
+
+    def test_collapsed_stacks(self):
+        """Test that samples of the profiled thread are returned as collapsed stacks."""
+        with SamplingProfiler(threading.get_ident(), 0.001) as profiler:
+            busy_wait(0.05)
+
+        lines = profiler.collapsed().splitlines()
+        assert lines
+        assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+        assert any(line.rsplit(" ", 1)[0].endswith(f"{__name__}:busy_wait") for line in lines)
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    """Test profiling requests on demand."""
+
+    def test_staff_token_request_profiled(self, menu, staff_user):
+        """Test that a staff user's flagged request is stored with its SQL log."""
+        res = bearer_client(staff_user).get(MENU_URL, HTTP_X_PROFILE="1")
+
+        assert res.status_code == status.HTTP_200_OK
+        profile = RequestProfile.objects.get(pk=res[PROFILE_ID_HEADER])
+        assert profile.user == staff_user
+        assert profile.view_name == "menu:menu-list"
+        assert profile.query_count >= 1
+        assert "menu_menu" in profile.sql_log
+        assert profile.size == len(profile.stacks.read()) + len(profile.sql_log.encode())
+
+    def test_staff_session_query_flag(self, menu, staff_user, client):
+        """Test that the query parameter works for staff logged in to the admin."""
+        client.force_login(staff_user)
+
+        res = client.get(MENU_URL, {"_profile": "1"})
+
+        assert PROFILE_ID_HEADER in res
+        assert RequestProfile.objects.count() == 1
+
+    def test_regular_user_not_profiled(self, menu, regular_user):
+        """Test that the flag is ignored for non-staff users."""
+        res = bearer_client(regular_user).get(MENU_URL, HTTP_X_PROFILE="1")
+
+        assert res.status_code == status.HTTP_200_OK
+        assert PROFILE_ID_HEADER not in res
+        assert not RequestProfile.objects.exists()
+
+    def test_invalid_token_not_profiled(self, menu):
+        """Test that a bad token with the flag is simply not profiled."""
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION="Bearer invalid")
+
+        res = client.get(MENU_URL, HTTP_X_PROFILE="1")
+
+        assert PROFILE_ID_HEADER not in res
+        assert not RequestProfile.objects.exists()
+
+    @pytest.mark.parametrize(
+        ("query", "headers", "expected"),
+        [
+            ("_profile=1", {}, True),
+            ("page=2&_profile=true", {}, True),
+            ("_profile=0", {}, False),
+            ("_profile=", {}, False),
+            ("x_profile=1", {}, False),
+            ("search=_profile=1", {}, False),
+            ("", {"HTTP_X_PROFILE": "yes"}, True),
+            ("", {"HTTP_X_PROFILE": "0"}, False),
+        ],
+    )
+    def test_flag_parsed_exactly(self, query, headers, expected):
+        """Test that only the exact parameter or header with a true value asks for a profile."""
+        assert profile_requested(RequestFactory().get(f"{MENU_URL}?{query}", **headers)) is expected
+
+    def test_profile_queries_not_timed(self, menu, staff_user):
+        """Test that storing the profile does not add to the database timings of the request."""
+        # Cached outside the request, as once the user's creation has committed.
+        get_token_version(staff_user.pk)
+        registry.reset()
+
+        res = bearer_client(staff_user).get(MENU_URL, HTTP_X_PROFILE="1")
+
+        profile = RequestProfile.objects.get(pk=res[PROFILE_ID_HEADER])
+        (series,) = [histograms for view, _, histograms in registry.snapshot()["series"] if view == "menu:menu-list"]
+        assert series["http_request_db_queries"][-1] == profile.query_count
+
+    def test_no_flag_no_profile(self, menu, staff_user):
+        """Test that requests without the flag are not profiled."""
+        res = bearer_client(staff_user).get(MENU_URL)
+
+        assert PROFILE_ID_HEADER not in res
+        assert not RequestProfile.objects.exists()
+
+    def test_busy_slots_skip_profiling(self, menu, staff_user):
+        """Test that requests over the concurrency limit are served unprofiled."""
+        acquired = 0
+        while profile_slots.acquire(blocking=False):
+            acquired += 1
+        try:
+            res = bearer_client(staff_user).get(MENU_URL, HTTP_X_PROFILE="1")
+        finally:
+            for _ in range(acquired):
+                profile_slots.release()
+
+        assert res.status_code == status.HTTP_200_OK
+        assert PROFILE_ID_HEADER not in res
+
+    def test_disk_cap_prunes_oldest(self, settings):
+        """Test that the oldest profiles and their files are deleted over the cap."""
+        profiles = [create_profile(100) for _ in range(3)]
+        settings.PROFILE_MAX_BYTES = 250
+
+        prune_profiles()
+
+        assert list(RequestProfile.objects.order_by("id")) == profiles[1:]
+        assert not profiles[0].stacks.storage.exists(profiles[0].stacks.name)
+
+
+@pytest.mark.django_db
+class TestRequestProfileAdmin:
+    """Test the admin pages of request profiles."""
+
+    def test_list_and_download(self, client, menu, staff_user):
+        """Test that profiles are listed and their stacks downloadable."""
+        res = bearer_client(staff_user).get(MENU_URL, HTTP_X_PROFILE="1")
+        profile = RequestProfile.objects.get(pk=res[PROFILE_ID_HEADER])
+        admin = User.objects.create_superuser(email="admin@example.com", password="password123", name="Admin")
+        client.force_login(admin)
+
+        res = client.get(reverse("admin:core_requestprofile_changelist"))
+        assert res.status_code == status.HTTP_200_OK
+        assert MENU_URL in res.content.decode()
+
+        res = client.get(reverse("admin:core_requestprofile_download", args=[profile.pk]))
+        assert res.status_code == status.HTTP_200_OK
+        assert b"".join(res.streaming_content) == profile.stacks.open("rb").read()
+
+    def test_download_requires_permission(self, client, menu, staff_user):
+        """Test that staff without the view permission cannot download profiles."""
+        res = bearer_client(staff_user).get(MENU_URL, HTTP_X_PROFILE="1")
+        client.force_login(staff_user)
+
+        res = client.get(reverse("admin:core_requestprofile_download", args=[res[PROFILE_ID_HEADER]]))
+
+        assert res.status_code == status.HTTP_403_FORBIDDEN
@@ -0,0 +1,133 @@
+"""
+Tests for the precomputed OpenAPI schema.
+"""
+
+import json
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.schema import CachedSpectacularAPIView, clear_schemas, code_version
+
+SCHEMA_URL = reverse("api-schema")
+JSON_MEDIA_TYPE = "application/vnd.oai.openapi+json"
+
+
+@pytest.fixture(autouse=True)
+def fresh_schemas(settings):
+    """Start every test without schemas in memory or on disk."""
+    settings.SCHEMA_CACHE_DIR = ""
+    clear_schemas()
+    code_version.cache_clear()
+    yield
+    clear_schemas()
+    code_version.cache_clear()
+
+
+@pytest.fixture
+def render_calls(monkeypatch) -> list[str]:
+    """Record every schema generation."""
+    calls = []
+    original = CachedSpectacularAPIView.render_schema
+
+    def render_schema(self, renderer, api_version):
+        calls.append(renderer.format)
+        return original(self, renderer, api_version)
+
+    monkeypatch.setattr(CachedSpectacularAPIView, "render_schema", render_schema)
+    return calls
+
+
+class TestSchemaView:
+    """Test serving the schema."""
+
+    def test_generated_once(self, render_calls):
+        """Test that the schema is generated on the first request only."""
+        client = APIClient()
+
+        first = client.get(SCHEMA_URL)
+        second = client.get(SCHEMA_URL)
+
+        assert first.status_code == second.status_code == status.HTTP_200_OK
+        assert first.content == second.content
+        assert first["ETag"] == second["ETag"]
+        assert render_calls == ["yaml"]
+
+    def test_etag_revalidation(self):
+        """Test that a matching If-None-Match gets 304 without a body."""
+        etag = APIClient().get(SCHEMA_URL)["ETag"]
+
+        res = APIClient().get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res.content == b""
+        assert res["ETag"] == etag
+
+    def test_json_and_security_scheme(self):
+        """Test that the JSON format is served and documents the JWT scheme."""
+        res = APIClient().get(SCHEMA_URL, HTTP_ACCEPT=JSON_MEDIA_TYPE)
+
+        assert res["Content-Type"] == JSON_MEDIA_TYPE
+        schema = json.loads(res.content)
+        assert schema["components"]["securitySchemes"]["jwtAuth"]["scheme"] == "bearer"
+
+    def test_new_code_version_regenerates(self, settings, render_calls):
+        """Test that a different code version gets a freshly generated schema."""
+        settings.APP_CODE_VERSION = "v1"
+        APIClient().get(SCHEMA_URL)
+
+        settings.APP_CODE_VERSION = "v2"
+        code_version.cache_clear()
+        APIClient().get(SCHEMA_URL)
+
+        assert render_calls == ["yaml", "yaml"]
+
+
+class TestSpectacularCommand:
+    """Test generating the schema outside a request."""
+
+    def test_security_scheme(self):
+        """Test that a fresh process without the schema views still documents the JWT scheme."""
+        result = subprocess.run(
+            [sys.executable, "manage.py", "spectacular", "--format", "openapi-json"],
+            cwd=settings.BASE_DIR,
+            env={"DJANGO_SETTINGS_MODULE": "app.settings", "PATH": ""},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        schema = json.loads(result.stdout)
+        assert schema["components"]["securitySchemes"]["jwtAuth"]["scheme"] == "bearer"
+
+
+class TestBuildSchemaCommand:
+    """Test precomputing the schema files."""
+
+    def test_files_served_without_generation(self, settings, tmp_path, render_calls):
+        """Test that a process with built files never generates the schema."""
+        schema_dir = tmp_path / "schema"
+        settings.SCHEMA_CACHE_DIR = str(schema_dir)
+        call_command("build_schema", stdout=StringIO())
+        assert {path.suffix for path in schema_dir.iterdir()} == {".yaml", ".json"}
+
+        clear_schemas()
+        render_calls.clear()
+        res = APIClient().get(SCHEMA_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == next(schema_dir.glob("*.yaml")).read_bytes()
+        assert render_calls == []
+
+    def test_requires_directory(self):
+        """Test that the command fails without a target directory."""
+        with pytest.raises(CommandError):
+            call_command("build_schema", stdout=StringIO())
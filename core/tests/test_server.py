@@ -0,0 +1,86 @@
+"""
+Tests for the gunicorn configuration and the health probes.
+"""
+
+import os
+import runpy
+import sys
+
+import pytest
+from django.conf import settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import server, startup
+from core.server import over_memory_limit, select_worker
+
+
+class TestGunicornConfig:
+    """Test selecting the server configuration from the environment."""
+
+    def test_select_worker(self):
+        """Test that worker kinds map to gunicorn worker classes and applications."""
+        assert select_worker("sync") == ("sync", "app.wsgi:application")
+        assert select_worker("gthread") == ("gthread", "app.wsgi:application")
+
+    def test_unknown_worker(self):
+        """Test that an unknown worker kind is rejected."""
+        with pytest.raises(ValueError, match="WEB_WORKER_CLASS"):
+            select_worker("eventlet")
+
+    def test_asgi_requires_uvicorn_worker(self, monkeypatch):
+        """Test that the ASGI worker fails clearly without uvicorn-worker."""
+        monkeypatch.setitem(sys.modules, "uvicorn_worker", None)
+
+        with pytest.raises(ValueError, match="uvicorn-worker"):
+            select_worker("asgi")
+
+    def test_config_from_environment(self, monkeypatch):
+        """Test that gunicorn.conf.py reads the worker settings from the environment."""
+        monkeypatch.setenv("WEB_WORKER_CLASS", "gthread")
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        monkeypatch.setenv("WEB_MAX_REQUESTS", "1000")
+        monkeypatch.delenv("WEB_THREADS", raising=False)
+        monkeypatch.delenv("DJANGO_WARMUP", raising=False)
+
+        config = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+
+        assert config["worker_class"] == "gthread"
+        assert config["wsgi_app"] == "app.wsgi:application"
+        assert (config["workers"], config["threads"]) == (3, 4)
+        assert (config["max_requests"], config["max_requests_jitter"]) == (1000, 100)
+        assert config["preload_app"] is True
+        assert os.environ["DJANGO_WARMUP"] == "1"
+
+    def test_memory_limit(self, monkeypatch):
+        """Test that the memory limit compares the resident size and can be disabled."""
+        monkeypatch.setattr(server, "current_rss_mb", lambda: 300.0)
+
+        assert over_memory_limit(256)
+        assert not over_memory_limit(512)
+        assert not over_memory_limit(0)
+
+    def test_current_rss(self):
+        """Test that the resident size of this process is measured."""
+        assert server.current_rss_mb() > 1
+
+
+@pytest.mark.django_db
+class TestProbes:
+    """Test the liveness and readiness endpoints."""
+
+    def test_healthz(self):
+        """Test that the liveness probe always answers."""
+        assert APIClient().get(reverse("healthz")).status_code == status.HTTP_200_OK
+
+    def test_readyz(self, monkeypatch):
+        """Test that the readiness probe answers 503 until start-up finished."""
+        monkeypatch.setattr(startup, "_ready", type(startup._ready)())
+        client = APIClient()
+
+        assert client.get(reverse("readyz")).status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+        startup._ready.set()
+
+        assert client.get(reverse("readyz")).status_code == status.HTTP_200_OK
@@ -0,0 +1,80 @@
+"""
+Tests for the Server-Timing header.
+"""
+
+import logging
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.models import Dish, Menu
+
+PHASES = ("auth", "db", "serialize", "render", "total")
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with a dish."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+    return menu
+
+
+def detail_url(menu: Menu) -> str:
+    """Return the detail URL of a menu."""
+    return reverse("menu:menu-detail", args=[menu.id])
+
+
+def phases(header: str) -> dict[str, str]:
+    """Parse a Server-Timing header into {name: metric}."""
+    return {metric.split(";")[0]: metric for metric in header.split(", ")}
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+    """Test the opt-in Server-Timing breakdown."""
+
+    def test_disabled_by_default(self, menu):
+        """Test that no header is added unless enabled."""
+        res = APIClient().get(detail_url(menu))
+
+        assert "Server-Timing" not in res
+
+    def test_menu_detail_breakdown(self, menu, settings, caplog):
+        """Test that the header breaks the request down and matches the log line."""
+        settings.SERVER_TIMING_ENABLED = True
+
+        with CaptureQueriesContext(connection) as queries, caplog.at_level(logging.INFO, logger="core.middleware"):
+            res = APIClient().get(detail_url(menu))
+
+        assert res.status_code == status.HTTP_200_OK
+        metrics = phases(res["Server-Timing"])
+        assert tuple(metrics) == PHASES
+        assert all(re.search(r";dur=\d+\.\d{2}", metric) for metric in metrics.values())
+        assert f'desc="{len(queries)} queries"' in metrics["db"]
+
+        (record,) = [r for r in caplog.records if r.getMessage().startswith("server_timing")]
+        assert record.view == "menu:menu-detail"
+        assert record.db_queries == len(queries)
+
+    def test_user_views(self, settings):
+        """Test that the user views get the header as well."""
+        settings.SERVER_TIMING_ENABLED = True
+
+        res = APIClient().get(reverse("user:me"))
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert "Server-Timing" in res
+
+    def test_other_views_excluded(self, settings):
+        """Test that views outside the configured namespaces get no header."""
+        settings.SERVER_TIMING_ENABLED = True
+
+        res = APIClient().get(reverse("metrics"))
+
+        assert "Server-Timing" not in res
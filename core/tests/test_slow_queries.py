@@ -0,0 +1,158 @@
+"""
+Tests for the slow query log.
+"""
+
+import logging
+import time
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.slow_queries import SlowQueryLog, explain, fingerprint, redact_params, slow_query_log
+from menu.models import Dish, Menu
+from menu.tasks import send_daily_menu_report
+
+MENU_URL = reverse("menu:menu-list")
+
+
+@pytest.fixture(autouse=True)
+def clean_log():
+    """Start every test without recorded fingerprints."""
+    slow_query_log.flush()
+    yield
+    slow_query_log.flush()
+
+
+@pytest.fixture
+def every_query_slow(settings):
+    """Treat every query as slow."""
+    settings.SLOW_QUERY_THRESHOLD_MS = 1e-9
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with a dish."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+    return menu
+
+
+def slow_records(caplog) -> list[logging.LogRecord]:
+    """Return the slow query records logged so far."""
+    return [record for record in caplog.records if record.getMessage().startswith("slow_query ")]
+
+
+class TestFingerprint:
+    """Test SQL normalization and parameter redaction."""
+
+    def test_literals_and_placeholders(self):
+        """Test that literals, placeholders and whitespace are normalized."""
+        sql = "SELECT  *\nFROM \"menu_dish\" WHERE name = 'it''s' AND price > 10.5 AND id = %s"
+
+        assert fingerprint(sql) == 'SELECT * FROM "menu_dish" WHERE name = ? AND price > ? AND id = ?'
+
+    def test_in_lists_collapse(self):
+        """Test that IN lists of any length share a fingerprint."""
+        assert fingerprint("SELECT 1 FROM t WHERE id IN (%s, %s)") == fingerprint("SELECT 1 FROM t WHERE id IN (%s)")
+
+    def test_identifiers_with_digits_kept(self):
+        """Test that digits inside identifiers are not treated as literals."""
+        assert fingerprint('SELECT "t1"."col2" FROM t1') == 'SELECT "t1"."col2" FROM t1'
+
+    def test_redact_params(self):
+        """Test that strings are replaced by their type and length."""
+        assert redact_params(["secret@example.com", 5, None, True, 1.5, b"ab"]) == [
+            "<str:18>",
+            5,
+            None,
+            True,
+            "<float>",
+            "<bytes:2>",
+        ]
+        assert redact_params(None) is None
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+    """Test detecting and aggregating slow queries."""
+
+    def test_view_query_logged_with_plan(self, menu, every_query_slow, caplog):
+        """Test that a slow query of a view is logged with its call site and plan."""
+        with caplog.at_level(logging.INFO, logger="core.slow_queries"):
+            APIClient().get(MENU_URL)
+
+        records = slow_records(caplog)
+        assert records
+        record = next(r for r in records if 'COUNT("menu_dish"."id")' in r.fingerprint)
+        assert record.call_site == "view:menu:menu-list"
+        assert record.plan
+        assert all(not str(param).startswith("Lunch") for param in record.params or [])
+
+    def test_statistics_aggregated_and_flushed(self, menu, every_query_slow, caplog):
+        """Test that repeated queries are counted per fingerprint until flushed."""
+        for _ in range(3):
+            list(Dish.objects.filter(name="Soup"))
+
+        stats = slow_query_log.snapshot()
+        (entry,) = [entry for sql, entry in stats.items() if '"menu_dish"."name" = ?' in sql]
+        assert entry.count == 3
+        assert entry.call_sites == {"other": 3}
+
+        with caplog.at_level(logging.INFO, logger="core.slow_queries"):
+            slow_query_log.flush()
+
+        assert any(r.getMessage().startswith("slow_query_stats") and r.count == 3 for r in caplog.records)
+        assert slow_query_log.snapshot() == {}
+
+    def test_first_occurrence_logged_once(self, menu, every_query_slow, caplog):
+        """Test that a fingerprint is explained and logged only once per interval."""
+        with caplog.at_level(logging.WARNING, logger="core.slow_queries"):
+            list(Dish.objects.filter(name="Soup"))
+            list(Dish.objects.filter(name="Salad"))
+
+        assert len([r for r in slow_records(caplog) if '"menu_dish"."name" = ?' in r.fingerprint]) == 1
+
+    def test_explain_in_savepoint(self, menu):
+        """Test that a failing EXPLAIN is rolled back to a savepoint and leaves the transaction usable."""
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            plan = explain(connection, "SELECT * FROM missing_table", None)
+
+            assert plan.startswith("<explain failed")
+            assert Dish.objects.filter(name="Soup").exists()
+        assert any(query["sql"].startswith("SAVEPOINT") for query in queries)
+
+    def test_flushed_periodically(self, menu, every_query_slow, settings, caplog):
+        """Test that the statistics are flushed every SLOW_QUERY_FLUSH_INTERVAL without further queries."""
+        settings.SLOW_QUERY_FLUSH_INTERVAL = 0.05
+        log = SlowQueryLog()
+
+        with caplog.at_level(logging.INFO, logger="core.slow_queries"):
+            log.record(connection, 'SELECT 1 FROM "menu_dish"', None, 1.0)
+            time.sleep(0.2)
+
+        assert any(r.getMessage().startswith("slow_query_stats") for r in caplog.records)
+        assert log.snapshot() == {}
+
+    def test_other_apps_ignored(self, every_query_slow):
+        """Test that queries outside the watched apps are not recorded."""
+        from django.contrib.sessions.models import Session
+
+        list(Session.objects.all())
+
+        assert not any("django_session" in sql for sql in slow_query_log.snapshot())
+
+    def test_fast_queries_ignored(self, menu):
+        """Test that queries under the threshold are not recorded."""
+        list(Dish.objects.all())
+
+        assert slow_query_log.snapshot() == {}
+
+    def test_task_call_site(self, menu, every_query_slow):
+        """Test that queries of a Celery task are attributed to the task."""
+        send_daily_menu_report.apply()
+
+        sites = {site for entry in slow_query_log.snapshot().values() for site in entry.call_sites}
+        assert sites == {"task:menu.tasks.send_daily_menu_report"}
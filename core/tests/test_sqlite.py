@@ -0,0 +1,100 @@
+"""
+Tests for the SQLite tuning profile.
+"""
+
+import copy
+import threading
+
+import pytest
+from django.db import connections, transaction
+
+from core.sqlite import stress, tuned_options
+
+ALIAS = "sqlite_tuned"
+
+
+@pytest.fixture
+def database_file(tmp_path, django_db_blocker):
+    """Allow access to SQLite files outside the test database."""
+    with django_db_blocker.unblock():
+        yield str(tmp_path / "tuned.sqlite3")
+
+
+@pytest.fixture
+def tuned_database(database_file):
+    """Register a tuned SQLite file as a database alias with a table of items."""
+    config = copy.deepcopy(connections.settings["default"])
+    config.update(NAME=database_file, OPTIONS=tuned_options(busy_timeout_ms=5000))
+    connections.settings[ALIAS] = config
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        cursor.execute("INSERT INTO item DEFAULT VALUES")
+
+    yield ALIAS
+
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.settings[ALIAS]
+
+
+class TestTunedOptions:
+    """Test the options applied on connection creation."""
+
+    def test_pragmas_applied(self, tuned_database):
+        """Test that new connections use WAL, NORMAL sync and the busy timeout."""
+        with connections[tuned_database].cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "synchronous", "busy_timeout")
+            }
+
+        assert pragmas == {"journal_mode": "wal", "synchronous": 1, "busy_timeout": 5000}
+        assert connections[tuned_database].transaction_mode == "IMMEDIATE"
+
+    def test_reader_not_blocked_by_writer(self, tuned_database):
+        """Test that a reader gets the last commit immediately while a write transaction is open."""
+        writing = threading.Event()
+        finish = threading.Event()
+
+        def writer():
+            try:
+                with transaction.atomic(using=tuned_database), connections[tuned_database].cursor() as cursor:
+                    cursor.execute("INSERT INTO item DEFAULT VALUES")
+                    writing.set()
+                    finish.wait(5)
+            finally:
+                connections[tuned_database].close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            assert writing.wait(5)
+            with connections[tuned_database].cursor() as cursor:
+                cursor.execute("PRAGMA busy_timeout = 0")
+                cursor.execute("SELECT COUNT(*) FROM item")
+                assert cursor.fetchone() == (1,)
+        finally:
+            finish.set()
+            thread.join()
+
+        with connections[tuned_database].cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM item")
+            assert cursor.fetchone() == (2,)
+
+
+class TestStress:
+    """Test concurrent readers and writers."""
+
+    def test_tuned_without_lock_errors(self, database_file):
+        """Test that concurrent read-then-write transactions queue instead of failing."""
+        result = stress(database_file, tuned_options(busy_timeout_ms=5000), duration=0.5)
+
+        assert result.errors == 0
+        assert result.writes > 0
+        assert result.reads > 0
+
+    def test_default_fails_under_contention(self, database_file):
+        """Test that the untuned baseline the profile fixes does fail with "database is locked"."""
+        result = stress(database_file, {}, duration=0.5)
+
+        assert result.errors > 0
@@ -0,0 +1,122 @@
+"""
+Tests for the worker startup helpers.
+"""
+
+import json
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from core import startup
+from core.management.commands.startup_profile import parse_importtime
+from core.metrics import registry
+from core.startup import is_ready, start_up, warm_up, wsgi_get
+
+IMPORTTIME_OUTPUT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   celery.local
+import time:      1500 |       1620 | celery
+"""
+
+
+class TestWebImports:
+    """Test that web workers do not import what they do not use."""
+
+    def test_lazy_imports(self):
+        """Test that loading the URLs and serving the API imports neither Celery nor the schema views."""
+        code = (
+            "import json, sys, django; django.setup();"
+            "from django.urls import resolve; resolve('/api/menu/menus/');"
+            "print(json.dumps(sorted(m for m in ('celery', 'drf_spectacular.views', 'PIL.Image') if m in sys.modules)))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=settings.BASE_DIR,
+            env={"DJANGO_SETTINGS_MODULE": "app.settings", "PATH": ""},
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+class TestStartupProfile:
+    """Test the startup profiling helpers."""
+
+    def test_parse_importtime(self):
+        """Test that -X importtime lines are parsed and the header skipped."""
+        assert parse_importtime(IMPORTTIME_OUTPUT) == [("celery.local", 120, 120), ("celery", 1500, 1620)]
+
+    def test_command_reports(self):
+        """Test that the command reports the first response and the import times."""
+        out = StringIO()
+
+        call_command("startup_profile", "--path", "/metrics/", "--top", "3", stdout=out)
+
+        output = out.getvalue()
+        assert "first request:" in output
+        assert "(200 OK)" in output
+        assert "django" in output
+
+
+class TestWarmUp:
+    """Test warming up the application before forking."""
+
+    @pytest.mark.django_db
+    def test_warm_up_serves_paths_and_resets_state(self, settings, monkeypatch):
+        """Test that warm-up requests are served, then connections closed and metrics dropped."""
+        settings.ALLOWED_HOSTS = ["testserver"]
+        settings.WARMUP_PATHS = ("/metrics/",)
+        closed = []
+        monkeypatch.setattr(connections, "close_all", lambda: closed.append(True))
+        application = get_wsgi_application()
+
+        assert wsgi_get(application, "/metrics/") == "200 OK"
+        warm_up()
+
+        assert closed == [True]
+        assert registry.snapshot()["series"] == []
+
+    def test_warm_up_closes_pools(self, settings, monkeypatch):
+        """Test that connection pools opened by the warm-up are closed before workers fork."""
+        settings.WARMUP_PATHS = ()
+        closed = []
+
+        class PooledConnection:
+            def __init__(self):
+                self.settings_dict = {"OPTIONS": {"pool": True}}
+
+            def close_pool(self):
+                closed.append(self)
+
+        pooled = PooledConnection()
+        monkeypatch.setattr(connections, "close_all", lambda: None)
+        monkeypatch.setattr(connections, "all", lambda initialized_only=False: [pooled, connections["default"]])
+
+        warm_up()
+
+        assert closed == [pooled]
+
+    def test_ready_after_start_up(self, settings, monkeypatch):
+        """Test that the process reports ready only once start-up finished."""
+        settings.WARMUP_ENABLED = False
+        monkeypatch.setattr(startup, "_ready", type(startup._ready)())
+        assert not is_ready()
+
+        start_up()
+
+        assert is_ready()
+
+    @pytest.mark.django_db
+    def test_wsgi_get_api(self, settings):
+        """Test that API paths are served through the WSGI application."""
+        settings.ALLOWED_HOSTS = ["testserver"]
+
+        assert wsgi_get(get_wsgi_application(), "/api/menu/menus/?search=x") == "200 OK"
@@ -0,0 +1,134 @@
+"""
+Per-request timings collected from cheap hooks.
+
+``RequestTimingMiddleware`` starts a ``RequestTimings`` for every request and
+the hooks below add to it:
+
+* database time and query count through an execute wrapper installed once
+  on every database connection,
+* authentication time from ``ClaimsJWTAuthentication``,
+* rendering time from ``TimedJSONRenderer``.
+
+Serialization time is what remains of the view time after the other phases.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+
+class RequestTimings:
+    """Phase durations of a single request, in seconds."""
+
+    __slots__ = ("auth", "db", "db_count", "end", "queries", "render", "start", "view_name", "view_start")
+
+    def __init__(self) -> None:
+        self.start = perf_counter()
+        self.view_start = 0.0
+        self.view_name = ""
+        self.end = 0.0
+        self.auth = 0.0
+        self.db = 0.0
+        self.db_count = 0
+        self.render = 0.0
+        # Set to a list to log (sql, seconds) of every query, e.g. while profiling.
+        self.queries: list[tuple[str, float]] | None = None
+
+    @property
+    def total(self) -> float:
+        return (self.end or perf_counter()) - self.start
+
+    @property
+    def serialize(self) -> float:
+        """Time spent in the view outside authentication, queries and rendering."""
+        if not self.view_start:
+            return 0.0
+        view = (self.end or perf_counter()) - self.view_start
+        return max(view - self.auth - self.db - self.render, 0.0)
+
+    def add(self, other: "RequestTimings") -> None:
+        """Add the authentication, database and rendering time of ``other``, e.g. a sub-request, to these."""
+        self.auth += other.auth
+        self.db += other.db
+        self.db_count += other.db_count
+        self.render += other.render
+        if self.queries is not None and other.queries is not None:
+            self.queries.extend(other.queries)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Database execute wrapper adding query time and count to the current request."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = perf_counter() - start
+        timings.db += duration
+        timings.db_count += 1
+        if timings.queries is not None:
+            timings.queries.append((sql, duration))
+
+
+def install_execute_wrapper(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver adding ``execute_wrapper`` to new connections."""
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+def current_timings() -> RequestTimings | None:
+    """Return the timings of the request being processed, if any."""
+    return _current.get()
+
+
+@contextmanager
+def timed_as(timings: RequestTimings | None) -> Iterator[None]:
+    """Add the queries and phases of the block to ``timings`` instead of those of the current request."""
+    token = _current.set(timings)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def untimed() -> Iterator[None]:
+    """Leave the queries of the block out of the timings of the current request."""
+    with timed_as(None):
+        yield
+
+
+def start_timings() -> tuple[RequestTimings, object]:
+    """Start timings for a new request; return them with a token for ``stop_timings``."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_timings(timings: RequestTimings, token) -> None:
+    """Finish the timings of the current request."""
+    timings.end = perf_counter()
+    _current.reset(token)
+
+
+class TimedPhase:
+    """Context manager adding the duration of a block to a phase of the current request."""
+
+    __slots__ = ("phase", "start", "timings")
+
+    def __init__(self, phase: str) -> None:
+        self.phase = phase
+        self.timings = _current.get()
+
+    def __enter__(self) -> None:
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        if self.timings is not None:
+            setattr(self.timings, self.phase, getattr(self.timings, self.phase) + perf_counter() - self.start)
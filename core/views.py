@@ -0,0 +1,87 @@
+"""
+Views for the core app.
+"""
+
+import ipaddress
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
+
+from core.metrics import exposition, registry
+from core.startup import is_ready
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Set by reverse proxies; a request carrying one of them was relayed from elsewhere.
+PROXY_HEADERS = ("Forwarded", "X-Forwarded-For", "X-Real-IP")
+
+
+def is_local(request: HttpRequest) -> bool:
+    """Return whether the request comes from this host directly, not through a proxy."""
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return address.is_loopback and not any(header in request.headers for header in PROXY_HEADERS)
+
+
+@require_GET
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Expose the request metrics of all workers in the Prometheus text format.
+
+    Requires the ``METRICS_TOKEN`` bearer token; without one configured only
+    local requests are answered.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        allowed = constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+    else:
+        allowed = is_local(request)
+    if not allowed:
+        return HttpResponseForbidden()
+
+    return HttpResponse(exposition(registry.collect()), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@require_GET
+def healthz(request: HttpRequest) -> HttpResponse:
+    """Liveness probe: the process serves requests."""
+    return HttpResponse("ok", content_type="text/plain")
+
+
+@require_GET
+def readyz(request: HttpRequest) -> HttpResponse:
+    """Readiness probe: startup (and warm-up) finished and the database is reachable."""
+    if not is_ready():
+        return HttpResponse("starting", status=503, content_type="text/plain")
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except DatabaseError:
+        return HttpResponse("database unavailable", status=503, content_type="text/plain")
+    return HttpResponse("ok", content_type="text/plain")
+
+
+def lazy_api_view(dotted_path: str, **initkwargs):
+    """
+    Return a view importing the API view class at ``dotted_path`` on its first request.
+
+    Keeps heavy, rarely used views (e.g. the schema and docs) out of the
+    imports of every worker process.
+    """
+    view = None
+
+    @csrf_exempt
+    def lazy_view(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return lazy_view
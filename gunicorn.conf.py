@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration, loaded automatically when gunicorn starts in this directory.
+
+Environment variables:
+
+* ``WEB_WORKER_CLASS``: ``sync`` (default), ``gthread`` or ``asgi`` (needs uvicorn-worker).
+* ``WEB_CONCURRENCY`` / ``WEB_THREADS``: worker processes / threads per gthread worker.
+* ``WEB_PRELOAD``: import and warm up the application in the master before forking (default on).
+* ``WEB_MAX_WORKER_MEMORY_MB``: restart a worker after a request leaves it above this size.
+* ``WEB_MAX_REQUESTS``: restart a worker after this many requests (with jitter).
+"""
+
+import os
+
+from core.server import default_workers, env_bool, over_memory_limit, select_worker
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+
+worker_kind = os.environ.get("WEB_WORKER_CLASS", "sync")
+worker_class, wsgi_app = select_worker(worker_kind)
+workers = int(os.environ.get("WEB_CONCURRENCY", default_workers()))
+threads = int(os.environ.get("WEB_THREADS", 4 if worker_kind == "gthread" else 1))
+
+preload_app = env_bool("WEB_PRELOAD", True)
+if preload_app:
+    # Warm up once in the master; forked workers share the loaded state.
+    os.environ.setdefault("DJANGO_WARMUP", "1")
+
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+max_worker_memory_mb = float(os.environ.get("WEB_MAX_WORKER_MEMORY_MB", 0))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def post_request(worker, req, environ, resp):
+    """Recycle the worker once it grew over the memory limit (sync and gthread workers)."""
+    if worker.alive and over_memory_limit(max_worker_memory_mb):
+        worker.log.info("Worker %s over %s MiB, restarting", worker.pid, max_worker_memory_mb)
+        worker.alive = False
+
+
+def worker_exit(server, worker):
+    """Fold the metrics of the exiting worker into the total of retired workers."""
+    from core.metrics import registry
+
+    registry.close()
@@ -0,0 +1,256 @@
+"""
+In-process prefix index for autocompleting menu and dish names.
+
+Names are normalized (accents stripped, case folded, whitespace collapsed)
+and kept in two sorted arrays searched with ``bisect``: one of whole names
+and one of the names from their second word on, so that "carb" suggests
+"Spaghetti Carbonara" after the names starting with "carb". A lookup costs
+two binary searches and a scan of at most a few entries per suggestion.
+
+The index is built on a background thread by the first request that finds it
+missing; until then suggestions come from the database. Committed saves and
+deletes of this process replace it by an updated copy, so that readers never
+lock. Changes it did not see, from bulk updates or other workers (seen
+through ``catalog_version`` with a shared cache), and an age above
+``MENU_AUTOCOMPLETE_MAX_AGE`` trigger a rebuild in the background while the
+current index keeps answering.
+"""
+
+import bisect
+import copy
+import logging
+import threading
+import unicodedata
+from functools import partial
+from time import monotonic
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+
+from menu.catalog import catalog_version
+from menu.models import Dish, Menu
+
+logger = logging.getLogger(__name__)
+
+MENU = "menu"
+DISH = "dish"
+
+
+def normalize(text: str) -> str:
+    """Return ``text`` without accents, case folded and with single spaces between words."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+
+
+def word_suffixes(key: str) -> list[str]:
+    """Return ``key`` from each of its words after the first on."""
+    return [key[index + 1 :] for index, char in enumerate(key) if char == " "]
+
+
+class Suggestion(NamedTuple):
+    """An indexed name; ordered by normalized name, then type and id."""
+
+    key: str
+    type: str
+    id: int
+    name: str
+
+    def represent(self) -> dict:
+        return {"type": self.type, "id": self.id, "name": self.name}
+
+
+class AutocompleteIndex:
+    """Sorted arrays of the normalized menu and dish names."""
+
+    def __init__(self, names: dict[tuple[str, int], str], dish_menus: dict[int, int], version: int):
+        self.version = version
+        self.built_at = monotonic()
+        # Original name by (type, id), and menu id by dish id.
+        self.names = names
+        self.dish_menus = dish_menus
+        self.dish_counts: dict[int, int] = {}
+        for menu_id in dish_menus.values():
+            self.dish_counts[menu_id] = self.dish_counts.get(menu_id, 0) + 1
+        whole, words = [], []
+        for (kind, pk), name in names.items():
+            key = normalize(name)
+            whole.append(Suggestion(key, kind, pk, name))
+            words.extend(Suggestion(suffix, kind, pk, name) for suffix in word_suffixes(key))
+        self.whole = sorted(whole)
+        self.words = sorted(words)
+        self.whole_keys = [suggestion.key for suggestion in self.whole]
+        self.words_keys = [suggestion.key for suggestion in self.words]
+
+    @classmethod
+    def build(cls, using: str) -> "AutocompleteIndex":
+        """Read the names of all menus and dishes."""
+        version = catalog_version()
+        names = {(MENU, pk): name for pk, name in Menu.objects.using(using).values_list("pk", "name")}
+        dish_menus = {}
+        for pk, name, menu_id in Dish.objects.using(using).values_list("pk", "name", "menu_id"):
+            names[DISH, pk] = name
+            dish_menus[pk] = menu_id
+        return cls(names, dish_menus, version)
+
+    def visible(self, suggestion: Suggestion, anonymous: bool) -> bool:
+        # Anonymous users do not see menus without dishes (see MenuViewSet.get_queryset).
+        return not anonymous or suggestion.type != MENU or self.dish_counts.get(suggestion.id, 0) > 0
+
+    def suggest(self, query: str, limit: int, anonymous: bool = False) -> list[Suggestion]:
+        """Return up to ``limit`` names starting with ``query``, then names with a later word starting with it."""
+        prefix = normalize(query)
+        found: list[Suggestion] = []
+        seen: set[tuple[str, int]] = set()
+        for keys, entries in ((self.whole_keys, self.whole), (self.words_keys, self.words)):
+            position = bisect.bisect_left(keys, prefix)
+            while len(found) < limit and position < len(keys) and keys[position].startswith(prefix):
+                suggestion = entries[position]
+                position += 1
+                if (suggestion.type, suggestion.id) not in seen and self.visible(suggestion, anonymous):
+                    seen.add((suggestion.type, suggestion.id))
+                    found.append(suggestion)
+        return found
+
+    def updated(self, kind: str, pk: int, name: str | None, menu_id: int | None = None) -> "AutocompleteIndex":
+        """Return a copy of the index with the name of ``kind`` ``pk`` set, or removed if ``name`` is None."""
+        index = copy.copy(self)
+        index.names = dict(self.names)
+        index.dish_menus = dict(self.dish_menus)
+        index.dish_counts = dict(self.dish_counts)
+        index.whole, index.whole_keys = list(self.whole), list(self.whole_keys)
+        index.words, index.words_keys = list(self.words), list(self.words_keys)
+
+        old = index.names.pop((kind, pk), None)
+        if old is not None:
+            key = normalize(old)
+            index.remove(
+                Suggestion(key, kind, pk, old), [Suggestion(suffix, kind, pk, old) for suffix in word_suffixes(key)]
+            )
+        if kind == DISH and pk in index.dish_menus:
+            old_menu = index.dish_menus.pop(pk)
+            index.dish_counts[old_menu] -= 1
+        if name is not None:
+            key = normalize(name)
+            index.names[kind, pk] = name
+            index.insert(
+                Suggestion(key, kind, pk, name), [Suggestion(suffix, kind, pk, name) for suffix in word_suffixes(key)]
+            )
+            if kind == DISH:
+                index.dish_menus[pk] = menu_id
+                index.dish_counts[menu_id] = index.dish_counts.get(menu_id, 0) + 1
+        return index
+
+    def insert(self, whole: Suggestion, words: list[Suggestion]) -> None:
+        for entries, keys, suggestions in (
+            (self.whole, self.whole_keys, [whole]),
+            (self.words, self.words_keys, words),
+        ):
+            for suggestion in suggestions:
+                position = bisect.bisect_left(entries, suggestion)
+                entries.insert(position, suggestion)
+                keys.insert(position, suggestion.key)
+
+    def remove(self, whole: Suggestion, words: list[Suggestion]) -> None:
+        for entries, keys, suggestions in (
+            (self.whole, self.whole_keys, [whole]),
+            (self.words, self.words_keys, words),
+        ):
+            for suggestion in suggestions:
+                position = bisect.bisect_left(entries, suggestion)
+                if position < len(entries) and entries[position] == suggestion:
+                    del entries[position]
+                    del keys[position]
+
+
+_index: AutocompleteIndex | None = None
+_lock = threading.Lock()
+_building = False
+
+
+def build_index() -> AutocompleteIndex:
+    """Build the index from the database and make it current."""
+    global _index
+    using = router.db_for_read(Menu)
+    start = monotonic()
+    index = AutocompleteIndex.build(using)
+    with _lock:
+        _index = index
+    logger.info("autocomplete index built: %d names in %.1f ms", len(index.names), (monotonic() - start) * 1000)
+    return index
+
+
+def _build_in_background() -> None:
+    global _building
+    try:
+        build_index()
+    except Exception:
+        logger.exception("building the autocomplete index failed")
+    finally:
+        connections.close_all()
+        _building = False
+
+
+def schedule_build() -> None:
+    """Build the index on a background thread, unless a build is running."""
+    global _building
+    with _lock:
+        if _building:
+            return
+        _building = True
+    threading.Thread(target=_build_in_background, name="autocomplete-build", daemon=True).start()
+
+
+def get_index() -> AutocompleteIndex | None:
+    """Return the index, or None while it is cold; schedule a build if it is missing or outdated."""
+    index = _index
+    if (
+        index is None
+        or index.version != catalog_version()
+        or monotonic() - index.built_at >= settings.MENU_AUTOCOMPLETE_MAX_AGE
+    ):
+        schedule_build()
+    return index
+
+
+def clear_index() -> None:
+    """Drop the index of this process."""
+    global _index
+    with _lock:
+        _index = None
+
+
+def apply_change(kind: str, pk: int, name: str | None, menu_id: int | None) -> None:
+    """Apply a committed change to the index; it stays current if no other change bumped the catalog version."""
+    global _index
+    with _lock:
+        if _index is None:
+            return
+        index = _index.updated(kind, pk, name, menu_id)
+        # The version was bumped for this change just before (see menu.signals).
+        version = catalog_version()
+        if version == index.version + 1:
+            index.version = version
+        _index = index
+
+
+def index_changed(kind: str, pk: int, name: str | None, menu_id: int | None, using: str) -> None:
+    """Update the index once the current transaction commits."""
+    transaction.on_commit(partial(apply_change, kind, pk, name, menu_id), using=using)
+
+
+def suggest_from_database(query: str, limit: int, anonymous: bool) -> list[Suggestion]:
+    """Return suggestions like ``AutocompleteIndex.suggest``, from the database."""
+    menus = Menu.objects.filter(Q(name__istartswith=query) | Q(name__icontains=f" {query}"))
+    if anonymous:
+        menus = menus.filter(dishes__isnull=False).distinct()
+    dishes = Dish.objects.filter(Q(name__istartswith=query) | Q(name__icontains=f" {query}"))
+    prefix = normalize(query)
+    found = [
+        Suggestion(normalize(name), kind, pk, name)
+        for kind, queryset in ((MENU, menus), (DISH, dishes))
+        for pk, name in queryset.order_by("name").values_list("pk", "name")[:limit]
+    ]
+    found.sort(key=lambda suggestion: (not suggestion.key.startswith(prefix), suggestion))
+    return found[:limit]
@@ -0,0 +1,273 @@
+"""
+Micro benchmarks of the menu app, run by ``manage.py benchmark``.
+"""
+
+import functools
+import itertools
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, override_settings
+from rest_framework.test import force_authenticate
+
+from core.benchmarks import per_call, scenario
+from menu import similarity
+from menu.autocomplete import AutocompleteIndex, suggest_from_database
+from menu.bulk import DishAdjustment, clone_menu
+from menu.catalog_index import CatalogIndex, clear_index, get_index
+from menu.facets import dish_facets
+from menu.models import Dish, Menu
+from menu.views import DishViewSet, MenuViewSet
+
+
+def create_menu(name: str, dish_count: int) -> Menu:
+    """Create a menu with ``dish_count`` dishes."""
+    menu = Menu.objects.create(name=name)
+    Dish.objects.bulk_create(
+        Dish(menu=menu, name=f"Dish {index}", price=Decimal("9.90"), prep_time=10, image=f"uploads/dish/{index}.jpg")
+        for index in range(dish_count)
+    )
+    return menu
+
+
+def clone_per_dish(menu: Menu, name: str) -> Menu:
+    """Copy a menu the way clients did before the clone action: one INSERT per dish."""
+    clone = Menu.objects.create(name=name, description=menu.description)
+    for dish in menu.dishes.all():
+        dish.pk = None
+        dish.menu = clone
+        dish.price = (dish.price * Decimal("1.10")).quantize(Decimal("0.01"))
+        dish.save()
+    return clone
+
+
+@scenario("clone")
+def clone(write: Callable[[str], None], iterations: int) -> None:
+    """Cost of cloning a menu by INSERT ... SELECT compared to one INSERT per dish."""
+    adjustment = DishAdjustment(price_percent=Decimal(10))
+    repeat = max(iterations // 100, 1)
+    for dish_count in (10, 100, 1000):
+        menu = create_menu(f"Benchmark {dish_count}", dish_count)
+        results = []
+        for label, func in (
+            ("insert-select", lambda name, menu=menu: clone_menu(menu, name, adjustment=adjustment)),
+            ("per dish", lambda name, menu=menu: clone_per_dish(menu, name)),
+        ):
+            start = perf_counter()
+            for index in range(repeat):
+                func(f"{label} {dish_count} {index}")
+            results.append(f"{label} {(perf_counter() - start) / repeat * 1000:8.2f} ms")
+        write(f"{dish_count:5} dishes: " + "  ".join(results))
+
+
+@scenario("facets")
+def facets(write: Callable[[str], None], iterations: int) -> None:
+    """Dish list with facet counts in one request compared to one list request per facet."""
+    menus = [Menu.objects.create(name=f"Facets {index}") for index in range(10)]
+    Dish.objects.bulk_create(
+        Dish(
+            menu=menus[index % len(menus)],
+            name=f"Dish {index}",
+            price=Decimal(index % 80),
+            prep_time=index % 90,
+            is_vegetarian=index % 3 == 0,
+        )
+        for index in range(2000)
+    )
+    factory = RequestFactory(SERVER_NAME="localhost")
+    view = DishViewSet.as_view({"get": "list"})
+
+    def get(**params) -> None:
+        view(factory.get("/api/menu/dishes/", params)).render()
+
+    def per_facet_requests() -> None:
+        # Price and preparation time buckets are counted client-side from the full list.
+        get()
+        get(is_vegetarian="true")
+        get(is_vegetarian="false")
+        for menu in menus:
+            get(menu=menu.pk)
+
+    def uncached() -> None:
+        cache.clear()
+        get(facets="true")
+
+    repeat = max(iterations // 200, 1)
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"]):
+        write(f"one request per facet:  {per_call(per_facet_requests, repeat) * 1000:8.2f} ms")
+        write(f"facets, uncached:       {per_call(uncached, repeat) * 1000:8.2f} ms")
+        write(f"facets, cached:         {per_call(lambda: get(facets='true'), repeat) * 1000:8.2f} ms")
+    write(f"facet query alone:      {per_call(lambda: dish_facets(Dish.objects.all()), repeat) * 1000:8.2f} ms")
+
+
+@scenario("catalog_index")
+def catalog_index(write: Callable[[str], None], iterations: int) -> None:
+    """Memory of the in-process catalog index and dish list latency with it compared to the ORM."""
+    menus = [Menu.objects.create(name=f"Index {index}") for index in range(10)]
+    Dish.objects.bulk_create(
+        Dish(
+            menu=menus[index % len(menus)],
+            name=f"Dish {index}",
+            price=Decimal(index % 80),
+            prep_time=index % 90,
+            is_vegetarian=index % 3 == 0,
+        )
+        for index in range(2000)
+    )
+    tracemalloc.start()
+    CatalogIndex.load("default")
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    write(f"index of {len(menus)} menus, 2000 dishes: {size / 1024:8.0f} KiB")
+
+    factory = RequestFactory(SERVER_NAME="localhost")
+    view = DishViewSet.as_view({"get": "list"})
+    enabled = settings.MENU_CATALOG_INDEX
+    repeat = max(iterations // 200, 1)
+    try:
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"]):
+            for label, params in (
+                ("all dishes", {}),
+                ("one menu", {"menu": menus[0].pk}),
+                ("price range", {"price__gte": 20, "price__lte": 30, "ordering": "-price"}),
+            ):
+
+                def get(params=params) -> None:
+                    view(factory.get("/api/menu/dishes/", params)).render()
+
+                settings.MENU_CATALOG_INDEX = False
+                orm = per_call(get, repeat)
+                settings.MENU_CATALOG_INDEX = True
+                get_index()
+                indexed = per_call(get, repeat)
+                write(f"{label + ':':13} orm {orm * 1000:8.2f} ms  index {indexed * 1000:8.2f} ms")
+    finally:
+        settings.MENU_CATALOG_INDEX = enabled
+        clear_index()
+
+
+@scenario("autocomplete")
+def autocomplete(write: Callable[[str], None], iterations: int) -> None:
+    """Suggestions from the prefix index compared to the database and to the ?search= dish list."""
+    words = ("Spicy", "Grilled", "Roast", "Creamy", "Smoked", "Crispy", "Garlic", "Lemon")
+    foods = ("Chicken", "Salmon", "Carrot", "Pasta", "Risotto", "Burger", "Salad", "Tart")
+    menus = [Menu.objects.create(name=f"Autocomplete {index}") for index in range(20)]
+    Dish.objects.bulk_create(
+        Dish(
+            menu=menus[index % len(menus)],
+            name=f"{words[index % 8]} {foods[index // 8 % 8]} {index}",
+            price=10,
+            prep_time=5,
+        )
+        for index in range(5000)
+    )
+    start = perf_counter()
+    index = AutocompleteIndex.build("default")
+    write(f"index of {len(index.names)} names built in {(perf_counter() - start) * 1000:.1f} ms")
+
+    factory = RequestFactory(SERVER_NAME="localhost")
+    view = DishViewSet.as_view({"get": "list"})
+    repeat = max(iterations // 100, 1)
+
+    def search(query: str) -> None:
+        view(factory.get("/api/menu/dishes/", {"search": query})).render()
+
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"]):
+        for query in ("c", "cri", "salmon", "zzz"):
+            indexed = per_call(functools.partial(index.suggest, query, 10), iterations)
+            database = per_call(functools.partial(suggest_from_database, query, 10, False), repeat)
+            listed = per_call(functools.partial(search, query), repeat)
+            write(
+                f"q={query!r:9} index {indexed * 1e6:8.1f} us  database {database * 1000:7.2f} ms  "
+                f"?search= {listed * 1000:8.2f} ms"
+            )
+
+
+@scenario("similarity")
+def similar_dishes(write: Callable[[str], None], iterations: int) -> None:
+    """Build time and size of the similar dishes index, and query latency over 100,000 dishes."""
+    words = ("Spicy", "Grilled", "Roast", "Creamy", "Smoked", "Crispy", "Garlic", "Lemon", "Sweet", "Baked")
+    foods = ("Chicken", "Salmon", "Carrot", "Pasta", "Risotto", "Burger", "Salad", "Tart", "Soup", "Curry")
+    sides = ("rice", "fries", "greens", "bread", "beans", "potatoes", "couscous", "slaw")
+    menus = [Menu.objects.create(name=f"Similarity {index}") for index in range(50)]
+    Dish.objects.bulk_create(
+        (
+            Dish(
+                menu=menus[index % len(menus)],
+                name=f"{words[index % 10]} {foods[index // 10 % 10]}",
+                description=f"With {sides[index % 8]} and {sides[index // 8 % 8]}, {words[index // 100 % 10].lower()}",
+                price=Decimal(5 + index % 60),
+                prep_time=5 + index % 55,
+                is_vegetarian=index % 4 == 0,
+            )
+            for index in range(100_000)
+        ),
+        batch_size=5000,
+    )
+    start = perf_counter()
+    index = similarity.SimilarityIndex.build("default")
+    write(f"index of {len(index)} dishes built in {perf_counter() - start:.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "similar_dishes.npz"
+        index.save(path)
+        write(f"file size:            {path.stat().st_size / 1024 / 1024:8.1f} MiB")
+        start = perf_counter()
+        similarity.SimilarityIndex.load(path)
+        write(f"load:                 {(perf_counter() - start) * 1000:8.1f} ms")
+
+        dish_ids = index.ids[:: max(len(index) // 100, 1)].tolist()
+        ids = itertools.cycle(dish_ids)
+        scored = per_call(lambda: index._similar(next(ids), 10), iterations)
+        write(f"uncached query:       {scored * 1000:8.2f} ms")
+        cached = per_call(lambda: index.similar(dish_ids[0], 10), iterations)
+        write(f"cached query:         {cached * 1e6:8.1f} us")
+
+        view = DishViewSet.as_view({"get": "similar"})
+        request = RequestFactory().get("/")
+        try:
+            with override_settings(MENU_SIMILARITY=True, MENU_SIMILARITY_PATH=str(path)):
+                endpoint = per_call(lambda: view(request, pk=str(dish_ids[0])).render(), max(iterations // 10, 1))
+        finally:
+            similarity.clear_index()
+        write(f"endpoint (cached):    {endpoint * 1000:8.2f} ms")
+
+
+@scenario("nested_dishes")
+def nested_dishes(write: Callable[[str], None], iterations: int) -> None:
+    """Menu detail of a 2,000-dish menu whole and by page, and the menu list with dish previews."""
+    catering = create_menu("Catering", 2000)
+    menus = [create_menu(f"Preview {index}", 20) for index in range(50)]
+    user = get_user_model().objects.create_user("nested-dishes@example.com", "benchmark")
+    factory = RequestFactory(SERVER_NAME="localhost")
+    detail = MenuViewSet.as_view({"get": "retrieve"})
+    menu_list = MenuViewSet.as_view({"get": "list"})
+    dish_list = DishViewSet.as_view({"get": "list"})
+    repeat = max(iterations // 100, 1)
+
+    def get(view, params=None, **kwargs) -> int:
+        request = factory.get("/", params or {})
+        force_authenticate(request, user)
+        return len(view(request, **kwargs).render().content)
+
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "localhost"]):
+        for label, params in (("all dishes", None), ("dishes_limit=50", {"dishes_limit": 50})):
+            size = get(detail, params, pk=str(catering.pk))
+            latency = per_call(functools.partial(get, detail, params, pk=str(catering.pk)), repeat)
+            write(f"detail, {label + ':':17} {latency * 1000:8.2f} ms  {size / 1024:8.1f} KiB")
+
+        def follow_ups() -> None:
+            get(menu_list)
+            for menu in menus:
+                get(dish_list, {"menu": menu.pk})
+
+        write(f"list + {len(menus)} dish lists:  {per_call(follow_ups, repeat) * 1000:8.2f} ms")
+        preview = per_call(functools.partial(get, menu_list, {"preview": 3}), repeat)
+        write(f"list with preview=3:    {preview * 1000:8.2f} ms")
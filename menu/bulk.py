@@ -0,0 +1,150 @@
+"""
+Set-based operations on many dishes at once.
+
+``adjust_dishes`` applies a ``DishAdjustment`` to a dish queryset with a
+single ``UPDATE`` (e.g. ``SET price = ROUND(price * 1.05, 2)``) instead of
+loading and saving every dish. ``clone_menu`` copies a menu's dishes with a
+single ``INSERT ... SELECT``. Used by the menu API and the admin actions.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Max, Min, Q, QuerySet, Sum, Value
+from django.db.models.functions import Greatest, Now, Round
+
+from menu.catalog import mark_changed
+from menu.models import Dish, Menu
+from menu.snapshots import republish_later
+
+ROUNDING_STEPS = (Decimal("0.01"), Decimal("0.05"), Decimal("0.10"), Decimal("0.50"), Decimal("1.00"))
+
+PRICE_FIELD = Dish._meta.get_field("price")
+
+
+@dataclass(frozen=True)
+class DishAdjustment:
+    """Changes applied to every selected dish."""
+
+    # Relative price change, e.g. 5 for +5%; applied before ``price_amount``.
+    price_percent: Decimal | None = None
+    # Absolute price change, e.g. -0.50.
+    price_amount: Decimal | None = None
+    # New prices are rounded to a multiple of this step.
+    round_to: Decimal = Decimal("0.01")
+    is_vegetarian: bool | None = None
+    prep_time: int | None = None
+
+    @property
+    def changes_price(self) -> bool:
+        return self.price_percent is not None or self.price_amount is not None
+
+    def error(self) -> str | None:
+        """Return why the adjustment is invalid, or None."""
+        if not self.changes_price and self.is_vegetarian is None and self.prep_time is None:
+            return "Specify at least one change."
+        if self.price_percent is not None and self.price_percent <= -100:
+            return "A price cannot be reduced by 100% or more."
+        if self.round_to not in ROUNDING_STEPS:
+            return f"Prices can be rounded to {', '.join(map(str, ROUNDING_STEPS))}."
+        return None
+
+    def price_expression(self):
+        """Return the SQL expression computing the new price from the current one."""
+        price = F("price")
+        if self.price_percent is not None:
+            price = price * Value(1 + self.price_percent / 100, output_field=PRICE_FIELD)
+        if self.price_amount is not None:
+            price = price + Value(self.price_amount, output_field=PRICE_FIELD)
+        step = Value(self.round_to, output_field=PRICE_FIELD)
+        rounded = Round(Round(price / step) * step, PRICE_FIELD.decimal_places, output_field=PRICE_FIELD)
+        return Greatest(rounded, Value(Decimal("0"), output_field=PRICE_FIELD), output_field=PRICE_FIELD)
+
+    def update_kwargs(self) -> dict:
+        """Return the columns to set, including ``updated_at`` which ``update()`` does not touch."""
+        kwargs = {"updated_at": Now()}
+        if self.changes_price:
+            kwargs["price"] = self.price_expression()
+        if self.is_vegetarian is not None:
+            kwargs["is_vegetarian"] = self.is_vegetarian
+        if self.prep_time is not None:
+            kwargs["prep_time"] = self.prep_time
+        return kwargs
+
+
+def preview(dishes: QuerySet[Dish], adjustment: DishAdjustment) -> dict:
+    """Return the number of selected dishes and menus and the prices before and after, in one query."""
+    new_price = adjustment.price_expression() if adjustment.changes_price else F("price")
+    aggregates = {
+        "dishes": Count("pk"),
+        "menus": Count("menu", distinct=True),
+        "price_min": Min("price"),
+        "price_max": Max("price"),
+        "price_total": Sum("price"),
+        "new_price_min": Min(new_price, output_field=PRICE_FIELD),
+        "new_price_max": Max(new_price, output_field=PRICE_FIELD),
+        "new_price_total": Sum(new_price, output_field=PRICE_FIELD),
+    }
+    if adjustment.is_vegetarian is not None:
+        aggregates["is_vegetarian_changes"] = Count("pk", filter=~Q(is_vegetarian=adjustment.is_vegetarian))
+    if adjustment.prep_time is not None:
+        aggregates["prep_time_changes"] = Count("pk", filter=~Q(prep_time=adjustment.prep_time))
+    return dishes.order_by().aggregate(**aggregates)
+
+
+def adjust_dishes(dishes: QuerySet[Dish], adjustment: DishAdjustment, dry_run: bool = False) -> dict:
+    """
+    Apply ``adjustment`` to ``dishes`` with one ``UPDATE``, or only preview it.
+
+    Returns the ``preview`` figures and whether the change was applied. The
+    catalog version is bumped, and published menus are republished with
+    ``MENU_AUTO_PUBLISH``, once the update commits.
+    """
+    using = router.db_for_write(Dish)
+    dishes = dishes.using(using)
+    with transaction.atomic(using=using):
+        report = preview(dishes, adjustment)
+        if not dry_run:
+            # Read before the UPDATE, which may change the rows the filter selects.
+            menu_ids = list(dishes.order_by().values_list("menu_id", flat=True).distinct())
+            report["dishes"] = dishes.order_by().update(**adjustment.update_kwargs())
+            mark_changed(using)
+            republish_later(menu_ids, using)
+    return {**report, "applied": not dry_run}
+
+
+def clone_menu(menu: Menu, name: str, description: str | None = None, adjustment: DishAdjustment | None = None) -> Menu:
+    """
+    Copy ``menu`` and its dishes in one transaction, optionally adjusting the copied prices.
+
+    The dishes are copied by one ``INSERT ... SELECT`` whatever their number.
+    Images are shared by reference: the copies point at the same files.
+    """
+    using = router.db_for_write(Menu)
+    connection = connections[using]
+    columns = {field.column: F(field.attname) for field in Dish._meta.concrete_fields if not field.primary_key}
+    columns["created_at"] = columns["updated_at"] = Now()
+    if adjustment is not None and adjustment.changes_price:
+        columns["price"] = adjustment.price_expression()
+
+    with transaction.atomic(using=using):
+        clone = Menu.objects.using(using).create(
+            name=name, description=menu.description if description is None else description
+        )
+        columns["menu_id"] = Value(clone.pk)
+        # Only expressions, so the SELECT lists them in the order of ``columns``.
+        select = (
+            Dish.objects.using(using)
+            .filter(menu=menu)
+            .order_by("pk")
+            .values(**{f"_{column}": expression for column, expression in columns.items()})
+        )
+        select_sql, params = select.query.get_compiler(using).as_sql()
+        column_sql = ", ".join(connection.ops.quote_name(column) for column in columns)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {connection.ops.quote_name(Dish._meta.db_table)} ({column_sql}) {select_sql}", params
+            )
+        mark_changed(using)
+    return clone
@@ -0,0 +1,58 @@
+"""
+Version of the menu catalog.
+
+Every committed change to menus or dishes bumps the version and sends
+``catalog_changed``. Model saves and deletes do this through
+``menu.signals``; bulk updates and inserts, which bypass model signals, call
+``mark_changed`` themselves. Caches of catalog data key on ``catalog_version``
+or listen to ``catalog_changed``.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+CATALOG_VERSION_KEY = "menu:catalog-version"
+
+# Sent after a change to the catalog was committed, with the new ``version``.
+catalog_changed = Signal()
+
+
+def initial_version() -> int:
+    """
+    Return the version to start from when the cache has none.
+
+    The clock in microseconds: after an eviction the count restarts above
+    every version handed out before, unless the catalog changed more than a
+    million times a second.
+    """
+    return time.time_ns() // 1000
+
+
+def catalog_version() -> int:
+    """Return the current catalog version."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = initial_version()
+        cache.add(CATALOG_VERSION_KEY, version, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_version() -> int:
+    """Increment the catalog version and notify the ``catalog_changed`` receivers."""
+    try:
+        version = cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Not set yet, or evicted: restart from the clock, which is above any earlier version.
+        cache.add(CATALOG_VERSION_KEY, initial_version(), timeout=None)
+        version = cache.incr(CATALOG_VERSION_KEY)
+    catalog_changed.send(sender=None, version=version)
+    return version
+
+
+def mark_changed(using: str | None = None) -> None:
+    """Bump the catalog version once the current transaction commits."""
+    transaction.on_commit(bump_version, using=using)
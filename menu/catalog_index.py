@@ -0,0 +1,372 @@
+"""
+In-process, read-only index of the menu catalog.
+
+With ``MENU_CATALOG_INDEX`` every worker keeps the whole catalog in memory:
+one ``__slots__`` entry per menu and dish holding its serialized
+representation and the values it is filtered and ordered by, plus sorted
+``array`` indexes of dish ids by menu, by ``is_vegetarian`` and by price. The
+list and retrieve requests of ``MenuViewSet`` and ``DishViewSet`` are then
+answered without SQL.
+
+The index is loaded by the first request (the warm-up requests, with
+``DJANGO_WARMUP``) and checked against ``catalog_version`` on every request.
+A new version, or an index older than ``MENU_CATALOG_INDEX_MAX_AGE``, is
+refreshed incrementally: rows updated since the last load (with a safety
+overlap) are read again and deleted rows are dropped. Workers only see each
+other's catalog versions through a shared cache (``CACHE_URL``); otherwise
+the maximum age bounds how stale an index gets.
+
+Answers match the ORM path: requests the index cannot answer identically
+return ``None`` and go to the database. These are unknown or invalid
+parameters, orderings by more than one field, facets, clients pinned to the
+primary after a write, and, on databases other than SQLite, text search and
+name ordering. Those depend on the database's case folding and collation;
+SQLite folds ASCII letters only and compares strings by code point, as done
+here. Ties in an ordering are broken by id, in reverse for descending
+orderings, the way SQLite scans the indexes of migration 0004.
+"""
+
+import bisect
+import logging
+import threading
+from array import array
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from time import monotonic
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max
+from rest_framework.filters import OrderingFilter, SearchFilter
+
+from core.db_router import is_pinned_to_primary
+from menu.catalog import catalog_version
+from menu.models import Dish, Menu
+
+logger = logging.getLogger(__name__)
+
+# Rows changed this long before the previous refresh are read again, for
+# transactions that committed after it with older timestamps.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Query parameters the index understands; any other one goes to the database.
+MENU_LIST_PARAMS = frozenset({"name", "search", "ordering", "format"})
+DISH_LIST_PARAMS = frozenset(
+    {"menu", "is_vegetarian", "price__gte", "price__lte", "prep_time__lte", "search", "ordering", "format"}
+)
+BOOLEANS = {"true": True, "false": False}
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def fold(text: str) -> str:
+    """Lower-case the ASCII letters of ``text``, like SQLite's ``LIKE``."""
+    return text.translate(_ASCII_LOWER)
+
+
+class MenuEntry:
+    """A menu in the index."""
+
+    __slots__ = ("created_at", "data", "id", "name", "search_text")
+
+    def __init__(self, menu: Menu, data: dict):
+        self.id = menu.pk
+        self.name = menu.name
+        self.created_at = menu.created_at
+        self.search_text = (fold(menu.name), fold(menu.description))
+        self.data = data
+
+
+class DishEntry:
+    """A dish in the index."""
+
+    __slots__ = (
+        "created_at",
+        "data",
+        "id",
+        "image",
+        "is_vegetarian",
+        "menu_id",
+        "name",
+        "prep_time",
+        "price",
+        "search_text",
+    )
+
+    def __init__(self, dish: Dish, data: dict):
+        self.id = dish.pk
+        self.menu_id = dish.menu_id
+        self.name = dish.name
+        self.price = dish.price
+        self.prep_time = dish.prep_time
+        self.is_vegetarian = dish.is_vegetarian
+        self.created_at = dish.created_at
+        self.search_text = (fold(dish.name), fold(dish.description))
+        self.image = data["image"]
+        self.data = data
+
+    def represent(self, request) -> dict:
+        """Return the serialized dish; image URLs are absolute, as with the serializer given a request."""
+        if self.image is None:
+            return self.data
+        return {**self.data, "image": request.build_absolute_uri(self.image)}
+
+
+def serialize_menus(menus) -> dict[int, MenuEntry]:
+    """Build the entries of ``menus``."""
+    from menu.serializers import MenuSerializer
+
+    menus = list(menus)
+    return {
+        menu.pk: MenuEntry(menu, data) for menu, data in zip(menus, MenuSerializer(menus, many=True).data, strict=True)
+    }
+
+
+def serialize_dishes(dishes) -> dict[int, DishEntry]:
+    """Build the entries of ``dishes``; image URLs stay relative until a request asks for them."""
+    from menu.serializers import DishSerializer
+
+    dishes = list(dishes)
+    return {
+        dish.pk: DishEntry(dish, data)
+        for dish, data in zip(dishes, DishSerializer(dishes, many=True).data, strict=True)
+    }
+
+
+class CatalogIndex:
+    """Immutable snapshot of the catalog with its secondary indexes; refreshing builds a new one."""
+
+    def __init__(self, menus: dict[int, MenuEntry], dishes: dict[int, DishEntry], version: int, watermark):
+        self.menus = menus
+        self.dishes = dishes
+        self.version = version
+        # Latest updated_at of the loaded rows.
+        self.watermark = watermark
+        self.loaded_at = monotonic()
+
+        self.dish_ids = array("q", sorted(dishes))
+        by_menu: dict[int, list[int]] = {}
+        for dish_id in self.dish_ids:
+            by_menu.setdefault(dishes[dish_id].menu_id, []).append(dish_id)
+        self.by_menu = {menu_id: array("q", ids) for menu_id, ids in by_menu.items()}
+        self.by_vegetarian = {
+            value: array("q", (dish_id for dish_id in self.dish_ids if dishes[dish_id].is_vegetarian is value))
+            for value in (True, False)
+        }
+        by_price = sorted(self.dish_ids, key=lambda dish_id: (dishes[dish_id].price, dish_id))
+        self.by_price = array("q", by_price)
+        self.prices = [dishes[dish_id].price for dish_id in by_price]
+
+    @classmethod
+    def load(cls, using: str) -> "CatalogIndex":
+        """Read the whole catalog."""
+        version = catalog_version()
+        menus = serialize_menus(Menu.objects.using(using).order_by("pk"))
+        dishes = serialize_dishes(Dish.objects.using(using).order_by("pk"))
+        return cls(menus, dishes, version, cls.latest_update(using))
+
+    @staticmethod
+    def latest_update(using: str):
+        """Return the latest updated_at of the catalog."""
+        menus = Menu.objects.using(using).aggregate(latest=Max("updated_at"))["latest"]
+        dishes = Dish.objects.using(using).aggregate(latest=Max("updated_at"))["latest"]
+        return max((value for value in (menus, dishes) if value is not None), default=None)
+
+    def refresh(self, using: str) -> "CatalogIndex":
+        """Return an index with the rows changed since this one was loaded."""
+        if self.watermark is None:
+            return self.load(using)
+        version = catalog_version()
+        since = self.watermark - REFRESH_OVERLAP
+        watermark = self.latest_update(using)
+
+        menus = self.refreshed_entries(Menu.objects.using(using), self.menus, since, serialize_menus)
+        dishes = self.refreshed_entries(Dish.objects.using(using), self.dishes, since, serialize_dishes)
+        return CatalogIndex(menus, dishes, version, watermark)
+
+    @staticmethod
+    def refreshed_entries(queryset, entries: dict, since, serialize) -> dict:
+        """Return ``entries`` without the deleted rows of ``queryset`` and with the ones changed since ``since``."""
+        ids = set(queryset.values_list("pk", flat=True))
+        refreshed = {row_id: entries[row_id] for row_id in ids if row_id in entries}
+        refreshed.update(serialize(queryset.filter(updated_at__gte=since)))
+        # Rows unknown although older than ``since``, e.g. committed long after they were saved.
+        if missing := ids - refreshed.keys():
+            refreshed.update(serialize(queryset.filter(pk__in=missing)))
+        return refreshed
+
+    # --- Queries ---
+
+    def search(self, entries: list, request) -> list | None:
+        """Keep the entries matching every search term in one of their text fields."""
+        terms = SearchFilter().get_search_terms(request)
+        if not terms:
+            return entries
+        if not exact_text_semantics() or not all(term.isascii() for term in terms):
+            return None
+        folded = [fold(term) for term in terms]
+        return [entry for entry in entries if all(any(term in text for text in entry.search_text) for term in folded)]
+
+    def order(self, entries: list, request, view, keys: dict) -> list | None:
+        """Order the entries (given in id order) like ``OrderingFilter``; ``keys`` maps fields to sort keys."""
+        ordering = OrderingFilter().get_ordering(request, view.get_queryset(), view)
+        if not ordering:
+            return entries
+        if len(ordering) > 1:
+            return None
+        field = ordering[0].lstrip("-")
+        if field == "name" and not exact_text_semantics():
+            return None
+        ordered = sorted(entries, key=keys[field])
+        return ordered[::-1] if ordering[0].startswith("-") else ordered
+
+    def menu_list(self, request, view) -> list | None:
+        """Answer the menu list, or return ``None``."""
+        params = request.query_params
+        if not MENU_LIST_PARAMS.issuperset(params):
+            return None
+        entries = [self.menus[menu_id] for menu_id in sorted(self.menus)]
+        if request.user.is_anonymous:
+            entries = [entry for entry in entries if entry.id in self.by_menu]
+        if name := params.get("name", "").strip():
+            entries = [entry for entry in entries if entry.name == name]
+        entries = self.search(entries, request)
+        if entries is None:
+            return None
+        keys = {
+            "name": lambda entry: entry.name,
+            "created_at": lambda entry: entry.created_at,
+            "dishes_count": lambda entry: len(self.by_menu.get(entry.id, ())),
+        }
+        entries = self.order(entries, request, view, keys)
+        return None if entries is None else [entry.data for entry in entries]
+
+    def menu_detail(self, request, menu_id: int) -> dict | None:
+        """Answer the menu detail, or return ``None``."""
+        entry = self.menus.get(menu_id)
+        dish_ids = self.by_menu.get(menu_id, ())
+        if entry is None or (request.user.is_anonymous and not dish_ids):
+            return None
+        return {**entry.data, "dishes": [self.dishes[dish_id].represent(request) for dish_id in dish_ids]}
+
+    def dish_ids_matching(self, params) -> list[int] | None:
+        """Return the ids of the dishes passing the ``DishFilter`` parameters, in id order."""
+        menu = params.get("menu") or None
+        is_vegetarian = params.get("is_vegetarian") or None
+        try:
+            menu = int(menu) if menu is not None else None
+            bounds = {
+                name: Decimal(params[name])
+                for name in ("price__gte", "price__lte", "prep_time__lte")
+                if params.get(name)
+            }
+        except (ValueError, InvalidOperation):
+            return None
+        if (menu is not None and menu not in self.menus) or (is_vegetarian not in (None, *BOOLEANS)):
+            return None
+        if not all(bound.is_finite() for bound in bounds.values()):
+            return None
+
+        if menu is not None:
+            dish_ids = list(self.by_menu.get(menu, ()))
+        elif is_vegetarian is not None:
+            dish_ids = list(self.by_vegetarian[BOOLEANS[is_vegetarian]])
+        elif "price__gte" in bounds or "price__lte" in bounds:
+            start = bisect.bisect_left(self.prices, bounds["price__gte"]) if "price__gte" in bounds else 0
+            end = bisect.bisect_right(self.prices, bounds["price__lte"]) if "price__lte" in bounds else len(self.prices)
+            dish_ids = sorted(self.by_price[start:end])
+        else:
+            dish_ids = list(self.dish_ids)
+
+        def matches(dish: DishEntry) -> bool:
+            return (
+                (is_vegetarian is None or dish.is_vegetarian is BOOLEANS[is_vegetarian])
+                and ("price__gte" not in bounds or dish.price >= bounds["price__gte"])
+                and ("price__lte" not in bounds or dish.price <= bounds["price__lte"])
+                and ("prep_time__lte" not in bounds or dish.prep_time <= bounds["prep_time__lte"])
+            )
+
+        return [dish_id for dish_id in dish_ids if matches(self.dishes[dish_id])]
+
+    def dish_list(self, request, view) -> list | None:
+        """Answer the dish list, or return ``None``."""
+        params = request.query_params
+        if not DISH_LIST_PARAMS.issuperset(params):
+            return None
+        dish_ids = self.dish_ids_matching(params)
+        if dish_ids is None:
+            return None
+        entries = self.search([self.dishes[dish_id] for dish_id in dish_ids], request)
+        if entries is None:
+            return None
+        keys = {
+            "price": lambda entry: entry.price,
+            "prep_time": lambda entry: entry.prep_time,
+            "name": lambda entry: entry.name,
+            "created_at": lambda entry: entry.created_at,
+        }
+        entries = self.order(entries, request, view, keys)
+        return None if entries is None else [entry.represent(request) for entry in entries]
+
+    def dish_detail(self, request, dish_id: int) -> dict | None:
+        """Answer the dish detail, or return ``None``."""
+        entry = self.dishes.get(dish_id)
+        return None if entry is None else entry.represent(request)
+
+
+def exact_text_semantics() -> bool:
+    """Return whether the database folds case and orders text the way the index does."""
+    return connections[router.db_for_read(Menu)].vendor == "sqlite"
+
+
+_index: CatalogIndex | None = None
+_refresh_lock = threading.Lock()
+
+
+def get_index() -> CatalogIndex | None:
+    """
+    Return the current catalog index, loading or refreshing it if needed.
+
+    While one thread refreshes, the others keep using the previous index.
+    """
+    global _index
+    index = _index
+    if (
+        index is not None
+        and index.version == catalog_version()
+        and monotonic() - index.loaded_at < settings.MENU_CATALOG_INDEX_MAX_AGE
+    ):
+        return index
+
+    if not _refresh_lock.acquire(blocking=index is None):
+        return index
+    try:
+        if _index is not index:
+            return _index
+        using = router.db_for_write(Menu)
+        start = monotonic()
+        _index = CatalogIndex.load(using) if index is None else index.refresh(using)
+        logger.info(
+            "catalog index %s: %d menus, %d dishes in %.1f ms",
+            "loaded" if index is None else "refreshed",
+            len(_index.menus),
+            len(_index.dishes),
+            (monotonic() - start) * 1000,
+        )
+        return _index
+    finally:
+        _refresh_lock.release()
+
+
+def clear_index() -> None:
+    """Drop the catalog index of this process."""
+    global _index
+    with _refresh_lock:
+        _index = None
+
+
+def index_for(request) -> CatalogIndex | None:
+    """Return the catalog index if it may answer ``request``."""
+    if not settings.MENU_CATALOG_INDEX or is_pinned_to_primary(request):
+        return None
+    return get_index()
@@ -0,0 +1,88 @@
+"""
+Facet counts of the dish list.
+
+All facets (vegetarian, price and preparation time buckets, menu) of a dish
+queryset come from one query: the dishes are grouped by menu, each group
+counts its buckets with conditional aggregates (``Count(filter=Q(...))``) and
+the groups are summed up here. Results are cached per catalog version.
+"""
+
+import hashlib
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, QuerySet
+
+from menu.catalog import catalog_version
+from menu.models import Dish
+
+# (key, lower bound, upper bound); bounds are inclusive below, exclusive above.
+PRICE_BUCKETS = (
+    ("0-10", None, Decimal(10)),
+    ("10-20", Decimal(10), Decimal(20)),
+    ("20-50", Decimal(20), Decimal(50)),
+    ("50+", Decimal(50), None),
+)
+PREP_TIME_BUCKETS = (
+    ("0-15", None, 15),
+    ("15-30", 15, 30),
+    ("30-60", 30, 60),
+    ("60+", 60, None),
+)
+
+
+def bucket_filter(field: str, lower, upper) -> Q:
+    """Return the condition selecting the values of ``field`` in a bucket."""
+    condition = Q()
+    if lower is not None:
+        condition &= Q(**{f"{field}__gte": lower})
+    if upper is not None:
+        condition &= Q(**{f"{field}__lt": upper})
+    return condition
+
+
+def dish_facets(dishes: QuerySet[Dish]) -> dict:
+    """Return the facet counts of ``dishes`` in one query."""
+    aggregates = {
+        "total": Count("pk"),
+        "vegetarian": Count("pk", filter=Q(is_vegetarian=True)),
+    }
+    for key, lower, upper in PRICE_BUCKETS:
+        aggregates[f"price_{key}"] = Count("pk", filter=bucket_filter("price", lower, upper))
+    for key, lower, upper in PREP_TIME_BUCKETS:
+        aggregates[f"prep_time_{key}"] = Count("pk", filter=bucket_filter("prep_time", lower, upper))
+
+    groups = list(dishes.order_by().values("menu_id", "menu__name").annotate(**aggregates).order_by("menu__name"))
+
+    def total(name: str) -> int:
+        return sum(group[name] for group in groups)
+
+    return {
+        "count": total("total"),
+        "is_vegetarian": {"true": total("vegetarian"), "false": total("total") - total("vegetarian")},
+        "price": {key: total(f"price_{key}") for key, _, _ in PRICE_BUCKETS},
+        "prep_time": {key: total(f"prep_time_{key}") for key, _, _ in PREP_TIME_BUCKETS},
+        "menu": [{"id": group["menu_id"], "name": group["menu__name"], "count": group["total"]} for group in groups],
+    }
+
+
+def facets_cache_key(params: list[tuple[str, str]]) -> str:
+    """Return the cache key of the facets of a dish list request in the current catalog version."""
+    digest = hashlib.sha256(urlencode(sorted(params)).encode()).hexdigest()[:32]
+    return f"menu:dish-facets:{catalog_version()}:{digest}"
+
+
+def cached_dish_facets(dishes: QuerySet[Dish], params: list[tuple[str, str]]) -> dict:
+    """
+    Return the facet counts of ``dishes``, the dish list filtered by query ``params``.
+
+    Cached until the catalog changes, or for ``MENU_FACETS_CACHE_TIMEOUT``.
+    """
+    key = facets_cache_key(params)
+    facets = cache.get(key)
+    if facets is None:
+        facets = dish_facets(dishes)
+        cache.set(key, facets, settings.MENU_FACETS_CACHE_TIMEOUT)
+    return facets
@@ -0,0 +1,31 @@
+"""
+Filters for the menu API.
+"""
+
+from django.db.models import QuerySet
+from django_filters import rest_framework as filters
+
+from menu.models import Dish
+
+
+class DishFilter(filters.FilterSet):
+    """Filters of the dish list; each one is backed by an index of Dish."""
+
+    is_vegetarian = filters.BooleanFilter(method="filter_is_vegetarian")
+    price__gte = filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price__lte = filters.NumberFilter(field_name="price", lookup_expr="lte")
+    prep_time__lte = filters.NumberFilter(field_name="prep_time", lookup_expr="lte")
+
+    class Meta:
+        model = Dish
+        fields = ("menu", "is_vegetarian", "price__gte", "price__lte", "prep_time__lte")
+
+    def filter_is_vegetarian(self, queryset: QuerySet[Dish], name: str, value: bool) -> QuerySet[Dish]:
+        """
+        Keep the dishes whose vegetarian flag is ``value``.
+
+        ``is_vegetarian=True`` compiles to a bare ``WHERE is_vegetarian``, which
+        SQLite cannot match to an index; ``IN (...)`` is an equality it can seek
+        on the indexes starting with (or following ``menu_id`` by) the flag.
+        """
+        return queryset.filter(is_vegetarian__in=[value])
@@ -0,0 +1,42 @@
+"""
+Forms for the Menu app.
+"""
+
+from decimal import Decimal
+
+from django import forms
+from django.utils.translation import gettext_lazy as _
+
+from menu.bulk import ROUNDING_STEPS, DishAdjustment
+
+
+class DishAdjustmentForm(forms.Form):
+    """Form of the admin action adjusting the selected dishes."""
+
+    price_percent = forms.DecimalField(
+        label=_("price change (%)"), max_digits=6, decimal_places=2, required=False, help_text=_("e.g. 5 or -10")
+    )
+    price_amount = forms.DecimalField(
+        label=_("price change (amount)"), max_digits=10, decimal_places=2, required=False, help_text=_("e.g. 0.50")
+    )
+    round_to = forms.TypedChoiceField(
+        label=_("round prices to"),
+        choices=[(str(step), str(step)) for step in ROUNDING_STEPS],
+        coerce=Decimal,
+        initial=str(ROUNDING_STEPS[0]),
+    )
+    is_vegetarian = forms.NullBooleanField(
+        label=_("is vegetarian"),
+        widget=forms.Select(choices=[("", _("unchanged")), ("true", _("yes")), ("false", _("no"))]),
+        required=False,
+    )
+    prep_time = forms.IntegerField(label=_("preparation time"), min_value=0, required=False)
+
+    def clean(self) -> dict:
+        cleaned_data = super().clean()
+        if not self.errors:
+            adjustment = DishAdjustment(**cleaned_data)
+            if error := adjustment.error():
+                raise forms.ValidationError(error)
+            cleaned_data["adjustment"] = adjustment
+        return cleaned_data
@@ -0,0 +1,39 @@
+# Prefix indexes for the admin search (``^name``, i.e. ``UPPER(name::text) LIKE 'X%'``).
+# PostgreSQL only; the query shape of other databases cannot use them.
+
+from django.db import migrations
+
+INDEXES = (
+    ("menu_menu", "menu_menu_name_upper_prefix"),
+    ("menu_dish", "menu_dish_name_upper_prefix"),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, index in INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} (UPPER(name::text) text_pattern_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for _, index in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction.
+    atomic = False
+
+    dependencies = [
+        ('menu', '0002_alter_menu_options_alter_menu_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0003_name_prefix_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dish',
+            name='menu',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='dishes', to='menu.menu', verbose_name='menu'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['menu', 'price'], name='dish_menu_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['menu', 'prep_time'], name='dish_menu_prep_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['is_vegetarian', 'price'], name='dish_veg_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['is_vegetarian', 'prep_time'], name='dish_veg_prep_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['price'], name='dish_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['prep_time'], name='dish_prep_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['name'], name='dish_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['created_at'], name='dish_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_dish_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menu',
+            name='published_version',
+            field=models.PositiveIntegerField(blank=True, editable=False, help_text='Version of the snapshot served to the public, if published', null=True, verbose_name='published version'),
+        ),
+        migrations.CreateModel(
+            name='MenuSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='version')),
+                ('etag', models.CharField(max_length=66, verbose_name='ETag')),
+                ('body', models.BinaryField(verbose_name='body')),
+                ('body_gzip', models.BinaryField(verbose_name='gzip body')),
+                ('body_br', models.BinaryField(blank=True, default=b'', verbose_name='Brotli body')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='created at')),
+                ('menu', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='menu.menu', verbose_name='menu')),
+            ],
+            options={
+                'verbose_name': 'menu snapshot',
+                'verbose_name_plural': 'menu snapshots',
+                'constraints': [models.UniqueConstraint(fields=('menu', 'version'), name='menu_snapshot_version_unique')],
+            },
+        ),
+    ]
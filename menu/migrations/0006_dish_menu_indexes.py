@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_menu_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['menu', 'is_vegetarian', 'price'], name='dish_menu_veg_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['menu', 'name'], name='dish_menu_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dish',
+            index=models.Index(fields=['menu', 'created_at'], name='dish_menu_created_at_idx'),
+        ),
+    ]
@@ -8,6 +8,8 @@ from pathlib import Path
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from core.dirty_fields import DirtyFieldsMixin
+
 
 def dish_image_file_path(instance: "Dish", filename: str) -> str:
     """Generate file path for new dish image."""
@@ -16,13 +18,20 @@ def dish_image_file_path(instance: "Dish", filename: str) -> str:
     return str(Path("uploads") / "dish" / filename)
 
 
-class Menu(models.Model):
+class Menu(DirtyFieldsMixin, models.Model):
     """Menu object representing a card of dishes."""
 
     name = models.CharField(_("name"), max_length=255, unique=True)
     description = models.TextField(_("description"), blank=True)
     created_at = models.DateTimeField(_("created at"), auto_now_add=True)
     updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+    published_version = models.PositiveIntegerField(
+        _("published version"),
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Version of the snapshot served to the public, if published"),
+    )
 
     class Meta:
         verbose_name = _("menu")
@@ -32,7 +41,7 @@ class Menu(models.Model):
         return self.name
 
 
-class Dish(models.Model):
+class Dish(DirtyFieldsMixin, models.Model):
     """Dish object for the menu."""
 
     menu = models.ForeignKey(
@@ -40,6 +49,8 @@ class Dish(models.Model):
         related_name="dishes",
         on_delete=models.CASCADE,
         verbose_name=_("menu"),
+        # Covered by the (menu, price) and (menu, prep_time) indexes.
+        db_index=False,
     )
     name = models.CharField(_("name"), max_length=255)
     description = models.TextField(_("description"), blank=True)
@@ -56,6 +67,41 @@ class Dish(models.Model):
     class Meta:
         verbose_name = _("dish")
         verbose_name_plural = _("dishes")
+        # Back the filters and orderings of the dish list (see DishViewSet);
+        # each one is checked against the query plan in test_dish_indexes.
+        indexes = (
+            models.Index(fields=["menu", "price"], name="dish_menu_price_idx"),
+            models.Index(fields=["menu", "prep_time"], name="dish_menu_prep_time_idx"),
+            models.Index(fields=["menu", "is_vegetarian", "price"], name="dish_menu_veg_price_idx"),
+            models.Index(fields=["menu", "name"], name="dish_menu_name_idx"),
+            models.Index(fields=["menu", "created_at"], name="dish_menu_created_at_idx"),
+            models.Index(fields=["is_vegetarian", "price"], name="dish_veg_price_idx"),
+            models.Index(fields=["is_vegetarian", "prep_time"], name="dish_veg_prep_time_idx"),
+            models.Index(fields=["price"], name="dish_price_idx"),
+            models.Index(fields=["prep_time"], name="dish_prep_time_idx"),
+            models.Index(fields=["name"], name="dish_name_idx"),
+            models.Index(fields=["created_at"], name="dish_created_at_idx"),
+        )
 
     def __str__(self) -> str:
         return self.name
+
+
+class MenuSnapshot(models.Model):
+    """Immutable rendering of a menu and its dishes, as published (see menu.snapshots)."""
+
+    menu = models.ForeignKey(Menu, related_name="snapshots", on_delete=models.CASCADE, verbose_name=_("menu"))
+    version = models.PositiveIntegerField(_("version"))
+    etag = models.CharField(_("ETag"), max_length=66)
+    body = models.BinaryField(_("body"))
+    body_gzip = models.BinaryField(_("gzip body"))
+    body_br = models.BinaryField(_("Brotli body"), blank=True, default=b"")
+    created_at = models.DateTimeField(_("created at"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("menu snapshot")
+        verbose_name_plural = _("menu snapshots")
+        constraints = (models.UniqueConstraint(fields=["menu", "version"], name="menu_snapshot_version_unique"),)
+
+    def __str__(self) -> str:
+        return f"{self.menu_id} v{self.version}"
@@ -2,8 +2,15 @@
 Serializers for the menu API.
 """
 
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import QuerySet
 from rest_framework import serializers
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.validators import UniqueValidator
 
+from menu.bulk import ROUNDING_STEPS, DishAdjustment
 from menu.models import Dish, Menu
 
 
@@ -55,6 +62,15 @@ class MenuSerializer(serializers.ModelSerializer):
         )
 
 
+class MenuPreviewSerializer(MenuSerializer):
+    """Serializer for menus listed with the first dishes of each (``?preview=``)."""
+
+    dishes_preview = DishSerializer(many=True, read_only=True, source="preview_dishes")
+
+    class Meta(MenuSerializer.Meta):
+        fields = (*MenuSerializer.Meta.fields, "dishes_preview")  # type: ignore
+
+
 class MenuDetailSerializer(MenuSerializer):
     """Serializer for the Menu Detail object."""
 
@@ -62,3 +78,128 @@ class MenuDetailSerializer(MenuSerializer):
 
     class Meta(MenuSerializer.Meta):
         fields = (*MenuSerializer.Meta.fields, "dishes")  # type: ignore
+
+
+class MenuDishesPageSerializer(MenuDetailSerializer):
+    """Serializer for the Menu Detail object with one page of its dishes and a link to the next one."""
+
+    dishes = DishSerializer(many=True, read_only=True, source="page_dishes")
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # The view prefetches one dish more than the page to tell whether there is a next page.
+        limit = self.context["dishes_limit"]
+        dishes = data["dishes"]
+        data["dishes"] = dishes[:limit]
+        data["dishes_next"] = None
+        if len(dishes) > limit:
+            url = self.context["request"].build_absolute_uri()
+            data["dishes_next"] = replace_query_param(url, "dishes_cursor", dishes[limit - 1]["id"])
+        return data
+
+
+class MenuDishesQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters paging the dishes of the menu detail."""
+
+    dishes_limit = serializers.IntegerField(min_value=1, required=False)
+    dishes_cursor = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_dishes_limit(self, value: int) -> int:
+        return min(value, settings.MENU_DETAIL_DISHES_MAX_LIMIT)
+
+
+class MenuPreviewQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameter of the menu list embedding dish previews."""
+
+    preview = serializers.IntegerField(min_value=0, required=False)
+
+    def validate_preview(self, value: int) -> int:
+        return min(value, settings.MENU_PREVIEW_MAX_DISHES)
+
+
+class DishSelectionSerializer(serializers.Serializer):
+    """Serializer selecting the dishes of a menu to adjust; all dishes if empty."""
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    is_vegetarian = serializers.BooleanField(allow_null=True, default=None)
+    price_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def filter(self, dishes: QuerySet[Dish], data: dict) -> QuerySet[Dish]:
+        """Return the dishes matching validated selection ``data``."""
+        if "ids" in data:
+            dishes = dishes.filter(pk__in=data["ids"])
+        if data.get("is_vegetarian") is not None:
+            dishes = dishes.filter(is_vegetarian=data["is_vegetarian"])
+        if "price_min" in data:
+            dishes = dishes.filter(price__gte=data["price_min"])
+        if "price_max" in data:
+            dishes = dishes.filter(price__lte=data["price_max"])
+        return dishes
+
+
+class DishAdjustmentSerializer(serializers.Serializer):
+    """Serializer for adjusting the price and attributes of many dishes at once."""
+
+    dishes = DishSelectionSerializer(required=False)
+    price_percent = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    price_amount = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    round_to = serializers.ChoiceField(choices=[str(step) for step in ROUNDING_STEPS], default="0.01")
+    is_vegetarian = serializers.BooleanField(allow_null=True, default=None)
+    prep_time = serializers.IntegerField(min_value=0, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, attrs: dict) -> dict:
+        adjustment = DishAdjustment(
+            price_percent=attrs.get("price_percent"),
+            price_amount=attrs.get("price_amount"),
+            round_to=Decimal(attrs["round_to"]),
+            is_vegetarian=attrs["is_vegetarian"],
+            prep_time=attrs.get("prep_time"),
+        )
+        if error := adjustment.error():
+            raise serializers.ValidationError(error)
+        attrs["adjustment"] = adjustment
+        return attrs
+
+    def select(self, dishes: QuerySet[Dish]) -> QuerySet[Dish]:
+        """Return the selected subset of ``dishes``."""
+        return DishSelectionSerializer().filter(dishes, self.validated_data.get("dishes", {}))
+
+
+class MenuCloneSerializer(serializers.Serializer):
+    """Serializer for copying a menu with its dishes."""
+
+    name = serializers.CharField(max_length=255, validators=[UniqueValidator(queryset=Menu.objects.all())])
+    description = serializers.CharField(required=False, allow_blank=True)
+    price_multiplier = serializers.DecimalField(
+        max_digits=6, decimal_places=4, min_value=Decimal("0.0001"), required=False
+    )
+    round_to = serializers.ChoiceField(choices=[str(step) for step in ROUNDING_STEPS], default="0.01")
+
+    def validate(self, attrs: dict) -> dict:
+        multiplier = attrs.pop("price_multiplier", None)
+        round_to = Decimal(attrs.pop("round_to"))
+        attrs["adjustment"] = (
+            DishAdjustment(price_percent=(multiplier - 1) * 100, round_to=round_to) if multiplier is not None else None
+        )
+        return attrs
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of the autocomplete endpoint."""
+
+    q = serializers.CharField(max_length=100, allow_blank=True)
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value: int) -> int:
+        return min(value, settings.MENU_AUTOCOMPLETE_MAX_LIMIT)
+
+
+class SimilarDishesQuerySerializer(serializers.Serializer):
+    """Serializer for the query parameters of the similar dishes endpoint."""
+
+    limit = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_limit(self, value: int) -> int:
+        return min(value, settings.MENU_SIMILAR_DISHES_MAX_LIMIT)
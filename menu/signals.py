@@ -0,0 +1,72 @@
+"""
+Signal receivers for the Menu app.
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from menu.autocomplete import DISH, MENU, index_changed
+from menu.catalog import catalog_changed, mark_changed
+from menu.models import Dish, Menu
+from menu.snapshots import forget_snapshot, forget_snapshot_on_commit, republish_later
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def catalog_saved(sender, using: str, **kwargs) -> None:
+    """Bump the catalog version after a menu or dish was saved or deleted."""
+    mark_changed(using)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def menu_edited(sender, instance: Menu | Dish, using: str, **kwargs) -> None:
+    """Republish the edited menu if it is published and MENU_AUTO_PUBLISH is on."""
+    republish_later([instance.pk if sender is Menu else instance.menu_id], using)
+
+
+@receiver(post_delete, sender=Menu)
+def menu_deleted(sender, instance: Menu, **kwargs) -> None:
+    """Stop serving the snapshot of a deleted menu."""
+    forget_snapshot(instance.pk)
+
+
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def dishes_changed(sender, instance: Dish, using: str, created: bool = True, **kwargs) -> None:
+    """Recheck whether the snapshot of a menu may be served after a dish was added to or removed from it."""
+    if created:
+        forget_snapshot_on_commit(instance.menu_id, using)
+
+
+@receiver(pre_save, sender=Dish)
+def dish_moved(sender, instance: Dish, using: str, **kwargs) -> None:
+    """Recheck whether the snapshot of the menu a dish moves away from may still be served."""
+    old_menu_id = getattr(instance, "_saved_values", {}).get("menu_id")
+    if old_menu_id is not None and old_menu_id != instance.menu_id:
+        forget_snapshot_on_commit(old_menu_id, using)
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=Dish)
+@receiver(post_delete, sender=Dish)
+def name_indexed(sender, instance: Menu | Dish, using: str, **kwargs) -> None:
+    """Update the autocomplete index after a menu or dish was saved or deleted."""
+    # Registered after catalog_saved, so the catalog version is bumped first on commit.
+    name = instance.name if "created" in kwargs else None
+    index_changed(MENU if sender is Menu else DISH, instance.pk, name, getattr(instance, "menu_id", None), using)
+
+
+@receiver(catalog_changed)
+def similarity_outdated(sender, **kwargs) -> None:
+    """With MENU_SIMILARITY, queue a rebuild of the similar dishes index."""
+    if settings.MENU_SIMILARITY:
+        # Imported here so that only processes using the index load NumPy.
+        from menu.similarity import rebuild_later
+
+        rebuild_later()
@@ -0,0 +1,272 @@
+"""
+Precomputed index of similar dishes.
+
+``build_similar_dishes`` (a Celery task, queued ``MENU_SIMILARITY_REBUILD_DELAY``
+seconds after a catalog change so that bursts of changes share one build)
+reads every dish once and writes NumPy arrays to ``MENU_SIMILARITY_PATH``:
+
+* the TF-IDF weights of the words of the name (counted twice) and the
+  description, L2-normalized per dish, both by dish (CSR) and by word (an
+  inverted index);
+* the standardized logarithm of the price and of the preparation time, and
+  the vegetarian flag.
+
+Web processes load the file when it changes. The similarity of two dishes is
+``TEXT_WEIGHT`` times the cosine of their word weights plus, for the price and
+the preparation time, a weight times ``exp(-distance)``, plus
+``VEGETARIAN_WEIGHT`` if the flags agree. A query sums the postings of the
+dish's words with one ``bincount``, scores all dishes in a few vectorized
+operations and selects the top ones with ``argpartition``; results are kept
+per loaded index.
+"""
+
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from menu.autocomplete import normalize
+from menu.models import Dish
+
+logger = logging.getLogger(__name__)
+
+REBUILD_QUEUED_KEY = "menu:similarity:queued"
+
+WORD = re.compile(r"[^\W\d_]{2,}")
+NAME_REPEAT = 2
+
+TEXT_WEIGHT = 0.6
+PRICE_WEIGHT = 0.15
+PREP_TIME_WEIGHT = 0.1
+VEGETARIAN_WEIGHT = 0.15
+
+# Results cached per loaded index.
+CACHED_RESULTS = 4096
+
+
+def word_counts(name: str, description: str) -> Counter:
+    """Return how often each normalized word occurs in the name (counted twice) and the description."""
+    counts = Counter(WORD.findall(normalize(description)))
+    for word in WORD.findall(normalize(name)):
+        counts[word] += NAME_REPEAT
+    return counts
+
+
+def standardize(values: np.ndarray) -> tuple[np.ndarray, float, float]:
+    """Return the standardized logarithms of ``values``, with their mean and standard deviation."""
+    logs = np.log1p(values)
+    mean = float(logs.mean()) if len(logs) else 0.0
+    std = float(logs.std()) if len(logs) else 0.0
+    std = std or 1.0
+    return ((logs - mean) / std).astype(np.float32), mean, std
+
+
+class SimilarityIndex:
+    """Word weights and numeric features of all dishes, sorted by dish id."""
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.arrays = arrays
+        self.ids = arrays["ids"]
+        self.row_indptr = arrays["row_indptr"]
+        self.row_words = arrays["row_words"]
+        self.row_weights = arrays["row_weights"]
+        self.word_indptr = arrays["word_indptr"]
+        self.word_rows = arrays["word_rows"]
+        self.word_weights = arrays["word_weights"]
+        self.idf = arrays["idf"]
+        self.price = arrays["price"]
+        self.prep_time = arrays["prep_time"]
+        self.is_vegetarian = arrays["is_vegetarian"]
+        self.price_mean, self.price_std, self.prep_time_mean, self.prep_time_std = arrays["stats"].tolist()
+        self.words = {word: column for column, word in enumerate(arrays["words"].tolist())}
+        # similar(dish_id, limit): ids of the most similar dishes, or None if the dish is not in the index.
+        self.similar = lru_cache(maxsize=CACHED_RESULTS)(self._similar)
+
+    @classmethod
+    def build(cls, using: str) -> "SimilarityIndex":
+        """Compute the index from all dishes."""
+        words: dict[str, int] = {}
+        ids, prices, prep_times, vegetarian = [], [], [], []
+        row_lengths, row_words, row_counts = [], [], []
+        dishes = Dish.objects.using(using).order_by("pk")
+        fields = ("pk", "name", "description", "price", "prep_time", "is_vegetarian")
+        for pk, name, description, price, prep_time, is_vegetarian in dishes.values_list(*fields).iterator(5000):
+            counts = word_counts(name, description)
+            ids.append(pk)
+            prices.append(float(price))
+            prep_times.append(prep_time)
+            vegetarian.append(is_vegetarian)
+            row_lengths.append(len(counts))
+            row_words.extend(words.setdefault(word, len(words)) for word in counts)
+            row_counts.extend(counts.values())
+
+        rows = len(ids)
+        row_indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(row_lengths, out=row_indptr[1:])
+        row_words = np.array(row_words, dtype=np.int32)
+        row_of_entry = np.repeat(np.arange(rows, dtype=np.int32), row_lengths)
+
+        document_frequency = np.bincount(row_words, minlength=len(words))
+        idf = (np.log((1 + rows) / (1 + document_frequency)) + 1).astype(np.float32)
+        weights = (1 + np.log(np.array(row_counts, dtype=np.float32))) * idf[row_words]
+        norms = np.sqrt(np.bincount(row_of_entry, weights * weights, minlength=rows)).astype(np.float32)
+        weights /= norms[row_of_entry]
+
+        by_word = np.argsort(row_words, kind="stable")
+        word_indptr = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=word_indptr[1:])
+        price, price_mean, price_std = standardize(np.array(prices, dtype=np.float64))
+        prep_time, prep_time_mean, prep_time_std = standardize(np.array(prep_times, dtype=np.float64))
+
+        return cls(
+            {
+                "ids": np.array(ids, dtype=np.int64),
+                "row_indptr": row_indptr,
+                "row_words": row_words,
+                "row_weights": weights,
+                "word_indptr": word_indptr,
+                "word_rows": row_of_entry[by_word],
+                "word_weights": weights[by_word],
+                "idf": idf,
+                "words": np.array(list(words), dtype=np.str_),
+                "price": price,
+                "prep_time": prep_time,
+                "is_vegetarian": np.array(vegetarian, dtype=np.bool_),
+                "stats": np.array([price_mean, price_std, prep_time_mean, prep_time_std], dtype=np.float64),
+            }
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "SimilarityIndex":
+        """Read an index written by ``save``."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path: Path) -> None:
+        """Write the index to ``path``, replacing any previous file atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".npz", delete=False) as file:
+            np.savez(file, **self.arrays)
+        os.replace(file.name, path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _similar(self, dish_id: int, limit: int) -> tuple[int, ...] | None:
+        row = int(np.searchsorted(self.ids, dish_id))
+        if row == len(self.ids) or self.ids[row] != dish_id:
+            return None
+        start, end = self.row_indptr[row], self.row_indptr[row + 1]
+        return self.top(
+            self.row_words[start:end],
+            self.row_weights[start:end],
+            self.price[row],
+            self.prep_time[row],
+            self.is_vegetarian[row],
+            limit,
+            exclude=row,
+        )
+
+    def similar_to(self, dish: Dish, limit: int) -> tuple[int, ...]:
+        """Return the ids of the dishes most similar to a dish that is not in the index."""
+        counts = word_counts(dish.name, dish.description)
+        known = [(self.words[word], count) for word, count in counts.items() if word in self.words]
+        columns = np.array([column for column, _ in known], dtype=np.int32)
+        weights = (1 + np.log(np.array([count for _, count in known], dtype=np.float32))) * self.idf[columns]
+        norm = np.sqrt(np.sum(weights * weights))
+        return self.top(
+            columns,
+            weights / norm if norm else weights,
+            (np.log1p(float(dish.price)) - self.price_mean) / self.price_std,
+            (np.log1p(dish.prep_time) - self.prep_time_mean) / self.prep_time_std,
+            dish.is_vegetarian,
+            limit,
+        )
+
+    def top(self, words, weights, price, prep_time, is_vegetarian, limit: int, exclude: int | None = None):
+        """Return the ids of the ``limit`` dishes scoring highest against the given features, ties by id."""
+        rows = len(self.ids)
+        if len(words):
+            starts, ends = self.word_indptr[words], self.word_indptr[words + 1]
+            postings = np.concatenate([self.word_rows[start:end] for start, end in zip(starts, ends, strict=True)])
+            contributions = np.concatenate(
+                [
+                    self.word_weights[start:end] * weight
+                    for start, end, weight in zip(starts, ends, weights, strict=True)
+                ]
+            )
+            text = np.bincount(postings, contributions, minlength=rows)
+        else:
+            text = np.zeros(rows)
+        scores = (
+            TEXT_WEIGHT * text
+            + PRICE_WEIGHT * np.exp(-np.abs(self.price - price))
+            + PREP_TIME_WEIGHT * np.exp(-np.abs(self.prep_time - prep_time))
+            + VEGETARIAN_WEIGHT * (self.is_vegetarian == is_vegetarian)
+        )
+        if exclude is not None:
+            scores[exclude] = -np.inf
+        limit = min(limit, rows - (exclude is not None))
+        if limit <= 0:
+            return ()
+        candidates = np.argpartition(-scores, limit - 1)[:limit]
+        candidates = candidates[np.lexsort((self.ids[candidates], -scores[candidates]))]
+        return tuple(self.ids[candidates].tolist())
+
+
+_index: SimilarityIndex | None = None
+_index_mtime: int | None = None
+_lock = threading.Lock()
+
+
+def get_index() -> SimilarityIndex | None:
+    """Return the index last written to ``MENU_SIMILARITY_PATH``, or None if there is none yet."""
+    global _index, _index_mtime
+    path = Path(settings.MENU_SIMILARITY_PATH)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _index is not None and _index_mtime == mtime:
+        return _index
+    with _lock:
+        if _index is None or _index_mtime != mtime:
+            _index, _index_mtime = SimilarityIndex.load(path), mtime
+            logger.info("similar dishes index loaded: %d dishes", len(_index))
+        return _index
+
+
+def clear_index() -> None:
+    """Drop the index loaded by this process."""
+    global _index, _index_mtime
+    with _lock:
+        _index = _index_mtime = None
+
+
+def build(using: str = "default") -> SimilarityIndex:
+    """Build the index and write it to ``MENU_SIMILARITY_PATH``."""
+    index = SimilarityIndex.build(using)
+    index.save(Path(settings.MENU_SIMILARITY_PATH))
+    return index
+
+
+def rebuild_later() -> None:
+    """Queue a rebuild of the index, unless a queued one has not started yet."""
+    delay = settings.MENU_SIMILARITY_REBUILD_DELAY
+    # The marker expires when the queued build is due: changes until then are
+    # read by that build, later ones queue the next. It is never deleted by
+    # the worker, so this holds whether or not the worker shares the cache.
+    if not cache.add(REBUILD_QUEUED_KEY, True, timeout=delay):
+        return
+    # Imported here so that web processes only load Celery when they send a task.
+    from menu.tasks import build_similar_dishes
+
+    build_similar_dishes.apply_async(countdown=delay)
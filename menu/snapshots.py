@@ -0,0 +1,189 @@
+"""
+Published menu snapshots.
+
+Publishing renders the ``MenuDetailSerializer`` payload of a menu once into an
+immutable, versioned ``MenuSnapshot`` (JSON plus its gzip and Brotli
+encodings) and points
+``Menu.published_version`` at it. Anonymous reads of the menu detail are then
+served from the snapshot bytes: one cache lookup, or one indexed query on a
+miss, and no serialization. Edits to the menu or its dishes only change the
+draft until the menu is published again, by the ``publish_menu`` task, the API
+or the admin; with ``MENU_AUTO_PUBLISH`` every committed change of a published
+menu schedules that task.
+
+Snapshots are rendered without a request, so image URLs are relative to the
+site. Like the live detail, a snapshot is only served while the menu has
+dishes: anonymous users do not see empty menus.
+"""
+
+import hashlib
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from core.compression import KNOWN_ENCODINGS, compress, encode_etag, negotiate, split_etag
+from menu.catalog import mark_changed
+from menu.models import Dish, Menu, MenuSnapshot
+
+SNAPSHOT_CACHE_KEY = "menu:snapshot:{menu_id}"
+
+# Snapshots kept per menu, the published one included.
+KEEP_VERSIONS = 3
+
+# Cached for menus without a published snapshot; ``None`` means a cache miss.
+UNPUBLISHED = False
+
+
+class PublishedSnapshot(NamedTuple):
+    """The bytes of a published snapshot, by content encoding ("identity" for the plain JSON)."""
+
+    version: int
+    etag: str
+    bodies: dict[str, bytes]
+
+
+def render_menu(menu_id: int, using: str) -> bytes:
+    """Render the public detail payload of a menu as JSON."""
+    # Imported here: the serializers import menu.bulk, which imports this module.
+    from menu.serializers import MenuDetailSerializer
+
+    menu = (
+        Menu.objects.using(using)
+        .prefetch_related(Prefetch("dishes", queryset=Dish.objects.using(using).order_by("pk")))
+        .get(pk=menu_id)
+    )
+    return JSONRenderer().render(MenuDetailSerializer(menu).data)
+
+
+def publish(menu_id: int, only_if_published: bool = False) -> MenuSnapshot | None:
+    """
+    Render the menu into a new snapshot and make it the published version.
+
+    Publishing unchanged content keeps the current snapshot. Returns ``None``
+    if the menu does not exist, or with ``only_if_published`` if it is not
+    published.
+    """
+    using = router.db_for_write(Menu)
+    with transaction.atomic(using=using):
+        # Locks the menu, so concurrent publications of it run one after the other.
+        menu = Menu.objects.using(using).select_for_update().filter(pk=menu_id).values("published_version").first()
+        if menu is None or (only_if_published and menu["published_version"] is None):
+            return None
+
+        body = render_menu(menu_id, using)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        snapshots = MenuSnapshot.objects.using(using).filter(menu_id=menu_id)
+        snapshot = snapshots.order_by("-version").first()
+        if snapshot is None or snapshot.etag != etag:
+            snapshot = snapshots.create(
+                menu_id=menu_id,
+                version=snapshot.version + 1 if snapshot else 1,
+                etag=etag,
+                body=body,
+                body_gzip=compress(body, "gzip"),
+                body_br=compress(body, "br"),
+            )
+            snapshots.filter(version__lte=snapshot.version - KEEP_VERSIONS).delete()
+        # An update, not save(): publishing is not an edit and sends no model signals.
+        Menu.objects.using(using).filter(pk=menu_id).update(published_version=snapshot.version)
+
+        cached = snapshot_from_row(snapshot.version, snapshot.etag, snapshot.body, snapshot.body_gzip, snapshot.body_br)
+        if not Dish.objects.using(using).filter(menu_id=menu_id).exists():
+            # Published, but not served until the menu has dishes (see published_snapshot).
+            cached = UNPUBLISHED
+        transaction.on_commit(lambda: cache_snapshot(menu_id, cached), using=using)
+        mark_changed(using)
+    return snapshot
+
+
+def unpublish(menu_id: int) -> None:
+    """Stop serving a snapshot of the menu; its snapshots are kept."""
+    using = router.db_for_write(Menu)
+    with transaction.atomic(using=using):
+        Menu.objects.using(using).filter(pk=menu_id).update(published_version=None)
+        transaction.on_commit(lambda: cache_snapshot(menu_id, UNPUBLISHED), using=using)
+        mark_changed(using)
+
+
+def snapshot_from_row(version: int, etag: str, body: bytes, body_gzip: bytes, body_br: bytes) -> PublishedSnapshot:
+    """Build the cached form of a snapshot row."""
+    bodies = {"identity": bytes(body), "gzip": bytes(body_gzip)}
+    if body_br:
+        bodies["br"] = bytes(body_br)
+    return PublishedSnapshot(version, etag, bodies)
+
+
+def cache_snapshot(menu_id: int, snapshot: PublishedSnapshot | bool) -> None:
+    """Store the published snapshot of a menu, or ``UNPUBLISHED``, in the cache."""
+    cache.set(SNAPSHOT_CACHE_KEY.format(menu_id=menu_id), snapshot, settings.MENU_SNAPSHOT_CACHE_TIMEOUT)
+
+
+def forget_snapshot(menu_id: int) -> None:
+    """Drop the cached snapshot of a menu."""
+    cache.delete(SNAPSHOT_CACHE_KEY.format(menu_id=menu_id))
+
+
+def forget_snapshot_on_commit(menu_id: int, using: str) -> None:
+    """Drop the cached snapshot of a menu once the current transaction commits."""
+    transaction.on_commit(lambda: forget_snapshot(menu_id), using=using)
+
+
+def published_snapshot(menu_id: int) -> PublishedSnapshot | None:
+    """
+    Return the published snapshot of a menu from the cache, or from one query on a miss.
+
+    Menus without dishes have none (see ``MenuViewSet.get_queryset``).
+    """
+    snapshot = cache.get(SNAPSHOT_CACHE_KEY.format(menu_id=menu_id))
+    if snapshot is None:
+        row = (
+            MenuSnapshot.objects.filter(menu_id=menu_id, version=F("menu__published_version"))
+            .filter(Exists(Dish.objects.filter(menu_id=OuterRef("menu_id"))))
+            .values_list("version", "etag", "body", "body_gzip", "body_br")
+            .first()
+        )
+        snapshot = snapshot_from_row(*row) if row else UNPUBLISHED
+        cache_snapshot(menu_id, snapshot)
+    return snapshot or None
+
+
+def snapshot_response(request, snapshot: PublishedSnapshot) -> HttpResponse:
+    """Serve the prebuilt bytes of a snapshot, in the encoding the client prefers."""
+    # Snapshots published without a Brotli body offer the other encodings only.
+    available = [encoding for encoding in KNOWN_ENCODINGS if encoding in snapshot.bodies]
+    encoding = negotiate(request.headers.get("Accept-Encoding", ""), available)
+    if snapshot.etag in {split_etag(etag)[0] for etag in parse_etags(request.headers.get("If-None-Match", ""))}:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot.bodies[encoding or "identity"], content_type="application/json")
+        if encoding is not None:
+            response["Content-Encoding"] = encoding
+    response["ETag"] = encode_etag(snapshot.etag, encoding)
+    response["Cache-Control"] = "no-cache"
+    response["X-Menu-Version"] = str(snapshot.version)
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def republish_later(menu_ids: Iterable[int], using: str | None = None) -> None:
+    """With ``MENU_AUTO_PUBLISH``, republish the given menus that are published once the transaction commits."""
+    if not settings.MENU_AUTO_PUBLISH:
+        return
+    menu_ids = set(menu_ids)
+
+    def enqueue():
+        # Imported here so that web processes only load Celery when they send a task.
+        from menu.tasks import publish_menu
+
+        for menu_id in menu_ids:
+            publish_menu.delay(menu_id, only_if_published=True)
+
+    transaction.on_commit(enqueue, using=using)
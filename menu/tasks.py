@@ -9,7 +9,9 @@ from django.contrib.auth import get_user_model
 from django.core.mail import send_mass_mail
 from django.utils import timezone
 
+from app import celery_app  # noqa: F401 - configures Celery before the tasks are used
 from menu.models import Dish
+from menu.snapshots import publish
 
 
 @shared_task
@@ -62,3 +64,24 @@ def send_daily_menu_report():
     sent_count = send_mass_mail(datatuple, fail_silently=False)
 
     return f"Sent {sent_count} emails."
+
+
+@shared_task
+def publish_menu(menu_id: int, only_if_published: bool = False) -> int | None:
+    """
+    Publishes a snapshot of the menu and returns its version.
+    With only_if_published, menus that are not published are left alone.
+    """
+    snapshot = publish(menu_id, only_if_published=only_if_published)
+    return snapshot.version if snapshot is not None else None
+
+
+@shared_task
+def build_similar_dishes() -> int:
+    """
+    Rebuilds the similar dishes index from all dishes and returns their number.
+    """
+    # Imported here so that only the workers running this task load NumPy.
+    from menu import similarity
+
+    return len(similarity.build())
@@ -0,0 +1,105 @@
+"""
+Tests for the menu admin changelists.
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.admin import EstimatedCountPaginator
+from menu.models import Dish, Menu
+
+DISH_CHANGELIST_URL = reverse("admin:menu_dish_changelist")
+MENU_CHANGELIST_URL = reverse("admin:menu_menu_changelist")
+
+
+def create_dishes(count: int) -> None:
+    """Create ``count`` more dishes, each on its own menu."""
+    start = Menu.objects.count()
+    for index in range(start, start + count):
+        menu = Menu.objects.create(name=f"Menu {index}")
+        Dish.objects.create(menu=menu, name=f"Dish {index}", price=10, prep_time=5)
+
+
+def count_queries(client, url: str) -> int:
+    """Return the number of queries of a successful GET request."""
+    with CaptureQueriesContext(connection) as queries:
+        res = client.get(url)
+    assert res.status_code == 200
+    return len(queries)
+
+
+@pytest.mark.django_db
+class TestChangelistQueries:
+    """Test that the changelists run a constant number of queries."""
+
+    @pytest.mark.parametrize("url", [DISH_CHANGELIST_URL, MENU_CHANGELIST_URL])
+    def test_independent_of_rows(self, admin_client, url):
+        """Test that more rows on the page do not add queries."""
+        create_dishes(2)
+        few = count_queries(admin_client, url)
+        create_dishes(20)
+
+        assert count_queries(admin_client, url) == few
+
+    def test_menu_filter_does_not_list_menus(self, admin_client):
+        """Test that the menu filter only renders the selected menu."""
+        create_dishes(3)
+        menu = Menu.objects.get(name="Menu 1")
+
+        res = admin_client.get(DISH_CHANGELIST_URL, {"menu__id__exact": menu.pk, "is_vegetarian__exact": "0"})
+
+        content = res.content.decode()
+        assert list(res.context["cl"].result_list) == list(menu.dishes.all())
+        assert f'<option value="{menu.pk}" selected>Menu 1</option>' in content
+        assert "Menu 2" not in content
+        assert '<input type="hidden" name="is_vegetarian__exact" value="0">' in content
+
+    def test_menu_autocomplete(self, admin_client):
+        """Test that the filter's autocomplete endpoint searches menus by name prefix."""
+        Menu.objects.create(name="Lunch")
+        Menu.objects.create(name="Brunch")
+
+        def search(term: str) -> list[str]:
+            res = admin_client.get(
+                reverse("admin:autocomplete"),
+                {"app_label": "menu", "model_name": "dish", "field_name": "menu", "term": term},
+            )
+            return [result["text"] for result in res.json()["results"]]
+
+        assert search("lun") == ["Lunch"]
+        assert search("unch") == []
+
+    def test_search_matches_name_prefix(self, admin_client):
+        """Test that search matches the start of the name only."""
+        menu = Menu.objects.create(name="Lunch")
+        soup = Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=5)
+        Dish.objects.create(menu=menu, name="Pea soup", price=5, prep_time=5)
+
+        res = admin_client.get(DISH_CHANGELIST_URL, {"q": "sou"})
+
+        assert list(res.context["cl"].result_list) == [soup]
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    """Test counting rows with planner statistics."""
+
+    def test_estimate_used_for_large_tables(self, monkeypatch):
+        """Test that an estimate above the limit replaces the exact count."""
+        monkeypatch.setattr(EstimatedCountPaginator, "estimated_count", lambda self: 250_000)
+
+        assert EstimatedCountPaginator(Dish.objects.order_by("pk"), 100).count == 250_000
+
+    def test_exact_count_for_small_tables(self, monkeypatch):
+        """Test that small estimates are replaced by an exact count."""
+        create_dishes(3)
+        monkeypatch.setattr(EstimatedCountPaginator, "estimated_count", lambda self: 2)
+
+        assert EstimatedCountPaginator(Dish.objects.order_by("pk"), 100).count == 3
+
+    def test_no_estimate_for_filtered_lists_or_sqlite(self):
+        """Test that filtered lists and SQLite are not estimated."""
+        assert EstimatedCountPaginator(Dish.objects.filter(name="Soup").order_by("pk"), 100).estimated_count() is None
+        assert EstimatedCountPaginator(Dish.objects.order_by("pk"), 100).estimated_count() is None
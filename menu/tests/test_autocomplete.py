@@ -0,0 +1,216 @@
+"""
+Tests for autocompleting menu and dish names.
+"""
+
+import threading
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from menu import autocomplete
+from menu.autocomplete import build_index, clear_index, normalize
+from menu.catalog import bump_version
+from menu.models import Dish, Menu
+
+AUTOCOMPLETE_URL = reverse("menu:autocomplete")
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Start and end every test without an index in memory."""
+    clear_index()
+    yield
+    clear_index()
+
+
+@pytest.fixture
+def builds(monkeypatch) -> list[int]:
+    """Record the scheduled background builds instead of running them."""
+    scheduled = []
+    monkeypatch.setattr(autocomplete, "schedule_build", lambda: scheduled.append(1))
+    return scheduled
+
+
+@pytest.fixture
+def catalog() -> dict[str, Menu]:
+    """Fixture creating menus with dishes, and an empty menu."""
+    lunch = Menu.objects.create(name="Lunch")
+    dinner = Menu.objects.create(name="Dinner Classics")
+    for menu, name in (
+        (lunch, "Spaghetti Carbonara"),
+        (lunch, "Carrot Soup"),
+        (dinner, "Crème Brûlée"),
+        (dinner, "Caramel  cake"),
+    ):
+        Dish.objects.create(menu=menu, name=name, price=5, prep_time=10)
+    return {"lunch": lunch, "dinner": dinner, "empty": Menu.objects.create(name="Carte Blanche")}
+
+
+def names(res) -> list[str]:
+    """Return the suggested names of an autocomplete response."""
+    return [suggestion["name"] for suggestion in res.json()]
+
+
+class TestNormalize:
+    """Test normalizing names for the index."""
+
+    def test_normalize(self):
+        """Test that accents, case and repeated whitespace are ignored."""
+        assert normalize("  Crème   BRÛLÉE ") == "creme brulee"
+        assert normalize("Straße") == "strasse"
+
+
+@pytest.mark.django_db
+class TestAutocompleteIndex:
+    """Test suggesting names from the index."""
+
+    def test_whole_names_first(self, catalog):
+        """Test that names starting with the query come before names with a later word starting with it."""
+        index = build_index()
+
+        suggestions = index.suggest("car", limit=10)
+
+        assert [suggestion.name for suggestion in suggestions] == [
+            "Caramel  cake",
+            "Carrot Soup",
+            "Carte Blanche",
+            "Spaghetti Carbonara",
+        ]
+
+    def test_limit_and_duplicates(self, catalog):
+        """Test that a name matching twice is suggested once and the limit is respected."""
+        Menu.objects.create(name="Cake cake")
+        index = build_index()
+
+        assert [suggestion.name for suggestion in index.suggest("cake", limit=10)] == ["Cake cake", "Caramel  cake"]
+        assert len(index.suggest("c", limit=2)) == 2
+
+    def test_anonymous_hides_empty_menus(self, catalog):
+        """Test that menus without dishes are only suggested to authenticated users."""
+        index = build_index()
+
+        assert "Carte Blanche" not in [suggestion.name for suggestion in index.suggest("car", 10, anonymous=True)]
+        assert "Carte Blanche" in [suggestion.name for suggestion in index.suggest("car", 10)]
+
+
+@pytest.mark.django_db
+class TestAutocompleteApi:
+    """Test the autocomplete endpoint."""
+
+    def test_cold_falls_back_to_database(self, catalog, builds):
+        """Test that a cold index schedules a build and suggestions come from the database meanwhile."""
+        with CaptureQueriesContext(connection) as queries:
+            cold = APIClient().get(AUTOCOMPLETE_URL, {"q": "car"})
+
+        assert builds == [1]
+        assert any("menu_dish" in query["sql"] for query in queries)
+        build_index()
+        assert names(cold) == names(APIClient().get(AUTOCOMPLETE_URL, {"q": "car"}))
+
+    def test_warm_without_queries(self, catalog, builds):
+        """Test that a current index answers without SQL."""
+        build_index()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(AUTOCOMPLETE_URL, {"q": "CRÈME"})
+
+        assert res.status_code == 200
+        assert res.json() == [{"type": "dish", "id": Dish.objects.get(name="Crème Brûlée").pk, "name": "Crème Brûlée"}]
+        assert queries.captured_queries == []
+        assert builds == []
+
+    def test_authenticated(self, catalog, builds):
+        """Test that authenticated users get suggestions of empty menus."""
+        build_index()
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_user("user@example.com", "testpass123"))
+
+        assert "Carte Blanche" in names(client.get(AUTOCOMPLETE_URL, {"q": "carte"}))
+        assert names(APIClient().get(AUTOCOMPLETE_URL, {"q": "carte"})) == []
+
+    @pytest.mark.parametrize(("params", "status_code"), [({"q": " "}, 200), ({}, 400), ({"q": "a", "limit": 0}, 400)])
+    def test_parameters(self, builds, params, status_code):
+        """Test that a blank query suggests nothing and invalid parameters are rejected."""
+        res = APIClient().get(AUTOCOMPLETE_URL, params)
+
+        assert res.status_code == status_code
+        if status_code == 200:
+            assert res.json() == []
+
+    def test_limit_capped(self, settings, catalog, builds):
+        """Test that the limit is capped at MENU_AUTOCOMPLETE_MAX_LIMIT."""
+        settings.MENU_AUTOCOMPLETE_MAX_LIMIT = 2
+        build_index()
+
+        assert len(APIClient().get(AUTOCOMPLETE_URL, {"q": "c", "limit": 100}).json()) == 2
+
+
+@pytest.mark.django_db
+class TestAutocompleteUpdates:
+    """Test keeping the index up to date."""
+
+    def test_saves_and_deletes(self, catalog, builds, django_capture_on_commit_callbacks):
+        """Test that committed saves and deletes update the index without a rebuild."""
+        index = build_index()
+        with django_capture_on_commit_callbacks(execute=True):
+            dish = Dish.objects.create(menu=catalog["empty"], name="Carpaccio", price=9, prep_time=5)
+            Dish.objects.filter(name="Carrot Soup").get().delete()
+            soup = Dish.objects.get(name="Spaghetti Carbonara")
+            soup.name = "Penne Carbonara"
+            soup.save()
+
+        current = autocomplete.get_index()
+        assert current is not index
+        assert [suggestion.name for suggestion in current.suggest("car", 10, anonymous=True)] == [
+            "Caramel  cake",
+            "Carpaccio",
+            "Carte Blanche",
+            "Penne Carbonara",
+        ]
+        assert builds == []
+        assert current.dish_menus[dish.pk] == catalog["empty"].pk
+
+    def test_menu_deleted(self, catalog, builds, django_capture_on_commit_callbacks):
+        """Test that deleting a menu removes it and its dishes."""
+        build_index()
+        with django_capture_on_commit_callbacks(execute=True):
+            catalog["lunch"].delete()
+
+        assert [suggestion.name for suggestion in autocomplete.get_index().suggest("car", 10)] == [
+            "Caramel  cake",
+            "Carte Blanche",
+        ]
+        assert builds == []
+
+    def test_unseen_change_rebuilds(self, catalog, builds):
+        """Test that a catalog change the index did not see schedules a rebuild, and the index keeps answering."""
+        index = build_index()
+        bump_version()
+
+        assert autocomplete.get_index() is index
+        assert builds == [1]
+
+    def test_rebuilt_when_old(self, settings, catalog, builds):
+        """Test that an index older than MENU_AUTOCOMPLETE_MAX_AGE schedules a rebuild."""
+        build_index()
+        settings.MENU_AUTOCOMPLETE_MAX_AGE = 0
+
+        autocomplete.get_index()
+
+        assert builds == [1]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_built_in_background(catalog):
+    """Test that the first request builds the index on a background thread."""
+    APIClient().get(AUTOCOMPLETE_URL, {"q": "car"})
+    for thread in threading.enumerate():
+        if thread.name == "autocomplete-build":
+            thread.join()
+
+    assert autocomplete._index is not None
+    assert len(autocomplete._index.names) == 7
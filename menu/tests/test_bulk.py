@@ -0,0 +1,212 @@
+"""
+Tests for adjusting many dishes at once.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.catalog import CATALOG_VERSION_KEY, bump_version, catalog_version
+from menu.models import Dish, Menu
+
+
+def adjust_url(menu_id: int) -> str:
+    """Return the adjust-dishes URL of a menu."""
+    return reverse("menu:menu-adjust-dishes", args=[menu_id])
+
+
+def clone_url(menu_id: int) -> str:
+    """Return the clone URL of a menu."""
+    return reverse("menu:menu-clone", args=[menu_id])
+
+
+@pytest.fixture
+def auth_client() -> APIClient:
+    """Fixture for an authenticated APIClient."""
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user("test@example.com", "password123"))
+    return client
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with three dishes, last updated a day ago."""
+    menu = Menu.objects.create(name="Lunch")
+    Dish.objects.create(menu=menu, name="Soup", price=Decimal("4.00"), prep_time=10, is_vegetarian=True)
+    Dish.objects.create(menu=menu, name="Steak", price=Decimal("19.90"), prep_time=25)
+    Dish.objects.create(menu=menu, name="Salad", price=Decimal("7.30"), prep_time=5, is_vegetarian=True)
+    Dish.objects.update(updated_at=timezone.now() - timedelta(days=1))
+    return menu
+
+
+def prices(menu: Menu) -> dict[str, Decimal]:
+    """Return the dish prices of a menu by name."""
+    return dict(menu.dishes.values_list("name", "price"))
+
+
+class TestCatalogVersion:
+    """Test the catalog version bumped by bulk changes."""
+
+    def test_eviction_does_not_reuse_versions(self):
+        """Test that a bump after the version was evicted continues above every earlier version."""
+        versions = [bump_version() for _ in range(3)]
+        cache.delete(CATALOG_VERSION_KEY)
+
+        assert bump_version() > max(versions)
+        cache.delete(CATALOG_VERSION_KEY)
+        assert catalog_version() > max(versions)
+
+
+@pytest.mark.django_db
+class TestAdjustDishesApi:
+    """Test the adjust-dishes action of the menu API."""
+
+    def test_auth_required(self, menu):
+        """Test that anonymous clients cannot adjust dishes."""
+        res = APIClient().post(adjust_url(menu.id), {"price_percent": 5}, format="json")
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_dry_run_changes_nothing(self, auth_client, menu):
+        """Test that a dry run reports the affected dishes and prices without writing."""
+        res = auth_client.post(adjust_url(menu.id), {"price_percent": 10, "dry_run": True}, format="json")
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["applied"] is False
+        assert (res.data["dishes"], res.data["menus"]) == (3, 1)
+        assert (res.data["price_total"], res.data["new_price_total"]) == (Decimal("31.20"), Decimal("34.32"))
+        assert prices(menu) == {"Soup": Decimal("4.00"), "Steak": Decimal("19.90"), "Salad": Decimal("7.30")}
+
+    def test_percentage_with_rounding_in_one_update(self, auth_client, menu, django_capture_on_commit_callbacks):
+        """Test that prices change in a single UPDATE, rounded, with updated_at and the catalog version bumped."""
+        version = catalog_version()
+
+        with CaptureQueriesContext(connection) as queries, django_capture_on_commit_callbacks(execute=True):
+            res = auth_client.post(adjust_url(menu.id), {"price_percent": 5, "round_to": "0.10"}, format="json")
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["dishes"] == 3
+        assert prices(menu) == {"Soup": Decimal("4.20"), "Steak": Decimal("20.90"), "Salad": Decimal("7.70")}
+        assert len([query for query in queries if query["sql"].startswith("UPDATE")]) == 1
+        assert not menu.dishes.filter(updated_at__lt=timezone.now() - timedelta(hours=1)).exists()
+        assert catalog_version() == version + 1
+
+    def test_selection_and_attributes(self, auth_client, menu):
+        """Test that only the selected dishes change, and attributes can be set."""
+        other = Dish.objects.create(menu=Menu.objects.create(name="Dinner"), name="Soup", price=4, prep_time=10)
+        payload = {"dishes": {"is_vegetarian": True, "price_max": "5.00"}, "price_amount": "-5.00", "prep_time": 3}
+
+        res = auth_client.post(adjust_url(menu.id), payload, format="json")
+
+        assert res.data["dishes"] == 1
+        soup = menu.dishes.get(name="Soup")
+        assert (soup.price, soup.prep_time) == (Decimal("0.00"), 3)
+        assert menu.dishes.get(name="Salad").price == Decimal("7.30")
+        other.refresh_from_db()
+        assert other.price == Decimal("4.00")
+
+    @pytest.mark.parametrize(
+        "payload",
+        [{}, {"dry_run": True}, {"price_percent": -100}, {"price_percent": 5, "round_to": "0.03"}],
+    )
+    def test_invalid(self, auth_client, menu, payload):
+        """Test that adjustments without a change or with invalid values are rejected."""
+        res = auth_client.post(adjust_url(menu.id), payload, format="json")
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCloneMenuApi:
+    """Test the clone action of the menu API."""
+
+    def test_clone_shares_images_and_multiplies_prices(self, auth_client, menu, django_capture_on_commit_callbacks):
+        """Test that dishes are copied with the same image files and adjusted prices."""
+        menu.dishes.filter(name="Soup").update(image="uploads/dish/soup.jpg")
+        version = catalog_version()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            res = auth_client.post(clone_url(menu.id), {"name": "Lunch (Berlin)", "price_multiplier": "1.1"})
+
+        assert res.status_code == status.HTTP_201_CREATED
+        clone = Menu.objects.get(pk=res.data["id"])
+        assert (clone.name, clone.description) == ("Lunch (Berlin)", menu.description)
+        assert prices(clone) == {"Soup": Decimal("4.40"), "Steak": Decimal("21.89"), "Salad": Decimal("8.03")}
+        assert clone.dishes.get(name="Soup").image.name == "uploads/dish/soup.jpg"
+        assert prices(menu)["Steak"] == Decimal("19.90")
+        assert catalog_version() > version
+
+    def test_query_count_independent_of_dishes(self, auth_client, menu):
+        """Test that cloning runs the same queries for 3 or 30 dishes."""
+
+        def clone_queries(name: str) -> int:
+            with CaptureQueriesContext(connection) as queries:
+                res = auth_client.post(clone_url(menu.id), {"name": name}, format="json")
+            assert res.status_code == status.HTTP_201_CREATED
+            return len(queries)
+
+        few = clone_queries("Copy 1")
+        Dish.objects.bulk_create(Dish(menu=menu, name=f"Dish {i}", price=1, prep_time=1) for i in range(27))
+
+        assert clone_queries("Copy 2") == few
+        assert Menu.objects.get(name="Copy 2").dishes.count() == 30
+
+    def test_name_must_be_unique(self, auth_client, menu):
+        """Test that a clone cannot reuse an existing menu name."""
+        res = auth_client.post(clone_url(menu.id), {"name": "Lunch"}, format="json")
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert Menu.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestAdjustDishesAdminAction:
+    """Test the admin actions adjusting dishes."""
+
+    def test_preview_then_apply(self, admin_client, menu):
+        """Test that the menu action previews the adjustment, then applies it."""
+        url = reverse("admin:menu_menu_changelist")
+        data = {"action": "adjust_dishes", ACTION_CHECKBOX_NAME: [menu.pk], "price_percent": "-10", "round_to": "0.01"}
+
+        form = admin_client.post(url, {"action": "adjust_dishes", ACTION_CHECKBOX_NAME: [menu.pk]})
+        preview = admin_client.post(url, {**data, "_preview": "1"})
+
+        assert form.status_code == preview.status_code == status.HTTP_200_OK
+        assert form.context["dish_count"] == 3
+        assert preview.context["report"]["new_price_total"] == Decimal("28.08")
+        assert prices(menu)["Steak"] == Decimal("19.90")
+
+        res = admin_client.post(url, {**data, "_apply": "1"})
+
+        assert res.status_code == status.HTTP_302_FOUND
+        assert prices(menu)["Steak"] == Decimal("17.91")
+
+    def test_dish_action_applies_to_selection(self, admin_client, menu):
+        """Test that the dish action only adjusts the selected dishes."""
+        soup = menu.dishes.get(name="Soup")
+
+        admin_client.post(
+            reverse("admin:menu_dish_changelist"),
+            {
+                "action": "adjust_dishes",
+                ACTION_CHECKBOX_NAME: [soup.pk],
+                "is_vegetarian": "false",
+                "round_to": "0.01",
+                "_apply": "1",
+            },
+        )
+
+        assert list(menu.dishes.filter(is_vegetarian=False).values_list("name", flat=True).order_by("name")) == [
+            "Soup",
+            "Steak",
+        ]
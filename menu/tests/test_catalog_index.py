@@ -0,0 +1,266 @@
+"""
+Tests for the in-process catalog index.
+"""
+
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from menu import catalog_index
+from menu.catalog import bump_version
+from menu.catalog_index import clear_index, get_index
+from menu.models import Dish, Menu
+
+MENUS_URL = reverse("menu:menu-list")
+DISHES_URL = reverse("menu:dish-list")
+
+# (name, price, prep time, vegetarian); prices, prep times and names repeat to exercise ties.
+DISHES = {
+    "Lunch": [
+        ("Soup", "4.50", 10, True),
+        ("salad bowl", "9.90", 10, True),
+        ("Steak", "32.00", 40, False),
+        ("Soup", "4.50", 15, False),
+    ],
+    "Dinner": [
+        ("Lobster", "75.00", 90, False),
+        ("Risotto", "18.00", 30, True),
+        ("Soup", "9.90", 10, True),
+    ],
+    "Brunch": [
+        ("Pancakes", "9.90", 15, True),
+    ],
+}
+
+DISH_QUERIES = [
+    {},
+    {"menu": "lunch"},
+    {"is_vegetarian": "true"},
+    {"is_vegetarian": "false"},
+    {"price__gte": "9.90"},
+    {"price__lte": "9.9"},
+    {"price__gte": "5", "price__lte": "20"},
+    {"prep_time__lte": "15"},
+    {"prep_time__lte": "14.5", "is_vegetarian": "true"},
+    {"menu": "dinner", "price__lte": "20"},
+    {"search": "soup"},
+    {"search": "SALAD bowl"},
+    {"search": "o, s"},
+    {"search": "nothing"},
+    {"ordering": "price"},
+    {"ordering": "-price"},
+    {"ordering": "prep_time"},
+    {"ordering": "-prep_time"},
+    {"ordering": "name"},
+    {"ordering": "-name"},
+    {"ordering": "-created_at"},
+    {"ordering": "unknown"},
+    {"ordering": "price", "is_vegetarian": "true"},
+    {"ordering": "-price", "menu": "lunch"},
+    {"ordering": "prep_time", "search": "soup"},
+]
+
+MENU_QUERIES = [
+    {},
+    {"name": "Lunch"},
+    {"name": "lunch"},
+    {"search": "unch"},
+    {"ordering": "name"},
+    {"ordering": "-name"},
+    {"ordering": "created_at"},
+    {"ordering": "-created_at"},
+]
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    """Start and end every test without an index in memory."""
+    clear_index()
+    yield
+    clear_index()
+
+
+@pytest.fixture
+def catalog() -> dict[str, Menu]:
+    """Fixture creating menus with dishes, one dish with an image, and an empty menu."""
+    menus = {}
+    for menu_name, dishes in DISHES.items():
+        menu = menus[menu_name.lower()] = Menu.objects.create(name=menu_name, description=f"{menu_name} card")
+        for name, price, prep_time, is_vegetarian in dishes:
+            Dish.objects.create(
+                menu=menu, name=name, price=Decimal(price), prep_time=prep_time, is_vegetarian=is_vegetarian
+            )
+    dish = Dish.objects.get(name="Lobster")
+    dish.image = SimpleUploadedFile("lobster.jpg", b"jpeg", content_type="image/jpeg")
+    dish.save()
+    menus["empty"] = Menu.objects.create(name="Empty")
+    return menus
+
+
+@pytest.fixture
+def user_client() -> APIClient:
+    """Fixture for an authenticated client."""
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user("user@example.com", "testpass123"))
+    return client
+
+
+def resolve(params: dict, menus: dict[str, Menu]) -> dict:
+    """Replace menu names in ``params`` by their ids."""
+    return {key: str(menus[value].pk) if key == "menu" else value for key, value in params.items()}
+
+
+def both_paths(settings, client: APIClient, url: str, params: dict | None = None):
+    """Return the responses of the ORM and of the index to the same request, and the queries of the latter."""
+    settings.MENU_CATALOG_INDEX = False
+    orm = client.get(url, params)
+    settings.MENU_CATALOG_INDEX = True
+    get_index()
+    with CaptureQueriesContext(connection) as queries:
+        indexed = client.get(url, params)
+    return orm, indexed, queries
+
+
+@pytest.mark.django_db
+class TestIndexMatchesOrm:
+    """Test that the index answers exactly like the database."""
+
+    @pytest.mark.parametrize("params", DISH_QUERIES, ids=[str(params) for params in DISH_QUERIES])
+    def test_dish_list(self, settings, catalog, params):
+        """Test that dish lists are identical and served without SQL."""
+        orm, indexed, queries = both_paths(settings, APIClient(), DISHES_URL, resolve(params, catalog))
+
+        assert indexed.status_code == orm.status_code == 200
+        assert indexed.content == orm.content
+        assert [query["sql"] for query in queries if "menu_" in query["sql"]] == []
+
+    @pytest.mark.parametrize("params", MENU_QUERIES, ids=[str(params) for params in MENU_QUERIES])
+    @pytest.mark.parametrize("authenticated", [False, True], ids=["anonymous", "authenticated"])
+    def test_menu_list(self, settings, catalog, user_client, params, authenticated):
+        """Test that menu lists are identical for anonymous and authenticated users."""
+        client = user_client if authenticated else APIClient()
+
+        orm, indexed, queries = both_paths(settings, client, MENUS_URL, params)
+
+        assert indexed.content == orm.content
+        assert [query["sql"] for query in queries if "menu_" in query["sql"]] == []
+
+    @pytest.mark.parametrize("authenticated", [False, True], ids=["anonymous", "authenticated"])
+    def test_menu_detail(self, settings, catalog, user_client, authenticated):
+        """Test that menu details, with absolute image URLs, are identical."""
+        client = user_client if authenticated else APIClient()
+        for menu in catalog.values():
+            url = reverse("menu:menu-detail", args=[menu.pk])
+
+            orm, indexed, _ = both_paths(settings, client, url)
+
+            assert indexed.status_code == orm.status_code
+            assert indexed.content == orm.content
+        assert (
+            b"http://testserver/media/uploads/dish/"
+            in client.get(reverse("menu:menu-detail", args=[catalog["dinner"].pk])).content
+        )
+
+    def test_dish_detail(self, settings, catalog):
+        """Test that dish details are identical."""
+        for dish_id in [*Dish.objects.values_list("pk", flat=True), 999]:
+            orm, indexed, _ = both_paths(settings, APIClient(), reverse("menu:dish-detail", args=[dish_id]))
+
+            assert indexed.status_code == orm.status_code
+            assert indexed.content == orm.content
+
+
+@pytest.mark.django_db
+class TestIndexFallback:
+    """Test the requests the index leaves to the database."""
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {"facets": "true"},
+            {"created_at": "2025-01-01"},
+            {"ordering": "price,name"},
+            {"price__gte": "abc"},
+            {"menu": "999"},
+            {"is_vegetarian": "maybe"},
+        ],
+    )
+    def test_unsupported_dish_queries(self, settings, catalog, params):
+        """Test that unsupported or invalid parameters are answered by the database."""
+        orm, indexed, queries = both_paths(settings, APIClient(), DISHES_URL, params)
+
+        assert indexed.status_code == orm.status_code
+        assert indexed.content == orm.content
+        # Invalid filters are rejected by the filterset before any dish query.
+        assert orm.status_code == 400 or any("menu_dish" in query["sql"] for query in queries)
+
+    def test_search_needs_sqlite_semantics(self, settings, catalog, monkeypatch):
+        """Test that text search falls back to the database unless it folds case like the index."""
+        settings.MENU_CATALOG_INDEX = True
+        get_index()
+        monkeypatch.setattr(catalog_index, "exact_text_semantics", lambda: False)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(DISHES_URL, {"search": "soup"})
+
+        assert len(res.json()) == 3
+        assert any("menu_dish" in query["sql"] for query in queries)
+
+    def test_pinned_client_reads_database(self, settings, catalog, user_client):
+        """Test that a client that just wrote is not answered from a possibly stale index."""
+        settings.MENU_CATALOG_INDEX = True
+        get_index()
+        res = user_client.post(MENUS_URL, {"name": "Supper"})
+        assert res.status_code == 201
+
+        with CaptureQueriesContext(connection) as queries:
+            user_client.get(MENUS_URL)
+
+        assert any("menu_menu" in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+class TestIndexRefresh:
+    """Test keeping the index up to date."""
+
+    def test_refreshed_on_new_version(self, settings, catalog):
+        """Test that added, changed and deleted rows are picked up after a catalog change."""
+        settings.MENU_CATALOG_INDEX = True
+        index = get_index()
+        soup = Dish.objects.filter(name="Soup").first()
+        soup.price = Decimal("5.00")
+        soup.save()
+        Dish.objects.create(menu=catalog["empty"], name="Toast", price=3, prep_time=5)
+        Dish.objects.get(name="Steak").delete()
+
+        assert get_index() is index
+        bump_version()
+        refreshed = get_index()
+
+        assert refreshed is not index
+        assert refreshed.dishes[soup.pk].price == Decimal("5.00")
+        assert "Steak" not in {dish.name for dish in refreshed.dishes.values()}
+        assert len(refreshed.by_menu[catalog["empty"].pk]) == 1
+        orm, indexed, _ = both_paths(settings, APIClient(), MENUS_URL)
+        assert indexed.content == orm.content
+
+    def test_refreshed_when_old(self, settings, catalog):
+        """Test that an index older than MENU_CATALOG_INDEX_MAX_AGE is refreshed without a version change."""
+        settings.MENU_CATALOG_INDEX = True
+        index = get_index()
+
+        settings.MENU_CATALOG_INDEX_MAX_AGE = 0
+
+        assert get_index() is not index
+
+    def test_disabled_by_default(self, catalog):
+        """Test that without MENU_CATALOG_INDEX the index is never loaded."""
+        APIClient().get(DISHES_URL)
+
+        assert catalog_index._index is None
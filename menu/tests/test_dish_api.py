@@ -73,6 +73,41 @@ class TestPublicDishApi:
         assert res.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+@pytest.mark.django_db
+class TestDishListFilters:
+    """Test the range filters and orderings of the dish list."""
+
+    @pytest.fixture
+    def dishes(self, menu):
+        """Fixture creating dishes with different prices and preparation times."""
+        Dish.objects.create(menu=menu, name="Soup", price=Decimal("6.00"), prep_time=10, is_vegetarian=True)
+        Dish.objects.create(menu=menu, name="Curry", price=Decimal("14.00"), prep_time=25, is_vegetarian=True)
+        Dish.objects.create(menu=menu, name="Risotto", price=Decimal("18.00"), prep_time=30, is_vegetarian=True)
+        Dish.objects.create(menu=menu, name="Burger", price=Decimal("12.00"), prep_time=5)
+
+    def names(self, client, params: dict) -> list[str]:
+        res = client.get(DISHES_URL, params)
+        assert res.status_code == status.HTTP_200_OK
+        return [dish["name"] for dish in res.data]
+
+    def test_vegetarian_under_price_fastest_first(self, client, dishes):
+        """Test filtering vegetarian dishes under a price, fastest first."""
+        params = {"is_vegetarian": "true", "price__lte": "15", "ordering": "-prep_time"}
+
+        assert self.names(client, params) == ["Curry", "Soup"]
+
+    def test_ranges(self, client, dishes):
+        """Test the price and preparation time range filters."""
+        assert self.names(client, {"price__gte": "12", "price__lte": "14"}) == ["Curry", "Burger"]
+        assert self.names(client, {"prep_time__lte": "10", "ordering": "prep_time"}) == ["Burger", "Soup"]
+        assert self.names(client, {"is_vegetarian": "false"}) == ["Burger"]
+
+    def test_orderings(self, client, dishes):
+        """Test ordering by price and name."""
+        assert self.names(client, {"ordering": "price"}) == ["Soup", "Burger", "Curry", "Risotto"]
+        assert self.names(client, {"ordering": "-name"}) == ["Soup", "Risotto", "Curry", "Burger"]
+
+
 @pytest.mark.django_db
 class TestPrivateDishApi:
     """Test authenticated dish API requests."""
@@ -0,0 +1,134 @@
+"""
+Query plan tests for the filters and orderings of the dish list.
+
+Every advertised combination must be answerable by a seek on its matching
+index of Dish (and, when ordered, without sorting), however large the table.
+On SQLite the plans are checked with ``INDEXED BY``; on PostgreSQL the other
+dish indexes are dropped inside the test transaction and the planner is kept
+off sequential and bitmap scans. Either way the plans do not depend on the
+planner's row estimates for the small test table.
+"""
+
+import re
+
+import pytest
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from menu.models import Dish, Menu
+from menu.views import DishViewSet
+
+MENU = "MENU"
+
+# (query parameters, index, constraints of the seek or None for an ordered index scan)
+INDEXED_QUERIES = [
+    ({"menu": MENU}, "dish_menu_price_idx", "menu_id=?"),
+    ({"menu": MENU, "price__gte": "5", "price__lte": "15"}, "dish_menu_price_idx", "menu_id=? AND price>? AND price<?"),
+    ({"menu": MENU, "ordering": "-price"}, "dish_menu_price_idx", "menu_id=?"),
+    ({"menu": MENU, "prep_time__lte": "20"}, "dish_menu_prep_time_idx", "menu_id=? AND prep_time<?"),
+    ({"menu": MENU, "ordering": "prep_time"}, "dish_menu_prep_time_idx", "menu_id=?"),
+    ({"menu": MENU, "is_vegetarian": "true"}, "dish_menu_veg_price_idx", "menu_id=? AND is_vegetarian=?"),
+    (
+        {"menu": MENU, "is_vegetarian": "false", "price__lte": "15", "ordering": "-price"},
+        "dish_menu_veg_price_idx",
+        "menu_id=? AND is_vegetarian=? AND price<?",
+    ),
+    ({"menu": MENU, "ordering": "name"}, "dish_menu_name_idx", "menu_id=?"),
+    ({"menu": MENU, "ordering": "-created_at"}, "dish_menu_created_at_idx", "menu_id=?"),
+    ({"is_vegetarian": "true", "price__lte": "15"}, "dish_veg_price_idx", "is_vegetarian=? AND price<?"),
+    ({"is_vegetarian": "false", "ordering": "price"}, "dish_veg_price_idx", "is_vegetarian=?"),
+    ({"is_vegetarian": "true", "prep_time__lte": "20"}, "dish_veg_prep_time_idx", "is_vegetarian=? AND prep_time<?"),
+    (
+        {"is_vegetarian": "true", "price__lte": "15", "ordering": "prep_time"},
+        "dish_veg_prep_time_idx",
+        "is_vegetarian=?",
+    ),
+    ({"price__gte": "5", "price__lte": "15"}, "dish_price_idx", "price>? AND price<?"),
+    ({"price__gte": "5", "ordering": "price"}, "dish_price_idx", "price>?"),
+    ({"prep_time__lte": "20", "ordering": "-prep_time"}, "dish_prep_time_idx", "prep_time<?"),
+    ({"ordering": "name"}, "dish_name_idx", None),
+    ({"ordering": "-created_at"}, "dish_created_at_idx", None),
+]
+
+
+def dish_list_sql(params: dict) -> tuple[str, tuple]:
+    """Return the SQL of the dish list for query ``params``."""
+    view = DishViewSet(action="list", format_kwarg=None)
+    view.request = Request(APIRequestFactory().get("/api/menu/dishes/", params))
+    return view.filter_queryset(view.get_queryset()).query.sql_with_params()
+
+
+def dish_plan(sql: str, params: tuple, index: str) -> list[str]:
+    """Return the plan steps of ``sql`` on the dish table when forced to use ``index``."""
+    sql = sql.replace('FROM "menu_dish"', f'FROM "menu_dish" INDEXED BY "{index}"', 1)
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def postgres_plan(sql: str, params: tuple, index: str) -> str:
+    """Return the plan of ``sql`` with ``index`` as the only dish index and no sequential or bitmap scans."""
+    with connection.cursor() as cursor:
+        for other in Dish._meta.indexes:
+            if other.name != index:
+                cursor.execute(f'DROP INDEX "{other.name}"')
+        for setting in ("enable_seqscan", "enable_bitmapscan"):
+            cursor.execute(f"SET LOCAL {setting} = off")
+        cursor.execute("ANALYZE menu_dish")
+        cursor.execute(f"EXPLAIN {sql}", params)
+        return "\n".join(row[0] for row in cursor.fetchall())
+
+
+def with_menu(params: dict, menu: Menu) -> dict:
+    """Return ``params`` with the MENU placeholder replaced by the id of ``menu``."""
+    return {name: str(menu.pk) if value == MENU else value for name, value in params.items()}
+
+
+@pytest.mark.django_db
+class TestDishListPlans:
+    """Test that the dish list filters and orderings are served by indexes."""
+
+    @pytest.mark.skipif(connection.vendor != "sqlite", reason="INDEXED BY is SQLite syntax")
+    @pytest.mark.parametrize(("params", "index", "constraints"), INDEXED_QUERIES)
+    def test_index_seek(self, params, index, constraints):
+        """Test that the combination is a seek (or an ordered scan) of its index without sorting."""
+        params = with_menu(params, Menu.objects.create(name="Lunch"))
+        sql, sql_params = dish_list_sql(params)
+
+        plan = dish_plan(sql, sql_params, index)
+
+        if constraints is None:
+            assert f"SCAN menu_dish USING INDEX {index}" in plan
+        else:
+            assert f"SEARCH menu_dish USING INDEX {index} ({constraints})" in plan
+        if "ordering" in params:
+            assert not any("TEMP B-TREE" in step for step in plan)
+
+    @pytest.mark.skipif(connection.vendor != "postgresql", reason="checks PostgreSQL plans")
+    @pytest.mark.parametrize(("params", "index", "constraints"), INDEXED_QUERIES)
+    def test_postgres_index_scan(self, params, index, constraints):
+        """Test that PostgreSQL answers the combination with an index scan of its index without sorting."""
+        menu = Menu.objects.create(name="Lunch")
+        Dish.objects.bulk_create(
+            Dish(
+                menu=menu,
+                name=f"Dish {number}",
+                price=number % 30,
+                prep_time=number % 60,
+                is_vegetarian=number % 2 == 0,
+            )
+            for number in range(200)
+        )
+        params = with_menu(params, menu)
+        sql, sql_params = dish_list_sql(params)
+
+        plan = postgres_plan(sql, sql_params, index)
+
+        assert re.search(rf"Index (Only )?Scan (Backward )?using {index} on menu_dish", plan), plan
+        if "ordering" in params:
+            assert "Sort" not in plan, plan
+
+    def test_every_index_advertised(self):
+        """Test that each dish index backs at least one advertised combination."""
+        assert {index.name for index in Dish._meta.indexes} == {index for _, index, _ in INDEXED_QUERIES}
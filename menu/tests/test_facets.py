@@ -0,0 +1,81 @@
+"""
+Tests for the facet counts of the dish list.
+"""
+
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu.catalog import bump_version
+from menu.models import Dish, Menu
+
+DISHES_URL = reverse("menu:dish-list")
+
+
+@pytest.fixture
+def dishes() -> None:
+    """Fixture creating dishes on two menus."""
+    lunch = Menu.objects.create(name="Lunch")
+    dinner = Menu.objects.create(name="Dinner")
+    Dish.objects.create(menu=lunch, name="Soup", price=Decimal("4.50"), prep_time=10, is_vegetarian=True)
+    Dish.objects.create(menu=lunch, name="Salad", price=Decimal("10.00"), prep_time=15, is_vegetarian=True)
+    Dish.objects.create(menu=dinner, name="Steak", price=Decimal("32.00"), prep_time=40)
+    Dish.objects.create(menu=dinner, name="Lobster", price=Decimal("75.00"), prep_time=90)
+
+
+@pytest.mark.django_db
+class TestDishFacets:
+    """Test the facets response mode of the dish list."""
+
+    def test_plain_list_unchanged(self, dishes):
+        """Test that the list without facets is still a plain list."""
+        res = APIClient().get(DISHES_URL)
+
+        assert isinstance(res.data, list)
+        assert len(res.data) == 4
+
+    def test_facets_in_one_query(self, dishes):
+        """Test that all facets are counted by a single query next to the result list."""
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(DISHES_URL, {"facets": "true"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.data["results"]) == 4
+        assert res.data["facets"] == {
+            "count": 4,
+            "is_vegetarian": {"true": 2, "false": 2},
+            "price": {"0-10": 1, "10-20": 1, "20-50": 1, "50+": 1},
+            "prep_time": {"0-15": 1, "15-30": 1, "30-60": 1, "60+": 1},
+            "menu": [
+                {"id": Menu.objects.get(name="Dinner").pk, "name": "Dinner", "count": 2},
+                {"id": Menu.objects.get(name="Lunch").pk, "name": "Lunch", "count": 2},
+            ],
+        }
+        assert len([query for query in queries if "menu_dish" in query["sql"]]) == 2
+
+    def test_facets_follow_filters(self, dishes):
+        """Test that the facets count the filtered and searched list."""
+        res = APIClient().get(DISHES_URL, {"facets": "1", "is_vegetarian": "true", "search": "s"})
+
+        assert res.data["facets"]["count"] == 2
+        assert res.data["facets"]["menu"] == [{"id": Menu.objects.get(name="Lunch").pk, "name": "Lunch", "count": 2}]
+
+    def test_cached_per_catalog_version(self, dishes):
+        """Test that facets are cached until the catalog version changes."""
+        client = APIClient()
+        client.get(DISHES_URL, {"facets": "true"})
+        Dish.objects.filter(name="Lobster").update(is_vegetarian=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = client.get(DISHES_URL, {"facets": "true"})
+        bump_version()
+        fresh = client.get(DISHES_URL, {"facets": "true"})
+
+        assert len([query for query in queries if "GROUP BY" in query["sql"]]) == 0
+        assert cached.data["facets"]["is_vegetarian"] == {"true": 2, "false": 2}
+        assert fresh.data["facets"]["is_vegetarian"] == {"true": 3, "false": 1}
@@ -4,6 +4,8 @@ Tests for the Menu API.
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -203,3 +205,81 @@ class TestPrivateMenuApi:
         names = [menu["name"] for menu in res.data]
         assert m_empty.name in names
         assert m_full.name in names
+
+
+@pytest.mark.django_db
+class TestNestedDishes:
+    """Test paging the dishes of a menu detail and previewing dishes in the menu list."""
+
+    @pytest.fixture
+    def menus(self) -> list[Menu]:
+        """Fixture creating three menus of five dishes."""
+        menus = [Menu.objects.create(name=f"Menu {index}") for index in range(3)]
+        for menu in menus:
+            for index in range(5):
+                Dish.objects.create(menu=menu, name=f"{menu.name} dish {index}", price=10, prep_time=5)
+        return menus
+
+    def test_dishes_pages(self, client, menus):
+        """Test that following the next links returns every dish once, in order, two queries per page."""
+        url = f"{detail_url(menus[1].id)}?dishes_limit=2"
+        ids, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                res = client.get(url)
+            assert res.status_code == status.HTTP_200_OK
+            assert len(res.data["dishes"]) <= 2
+            ids.extend(dish["id"] for dish in res.data["dishes"])
+            queries.append(len(captured))
+            url = res.data["dishes_next"]
+
+        assert ids == list(menus[1].dishes.order_by("id").values_list("id", flat=True))
+        assert queries == [2, 2, 2]
+
+    def test_dishes_page_from_cursor(self, client, settings, menus):
+        """Test that a cursor alone pages with MENU_DETAIL_DISHES_LIMIT, also with the catalog index."""
+        settings.MENU_DETAIL_DISHES_LIMIT = 3
+        settings.MENU_CATALOG_INDEX = True
+        dishes = list(menus[0].dishes.order_by("id"))
+
+        res = client.get(detail_url(menus[0].id), {"dishes_cursor": dishes[0].id})
+
+        assert [dish["id"] for dish in res.data["dishes"]] == [dish.id for dish in dishes[1:4]]
+        assert res.data["dishes_next"].endswith(f"dishes_cursor={dishes[3].id}")
+
+    def test_dishes_unpaged(self, client, menus):
+        """Test that without paging parameters the detail embeds every dish."""
+        res = client.get(detail_url(menus[0].id))
+
+        assert len(res.data["dishes"]) == 5
+        assert "dishes_next" not in res.data
+
+    @pytest.mark.parametrize("params", [{"dishes_limit": 0}, {"dishes_cursor": -1}, {"dishes_limit": "all"}])
+    def test_dishes_invalid(self, client, menus, params):
+        """Test that invalid paging parameters are rejected."""
+        assert client.get(detail_url(menus[0].id), params).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_preview_one_query(self, client, user, menus):
+        """Test that the first dishes of every menu are read with one window function query."""
+        client.force_authenticate(user)
+        empty = Menu.objects.create(name="Empty")
+
+        with CaptureQueriesContext(connection) as captured:
+            res = client.get(MENU_URL, {"preview": 2})
+
+        assert res.status_code == status.HTTP_200_OK
+        for menu in res.data:
+            expected = Dish.objects.filter(menu_id=menu["id"]).order_by("id").values_list("id", flat=True)[:2]
+            assert [dish["id"] for dish in menu["dishes_preview"]] == list(expected)
+        assert res.data[-1]["id"] == empty.id
+        assert res.data[-1]["dishes_preview"] == []
+        assert len(captured) == 2
+        assert "ROW_NUMBER" in captured[1]["sql"].upper()
+
+    def test_preview_capped(self, client, settings, menus):
+        """Test that the preview is capped at MENU_PREVIEW_MAX_DISHES and absent without ?preview=."""
+        settings.MENU_PREVIEW_MAX_DISHES = 3
+
+        assert [len(menu["dishes_preview"]) for menu in client.get(MENU_URL, {"preview": 100}).data] == [3, 3, 3]
+        assert "dishes_preview" not in client.get(MENU_URL).data[0]
+        assert client.get(MENU_URL, {"preview": -1}).status_code == status.HTTP_400_BAD_REQUEST
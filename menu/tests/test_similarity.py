@@ -0,0 +1,263 @@
+"""
+Tests for the similar dishes index and endpoint.
+"""
+
+import math
+from collections import Counter
+from decimal import Decimal
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from menu import similarity, tasks
+from menu.models import Dish, Menu
+from menu.similarity import REBUILD_QUEUED_KEY, build, clear_index, get_index, word_counts
+
+# (name, description, price, prep time, vegetarian)
+DISHES = [
+    ("Margherita Pizza", "Tomato, mozzarella and basil", "30.00", 15, True),
+    ("Pepperoni Pizza", "Tomato, mozzarella and spicy salami", "35.00", 15, False),
+    ("Veggie Pizza", "Tomato, mozzarella, peppers and basil", "32.00", 15, True),
+    ("Caesar Salad", "Romaine, parmesan and croutons", "24.00", 10, False),
+    ("Chocolate Cake", "Dark chocolate and cream", "18.00", 5, True),
+    ("Tomato Soup", "Roasted tomato and basil", "16.00", 20, True),
+    ("Steak", "", "80.00", 30, False),
+]
+
+
+@pytest.fixture(autouse=True)
+def similarity_settings(settings, tmp_path):
+    """Enable the endpoint with the index in a temporary file, and no index loaded."""
+    settings.MENU_SIMILARITY = True
+    settings.MENU_SIMILARITY_PATH = str(tmp_path / "similar_dishes.npz")
+    clear_index()
+    yield
+    clear_index()
+
+
+@pytest.fixture
+def queued(monkeypatch) -> list[dict]:
+    """Record the queued rebuilds instead of sending them to the broker."""
+    calls = []
+    monkeypatch.setattr(tasks.build_similar_dishes, "apply_async", lambda **kwargs: calls.append(kwargs))
+    return calls
+
+
+@pytest.fixture
+def dishes() -> dict[str, Dish]:
+    """Fixture creating the dishes of DISHES on one menu."""
+    menu = Menu.objects.create(name="Trattoria")
+    return {
+        name: Dish.objects.create(
+            menu=menu,
+            name=name,
+            description=description,
+            price=Decimal(price),
+            prep_time=prep_time,
+            is_vegetarian=is_vegetarian,
+        )
+        for name, description, price, prep_time, is_vegetarian in DISHES
+    }
+
+
+def similar_url(dish_id: int) -> str:
+    """Return the similar dishes URL of a dish."""
+    return reverse("menu:dish-similar", args=[dish_id])
+
+
+def brute_force(dish: Dish, others: list[Dish]) -> list[int]:
+    """Rank ``others`` by the documented similarity to ``dish``, computed without the index."""
+    documents = {other.pk: word_counts(other.name, other.description) for other in others}
+    frequency = Counter(word for counts in documents.values() for word in counts)
+
+    def vector(counts: Counter) -> dict[str, float]:
+        weights = {
+            word: (1 + math.log(count)) * (math.log((1 + len(others)) / (1 + frequency[word])) + 1)
+            for word, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1
+        return {word: weight / norm for word, weight in weights.items()}
+
+    def standardized(values: list[float]) -> dict[int, float]:
+        logs = [math.log1p(value) for value in values]
+        mean = sum(logs) / len(logs)
+        std = math.sqrt(sum((value - mean) ** 2 for value in logs) / len(logs)) or 1
+        return {other.pk: (log - mean) / std for other, log in zip(others, logs, strict=True)}
+
+    prices = standardized([float(other.price) for other in others])
+    prep_times = standardized([other.prep_time for other in others])
+    target = vector(documents[dish.pk])
+
+    def score(other: Dish) -> float:
+        text = sum(weight * target.get(word, 0) for word, weight in vector(documents[other.pk]).items())
+        return (
+            similarity.TEXT_WEIGHT * text
+            + similarity.PRICE_WEIGHT * math.exp(-abs(prices[other.pk] - prices[dish.pk]))
+            + similarity.PREP_TIME_WEIGHT * math.exp(-abs(prep_times[other.pk] - prep_times[dish.pk]))
+            + similarity.VEGETARIAN_WEIGHT * (other.is_vegetarian == dish.is_vegetarian)
+        )
+
+    return [other.pk for other in sorted(others, key=lambda other: (-score(other), other.pk)) if other != dish]
+
+
+@pytest.mark.django_db
+class TestSimilarityIndex:
+    """Test building and querying the index."""
+
+    def test_matches_brute_force(self, dishes):
+        """Test that the vectorized ranking matches the similarity computed dish by dish."""
+        build()
+        index = get_index()
+        ordered = sorted(dishes.values(), key=lambda dish: dish.pk)
+
+        for dish in ordered:
+            assert list(index.similar(dish.pk, len(ordered))) == brute_force(dish, ordered)
+
+    def test_pizzas_closest(self, dishes):
+        """Test that dishes sharing words, price range and flag come first."""
+        build()
+
+        assert get_index().similar(dishes["Margherita Pizza"].pk, 2) == (
+            dishes["Veggie Pizza"].pk,
+            dishes["Pepperoni Pizza"].pk,
+        )
+
+    def test_reloaded_when_rebuilt(self, dishes):
+        """Test that web processes pick up a rebuilt index."""
+        build()
+        index = get_index()
+        Dish.objects.create(menu=dishes["Steak"].menu, name="Calzone", price=30, prep_time=15)
+
+        build()
+
+        assert get_index() is not index
+        assert len(get_index()) == len(DISHES) + 1
+
+    def test_empty_catalog(self):
+        """Test that an index of no dishes can be built and queried."""
+        build()
+
+        assert len(get_index()) == 0
+        assert get_index().similar(1, 5) is None
+
+
+@pytest.mark.django_db
+class TestSimilarDishesApi:
+    """Test the similar dishes endpoint."""
+
+    def test_one_query(self, dishes):
+        """Test that similar dishes are served with a single query and without the dish itself."""
+        build()
+        get_index()
+        margherita = dishes["Margherita Pizza"]
+
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(similar_url(margherita.pk), {"limit": 3})
+
+        assert res.status_code == 200
+        assert [dish["name"] for dish in res.json()] == ["Veggie Pizza", "Pepperoni Pizza", "Tomato Soup"]
+        assert len(queries) == 1
+
+    def test_deleted_dishes(self, dishes):
+        """Test that dishes deleted since the build are neither suggested nor answered."""
+        build()
+        dishes["Veggie Pizza"].delete()
+        steak = dishes["Steak"].pk
+        dishes["Steak"].delete()
+
+        res = APIClient().get(similar_url(dishes["Margherita Pizza"].pk), {"limit": 10})
+
+        assert [dish["name"] for dish in res.json()][:2] == ["Pepperoni Pizza", "Tomato Soup"]
+        assert len(res.json()) == len(DISHES) - 3
+        assert APIClient().get(similar_url(steak)).status_code == 404
+
+    def test_dish_newer_than_index(self, dishes):
+        """Test that a dish added after the build is compared from its own row."""
+        build()
+        calzone = Dish.objects.create(
+            menu=dishes["Steak"].menu,
+            name="Calzone",
+            description="Folded pizza, tomato, mozzarella",
+            price=31,
+            prep_time=15,
+        )
+
+        res = APIClient().get(similar_url(calzone.pk), {"limit": 2})
+
+        assert res.status_code == 200
+        assert {dish["name"] for dish in res.json()} <= {"Margherita Pizza", "Pepperoni Pizza", "Veggie Pizza"}
+        assert APIClient().get(similar_url(calzone.pk + 100)).status_code == 404
+
+    def test_not_built(self, dishes, queued):
+        """Test that a missing index answers 503 and queues a build once."""
+        res = APIClient().get(similar_url(dishes["Steak"].pk))
+        APIClient().get(similar_url(dishes["Steak"].pk))
+
+        assert res.status_code == 503
+        assert res["Retry-After"] == "60"
+        assert len(queued) == 1
+
+    def test_limit_capped(self, settings, dishes):
+        """Test that the limit is capped at MENU_SIMILAR_DISHES_MAX_LIMIT."""
+        settings.MENU_SIMILAR_DISHES_MAX_LIMIT = 2
+        build()
+
+        assert len(APIClient().get(similar_url(dishes["Steak"].pk), {"limit": 100}).json()) == 2
+        assert APIClient().get(similar_url(dishes["Steak"].pk), {"limit": 0}).status_code == 400
+
+    def test_disabled(self, settings, dishes):
+        """Test that the endpoint is not found without MENU_SIMILARITY."""
+        settings.MENU_SIMILARITY = False
+        build()
+
+        assert APIClient().get(similar_url(dishes["Steak"].pk)).status_code == 404
+
+
+@pytest.mark.django_db
+class TestRebuild:
+    """Test rebuilding the index after catalog changes."""
+
+    def test_changes_queue_one_build(self, queued, django_capture_on_commit_callbacks):
+        """Test that a burst of committed changes queues a single delayed build."""
+        with django_capture_on_commit_callbacks(execute=True):
+            menu = Menu.objects.create(name="Lunch")
+            Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+
+        assert queued == [{"countdown": 60}]
+
+    def test_disabled(self, settings, queued, django_capture_on_commit_callbacks):
+        """Test that nothing is queued without MENU_SIMILARITY."""
+        settings.MENU_SIMILARITY = False
+        with django_capture_on_commit_callbacks(execute=True):
+            Menu.objects.create(name="Lunch")
+
+        assert queued == []
+
+    def test_next_build_queued_when_due(self, queued, django_capture_on_commit_callbacks):
+        """Test that a change after the queued build is due queues the next one, without the worker's help."""
+        with django_capture_on_commit_callbacks(execute=True):
+            menu = Menu.objects.create(name="Lunch")
+
+        # What expiry does once the countdown has passed.
+        cache.delete(REBUILD_QUEUED_KEY)
+        with django_capture_on_commit_callbacks(execute=True):
+            Dish.objects.create(menu=menu, name="Soup", price=5, prep_time=10)
+
+        assert queued == [{"countdown": 60}, {"countdown": 60}]
+
+    def test_marker_expires_when_due(self, settings, queued):
+        """Test that the queued marker lives exactly as long as the countdown of the build."""
+        with patch.object(cache, "add", wraps=cache.add) as add:
+            similarity.rebuild_later()
+
+        add.assert_called_once_with(REBUILD_QUEUED_KEY, True, timeout=settings.MENU_SIMILARITY_REBUILD_DELAY)
+
+    def test_task(self, dishes):
+        """Test that the task writes the index."""
+        assert tasks.build_similar_dishes() == len(DISHES)
+        assert get_index() is not None
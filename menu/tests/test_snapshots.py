@@ -0,0 +1,271 @@
+"""
+Tests for published menu snapshots.
+"""
+
+import gzip
+import json
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from menu import snapshots
+from menu.bulk import DishAdjustment, adjust_dishes
+from menu.models import Dish, Menu, MenuSnapshot
+from menu.serializers import MenuDetailSerializer
+from menu.tasks import publish_menu
+
+
+def detail_url(menu_id: int) -> str:
+    """Return menu detail URL."""
+    return reverse("menu:menu-detail", args=[menu_id])
+
+
+def publish_url(menu_id: int) -> str:
+    """Return menu publish URL."""
+    return reverse("menu:menu-publish", args=[menu_id])
+
+
+@pytest.fixture
+def menu() -> Menu:
+    """Fixture creating a menu with two dishes."""
+    menu = Menu.objects.create(name="Lunch", description="Served at noon")
+    Dish.objects.create(menu=menu, name="Soup", price=Decimal("4.50"), prep_time=10, is_vegetarian=True)
+    Dish.objects.create(menu=menu, name="Steak", price=Decimal("32.00"), prep_time=40)
+    return menu
+
+
+@pytest.fixture
+def published(menu, django_capture_on_commit_callbacks) -> Menu:
+    """Fixture publishing the menu, with the snapshot cached."""
+    with django_capture_on_commit_callbacks(execute=True):
+        snapshots.publish(menu.pk)
+    menu.refresh_from_db()
+    return menu
+
+
+@pytest.fixture
+def staff_client() -> APIClient:
+    """Fixture for a client authenticated as a user."""
+    client = APIClient()
+    client.force_authenticate(get_user_model().objects.create_user("staff@example.com", "testpass123"))
+    return client
+
+
+@pytest.mark.django_db
+class TestPublish:
+    """Test rendering menus into snapshots."""
+
+    def test_snapshot_matches_live_payload(self, menu):
+        """Test that the snapshot holds the detail payload and its gzip encoding."""
+        snapshot = snapshots.publish(menu.pk)
+
+        menu.refresh_from_db()
+        assert menu.published_version == snapshot.version == 1
+        payload = json.loads(bytes(snapshot.body))
+        assert payload == json.loads(json.dumps(MenuDetailSerializer(menu).data))
+        assert [dish["name"] for dish in payload["dishes"]] == ["Soup", "Steak"]
+        assert gzip.decompress(bytes(snapshot.body_gzip)) == bytes(snapshot.body)
+
+    def test_unchanged_content_keeps_version(self, menu):
+        """Test that publishing twice without edits does not add a snapshot."""
+        first = snapshots.publish(menu.pk)
+        second = snapshots.publish(menu.pk)
+
+        assert second.pk == first.pk
+        assert MenuSnapshot.objects.filter(menu=menu).count() == 1
+
+    def test_versions_and_pruning(self, menu):
+        """Test that every edit published gets the next version and old snapshots are pruned."""
+        for price in range(1, snapshots.KEEP_VERSIONS + 3):
+            Dish.objects.filter(menu=menu).update(price=price)
+            snapshots.publish(menu.pk)
+
+        versions = list(MenuSnapshot.objects.filter(menu=menu).order_by("version").values_list("version", flat=True))
+        assert versions == [3, 4, 5]
+        menu.refresh_from_db()
+        assert menu.published_version == 5
+
+    def test_only_if_published(self, menu):
+        """Test that a republication leaves unpublished and missing menus alone."""
+        assert snapshots.publish(menu.pk, only_if_published=True) is None
+        assert snapshots.publish(menu.pk + 1) is None
+        assert not MenuSnapshot.objects.exists()
+
+    def test_task(self, menu):
+        """Test that the Celery task publishes the menu and returns the version."""
+        assert publish_menu.apply(args=[menu.pk]).get() == 1
+        assert publish_menu.apply(args=[menu.pk + 1]).get() is None
+
+
+@pytest.mark.django_db
+class TestPublishedReads:
+    """Test serving anonymous reads from the published snapshot."""
+
+    def test_served_from_cache_without_queries(self, published):
+        """Test that a cached snapshot is served without touching the database."""
+        with CaptureQueriesContext(connection) as queries:
+            res = APIClient().get(detail_url(published.pk))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len(queries) == 0
+        assert res["X-Menu-Version"] == "1"
+        assert res.content == bytes(MenuSnapshot.objects.get(menu=published).body)
+        assert "Accept-Encoding" in res["Vary"]
+
+    def test_cache_miss_single_query(self, published):
+        """Test that a cache miss loads the published snapshot with one query."""
+        snapshots.forget_snapshot(published.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            first = APIClient().get(detail_url(published.pk))
+        assert len(queries) == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            second = APIClient().get(detail_url(published.pk))
+        assert len(queries) == 0
+        assert first.content == second.content
+        assert json.loads(first.content)["name"] == "Lunch"
+
+    def test_drafts_not_served(self, published, staff_client, django_capture_on_commit_callbacks):
+        """Test that edits stay invisible to the public until the menu is published again."""
+        Dish.objects.filter(name="Soup").update(price=Decimal("5.00"))
+
+        public = APIClient().get(detail_url(published.pk))
+        draft = staff_client.get(detail_url(published.pk))
+        assert {dish["price"] for dish in json.loads(public.content)["dishes"]} == {"4.50", "32.00"}
+        assert {dish["price"] for dish in draft.data["dishes"]} == {"5.00", "32.00"}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            snapshots.publish(published.pk)
+        republished = APIClient().get(detail_url(published.pk))
+        assert republished["X-Menu-Version"] == "2"
+        assert republished["ETag"] != public["ETag"]
+        assert {dish["price"] for dish in json.loads(republished.content)["dishes"]} == {"5.00", "32.00"}
+
+    def test_etag_revalidation(self, published):
+        """Test that a matching If-None-Match gets 304 without a body."""
+        etag = APIClient().get(detail_url(published.pk))["ETag"]
+
+        res = APIClient().get(detail_url(published.pk), HTTP_IF_NONE_MATCH=etag)
+
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert res.content == b""
+
+    def test_gzip_encoding(self, published):
+        """Test that clients accepting gzip get the precompressed body."""
+        plain = APIClient().get(detail_url(published.pk))
+        res = APIClient().get(detail_url(published.pk), HTTP_ACCEPT_ENCODING="br;q=0, gzip")
+
+        assert res["Content-Encoding"] == "gzip"
+        assert gzip.decompress(res.content) == plain.content
+        assert not plain.has_header("Content-Encoding")
+
+    def test_unpublished_menu_live(self, menu):
+        """Test that menus without a published snapshot are rendered live."""
+        res = APIClient().get(detail_url(menu.pk))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["name"] == "Lunch"
+        assert not res.has_header("X-Menu-Version")
+
+    def test_unpublish(self, published, staff_client, django_capture_on_commit_callbacks):
+        """Test that an unpublished menu is rendered live again."""
+        with django_capture_on_commit_callbacks(execute=True):
+            res = staff_client.post(reverse("menu:menu-unpublish", args=[published.pk]))
+
+        assert res.status_code == status.HTTP_204_NO_CONTENT
+        assert not APIClient().get(detail_url(published.pk)).has_header("X-Menu-Version")
+
+    def test_empty_menu_not_served(self, django_capture_on_commit_callbacks):
+        """Test that publishing a menu without dishes does not show it to anonymous users."""
+        empty = Menu.objects.create(name="Empty")
+        with django_capture_on_commit_callbacks(execute=True):
+            snapshots.publish(empty.pk)
+
+        assert APIClient().get(detail_url(empty.pk)).status_code == status.HTTP_404_NOT_FOUND
+        assert APIClient().get(reverse("menu:menu-list")).json() == []
+
+    def test_emptied_menu_not_served(self, published, django_capture_on_commit_callbacks):
+        """Test that the snapshot stops being served once the last dish is deleted or moved away."""
+        other = Menu.objects.create(name="Dinner")
+        with django_capture_on_commit_callbacks(execute=True):
+            Dish.objects.get(name="Soup").delete()
+            steak = Dish.objects.get(name="Steak")
+            steak.menu = other
+            steak.save()
+
+        assert APIClient().get(detail_url(published.pk)).status_code == status.HTTP_404_NOT_FOUND
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Dish.objects.create(menu=published, name="Bread", price=2, prep_time=1)
+        assert APIClient().get(detail_url(published.pk))["X-Menu-Version"] == "1"
+
+    def test_deleted_menu_not_served(self, published):
+        """Test that the snapshot of a deleted menu is no longer served."""
+        published.delete()
+
+        res = APIClient().get(detail_url(published.pk))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestPublishScheduling:
+    """Test publishing from Celery tasks."""
+
+    @pytest.fixture
+    def delayed(self, monkeypatch) -> list[tuple]:
+        """Record the publish tasks sent instead of sending them."""
+        calls = []
+        monkeypatch.setattr(publish_menu, "delay", lambda *args, **kwargs: calls.append((args, kwargs)))
+        return calls
+
+    def test_publish_endpoint(self, menu, staff_client, delayed, django_capture_on_commit_callbacks):
+        """Test that the publish endpoint queues the task once the request commits."""
+        with django_capture_on_commit_callbacks(execute=True):
+            res = staff_client.post(publish_url(menu.pk))
+
+        assert res.status_code == status.HTTP_202_ACCEPTED
+        assert delayed == [((menu.pk,), {})]
+
+    def test_publish_requires_authentication(self, menu):
+        """Test that anonymous clients cannot publish."""
+        res = APIClient().post(publish_url(menu.pk))
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_no_auto_publish_by_default(self, published, delayed, django_capture_on_commit_callbacks):
+        """Test that edits do not republish unless MENU_AUTO_PUBLISH is on."""
+        with django_capture_on_commit_callbacks(execute=True):
+            Dish.objects.create(menu=published, name="Salad", price=7, prep_time=5)
+
+        assert delayed == []
+
+    def test_auto_publish(self, settings, published, delayed, django_capture_on_commit_callbacks):
+        """Test that saves and bulk adjustments of a menu's dishes schedule its republication."""
+        settings.MENU_AUTO_PUBLISH = True
+
+        with django_capture_on_commit_callbacks(execute=True):
+            Dish.objects.create(menu=published, name="Salad", price=7, prep_time=5)
+        with django_capture_on_commit_callbacks(execute=True):
+            adjust_dishes(Dish.objects.filter(menu=published), DishAdjustment(price_percent=Decimal(10)))
+
+        assert delayed == [((published.pk,), {"only_if_published": True})] * 2
+
+    def test_auto_publish_adjustment_leaving_selection(
+        self, settings, published, delayed, django_capture_on_commit_callbacks
+    ):
+        """Test that menus are republished when the adjustment moves their dishes out of the selection."""
+        settings.MENU_AUTO_PUBLISH = True
+        Dish.objects.filter(menu=published).update(is_vegetarian=True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            adjust_dishes(Dish.objects.filter(is_vegetarian=True), DishAdjustment(is_vegetarian=False))
+
+        assert delayed == [((published.pk,), {"only_if_published": True})]
@@ -14,5 +14,6 @@ router.register("dishes", views.DishViewSet)
 app_name = "menu"
 
 urlpatterns = [
+    path("autocomplete/", views.AutocompleteView.as_view(), name="autocomplete"),
     path("", include(router.urls)),
 ]
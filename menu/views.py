@@ -2,23 +2,47 @@
 Views for the menu API.
 """
 
-from django.db.models import Count
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.utils.translation import gettext_lazy as _
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from core.coalescing import CoalescedReadMixin
+from core.db_router import ReplicaReadMixin
+from menu import autocomplete
+from menu.bulk import adjust_dishes, clone_menu
+from menu.catalog_index import index_for
+from menu.facets import cached_dish_facets
+from menu.filters import DishFilter
 from menu.models import Dish, Menu
 from menu.serializers import (
+    AutocompleteQuerySerializer,
+    DishAdjustmentSerializer,
     DishImageSerializer,
     DishSerializer,
+    MenuCloneSerializer,
     MenuDetailSerializer,
+    MenuDishesPageSerializer,
+    MenuDishesQuerySerializer,
+    MenuPreviewQuerySerializer,
+    MenuPreviewSerializer,
     MenuSerializer,
+    SimilarDishesQuerySerializer,
 )
+from menu.snapshots import published_snapshot, snapshot_response, unpublish
 
+# Similar dishes looked up beyond the requested number, for dishes deleted since the index was built.
+SIMILAR_DISHES_SPARE = 5
 
-class MenuViewSet(viewsets.ModelViewSet):
+
+class MenuViewSet(ReplicaReadMixin, CoalescedReadMixin, viewsets.ModelViewSet):
     """View for managing menu APIs."""
 
     serializer_class = MenuSerializer
@@ -44,27 +68,127 @@ class MenuViewSet(viewsets.ModelViewSet):
         "dishes_count",
         "created_at",
     )
+    # (limit, cursor) of the dishes page of a menu detail requested with ?dishes_limit= or ?dishes_cursor=.
+    dishes_page: tuple[int, int] | None = None
+    # Dishes per menu embedded in the menu list (?preview=).
+    preview = 0
 
     def get_queryset(self):
         """Extend queryset to handle custom logic."""
         queryset = self.queryset
 
         if self.action == "retrieve":
-            queryset = queryset.prefetch_related("dishes")
+            dishes = Dish.objects.order_by("id")
+            if self.dishes_page is None:
+                queryset = queryset.prefetch_related(Prefetch("dishes", queryset=dishes))
+            else:
+                limit, cursor = self.dishes_page
+                # One dish more than the page tells whether there is a next page.
+                dishes = dishes.filter(pk__gt=cursor)[: limit + 1]
+                queryset = queryset.prefetch_related(Prefetch("dishes", queryset=dishes, to_attr="page_dishes"))
+        elif self.action == "list" and self.preview:
+            # A sliced prefetch reads the first dishes of every menu in one query (ROW_NUMBER() by menu).
+            dishes = Dish.objects.order_by("id")[: self.preview]
+            queryset = queryset.prefetch_related(Prefetch("dishes", queryset=dishes, to_attr="preview_dishes"))
         # If the user is anonymous, we only show menus with dishes
         if self.request.user.is_anonymous:
             queryset = queryset.filter(dishes__isnull=False).distinct()
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """List menus, from the catalog index if it is enabled and can answer the request."""
+        params = MenuPreviewQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        self.preview = params.validated_data.get("preview", 0)
+        index = index_for(request)
+        data = index.menu_list(request, self) if index is not None else None
+        if data is None:
+            return super().list(request, *args, **kwargs)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serve anonymous JSON reads of a published menu from its snapshot, everything else live."""
+        if not kwargs["pk"].isdigit():
+            return super().retrieve(request, *args, **kwargs)
+        params = MenuDishesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        if params.validated_data:
+            # Snapshots and the catalog index hold all the dishes; a page is read live.
+            self.dishes_page = (
+                params.validated_data.get("dishes_limit", settings.MENU_DETAIL_DISHES_LIMIT),
+                params.validated_data.get("dishes_cursor", 0),
+            )
+            return super().retrieve(request, *args, **kwargs)
+        if request.user.is_anonymous and request.accepted_renderer.format == "json":
+            snapshot = published_snapshot(int(kwargs["pk"]))
+            if snapshot is not None:
+                return snapshot_response(request, snapshot)
+        index = index_for(request)
+        data = index.menu_detail(request, int(kwargs["pk"])) if index is not None else None
+        if data is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(data)
+
     def get_serializer_class(self):
         """Return appropriate serializer class."""
         if self.action == "retrieve":
-            return MenuDetailSerializer
+            return MenuDetailSerializer if self.dishes_page is None else MenuDishesPageSerializer
+        if self.action == "list" and self.preview:
+            return MenuPreviewSerializer
+        if self.action == "adjust_dishes":
+            return DishAdjustmentSerializer
+        if self.action == "clone":
+            return MenuCloneSerializer
         return self.serializer_class
 
+    def get_serializer_context(self):
+        """Pass the size of the requested dishes page to MenuDishesPageSerializer."""
+        context = super().get_serializer_context()
+        if self.dishes_page is not None:
+            context["dishes_limit"] = self.dishes_page[0]
+        return context
+
+    @action(methods=["POST"], detail=True)
+    def publish(self, request, pk=None):
+        """Publish the current state of the menu from a Celery task; anonymous reads then serve it."""
+        # Imported here so that web processes only load Celery when they send a task.
+        from menu.tasks import publish_menu
+
+        menu = self.get_object()
+        transaction.on_commit(lambda: publish_menu.delay(menu.pk))
+        return Response({"status": "queued"}, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=["POST"], detail=True)
+    def unpublish(self, request, pk=None):
+        """Serve the live menu to anonymous reads again."""
+        unpublish(self.get_object().pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(methods=["POST"], detail=True)
+    def clone(self, request, pk=None):
+        """Copy the menu with all its dishes under a new name, optionally multiplying the prices."""
+        menu = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        clone = clone_menu(menu, **serializer.validated_data)
+        data = MenuSerializer(clone, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
 
-class DishViewSet(viewsets.ModelViewSet):
+    @action(methods=["POST"], detail=True, url_path="adjust-dishes")
+    def adjust_dishes(self, request, pk=None):
+        """Change the price or attributes of the menu's dishes in one update, or preview it with dry_run."""
+        menu = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        dishes = serializer.select(Dish.objects.filter(menu=menu))
+        report = adjust_dishes(dishes, serializer.validated_data["adjustment"], serializer.validated_data["dry_run"])
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class DishViewSet(ReplicaReadMixin, CoalescedReadMixin, viewsets.ModelViewSet):
     """View for managing dish APIs."""
 
     serializer_class = DishSerializer
@@ -75,12 +199,43 @@ class DishViewSet(viewsets.ModelViewSet):
     filter_backends = (
         DjangoFilterBackend,
         filters.SearchFilter,
+        filters.OrderingFilter,
     )
-    filterset_fields = (
-        "menu",
-        "is_vegetarian",
-    )
+    filterset_class = DishFilter
     search_fields = ("name", "description")
+    ordering_fields = (
+        "price",
+        "prep_time",
+        "name",
+        "created_at",
+    )
+
+    def list(self, request, *args, **kwargs):
+        """List dishes; with ``facets=true`` also the facet counts of the filtered list."""
+        if request.query_params.get("facets") not in ("1", "true"):
+            index = index_for(request)
+            data = index.dish_list(request, self) if index is not None else None
+            if data is None:
+                return super().list(request, *args, **kwargs)
+            return Response(data)
+        return self.coalesced(self.list_with_facets, request, *args, **kwargs)
+
+    def list_with_facets(self, request, *args, **kwargs):
+        """List dishes together with the facet counts of the filtered list."""
+        queryset = self.filter_queryset(self.get_queryset())
+        params = [
+            (name, value) for name, values in request.query_params.lists() if name != "facets" for value in values
+        ]
+        facets = cached_dish_facets(queryset, params)
+        return Response({"results": self.get_serializer(queryset, many=True).data, "facets": facets})
+
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a dish, from the catalog index if it is enabled."""
+        index = index_for(request) if kwargs["pk"].isdigit() else None
+        data = index.dish_detail(request, int(kwargs["pk"])) if index is not None else None
+        if data is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(data)
 
     def get_serializer_class(self):
         """Return appropriate serializer class for request."""
@@ -88,6 +243,39 @@ class DishViewSet(viewsets.ModelViewSet):
             return DishImageSerializer
         return self.serializer_class
 
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """List the dishes most similar to a dish, from the index built by build_similar_dishes."""
+        if not settings.MENU_SIMILARITY or not pk.isdigit():
+            raise NotFound
+        # Imported here so that only processes serving this endpoint load NumPy.
+        from menu import similarity
+
+        params = SimilarDishesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        limit = params.validated_data.get("limit", settings.MENU_SIMILAR_DISHES_LIMIT)
+        index = similarity.get_index()
+        if index is None:
+            similarity.rebuild_later()
+            return Response(
+                {"detail": _("Similar dishes are not available yet.")},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(settings.MENU_SIMILARITY_REBUILD_DELAY)},
+            )
+
+        # A few spare results replace dishes deleted since the index was built.
+        ids = index.similar(int(pk), limit + SIMILAR_DISHES_SPARE)
+        if ids is None:
+            # Newer than the index: scored from its own row.
+            ids = index.similar_to(self.get_object(), limit + SIMILAR_DISHES_SPARE)
+            dishes = self.get_queryset().in_bulk(ids)
+        else:
+            dishes = self.get_queryset().in_bulk([int(pk), *ids])
+            if int(pk) not in dishes:
+                raise NotFound
+        results = [dishes[dish_id] for dish_id in ids if dish_id in dishes][:limit]
+        return Response(self.get_serializer(results, many=True).data)
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload an image to a dish."""
@@ -99,3 +287,25 @@ class DishViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteView(APIView):
+    """Suggest menu and dish names starting with ``q``, or with a word of them starting with it."""
+
+    serializer_class = AutocompleteQuerySerializer
+
+    def get(self, request, *args, **kwargs):
+        params = self.serializer_class(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data["q"]
+        limit = params.validated_data.get("limit", settings.MENU_AUTOCOMPLETE_LIMIT)
+        anonymous = request.user.is_anonymous
+        if not autocomplete.normalize(query):
+            return Response([])
+
+        index = autocomplete.get_index()
+        if index is None:
+            suggestions = autocomplete.suggest_from_database(query, limit, anonymous)
+        else:
+            suggestions = index.suggest(query, limit, anonymous)
+        return Response([suggestion.represent() for suggestion in suggestions])
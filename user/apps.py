@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self) -> None:
+        from core.metrics import registry
+        from user import schema  # noqa: F401 - for `manage.py spectacular`, which does not load core.schema
+        from user.hashing import get_hash_limiter
+
+        registry.register_collector(
+            "password_hash",
+            lambda: get_hash_limiter().metrics(),
+            # The limit is shared by all workers; the hashes in flight add up.
+            gauges={"in_flight": "sum", "max_concurrent": "max"},
+        )
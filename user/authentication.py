@@ -0,0 +1,123 @@
+"""
+Authentication classes for the user API.
+
+``ClaimsJWTAuthentication`` builds the request user from signed token claims
+instead of loading the ``User`` row on every request. Revocation is handled by
+the per-user token version of ``user.token_versions``, checked against the
+cache.
+"""
+
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
+
+from core.timing import TimedPhase
+from user.token_versions import REVOKED, get_token_version
+
+TOKEN_VERSION_CLAIM = "token_version"
+IS_STAFF_CLAIM = "is_staff"
+IS_ACTIVE_CLAIM = "is_active"
+
+
+def full_user_cache_key(user_id: Any, token_version: int) -> str:
+    """Return the cache key holding a full user instance for a token version."""
+    return f"user:full:{user_id}:{token_version}"
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user backed by the claims of a validated token.
+
+    Checks that need the full model (permissions, groups) load it through a
+    short-lived cache keyed by the token version.
+    """
+
+    @cached_property
+    def is_staff(self) -> bool:
+        return bool(self.token.get(IS_STAFF_CLAIM, False))
+
+    @cached_property
+    def is_active(self) -> bool:  # type: ignore[override]
+        return bool(self.token.get(IS_ACTIVE_CLAIM, True))
+
+    @cached_property
+    def is_superuser(self) -> bool:
+        return self.full_user.is_superuser
+
+    @cached_property
+    def token_version(self) -> int:
+        return int(self.token[TOKEN_VERSION_CLAIM])
+
+    @cached_property
+    def full_user(self):
+        """Return the user model instance, cached for ``AUTH_USER_CACHE_TIMEOUT`` seconds."""
+        key = full_user_cache_key(self.id, self.token_version)
+        user = cache.get(key)
+        if user is None:
+            user = get_user_model().objects.get(pk=self.id)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+    @property
+    def groups(self):
+        return self.full_user.groups
+
+    @property
+    def user_permissions(self):
+        return self.full_user.user_permissions
+
+    def get_group_permissions(self, obj: object | None = None) -> set:
+        return self.full_user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj: object | None = None) -> set:
+        return self.full_user.get_all_permissions(obj)
+
+    def has_perm(self, perm: str, obj: object | None = None) -> bool:
+        return self.full_user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list: list[str], obj: object | None = None) -> bool:
+        return self.full_user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module: str) -> bool:
+        return self.full_user.has_module_perms(module)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that does not query the user table per request.
+
+    Tokens issued before the claims were added fall back to the regular
+    database lookup.
+    """
+
+    def authenticate(self, request):
+        """Authenticate the request, recording the time spent in the request timings."""
+        with TimedPhase("auth"):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token: Token):
+        """Return a ``ClaimsUser`` for tokens carrying a current token version."""
+        if TOKEN_VERSION_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise AuthenticationFailed(_("Token contained no recognizable user identification")) from e
+
+        current_version = get_token_version(user_id)
+        if current_version == REVOKED:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if current_version != validated_token[TOKEN_VERSION_CLAIM]:
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+        return ClaimsUser(validated_token)
@@ -0,0 +1,149 @@
+"""
+Admission control for password hashing.
+
+Hashing is CPU bound and slow on purpose, so a login burst can occupy every
+web worker. API views that hash passwords (see ``user.views``) run inside
+``limit_hashing()``: a hash there first takes a slot of a counter in the
+cache, shared by every worker using the same cache, and waits at most
+``MAX_WAIT`` seconds for one. Without a slot it raises ``HashLimitReached``,
+which those views answer with a 503 and ``Retry-After``, so the worker is
+free again at once. Hashes outside the API (admin login, management
+commands) are not limited.
+
+With the default per-process cache the limit applies per worker process;
+it should then be below the worker's thread count to leave threads for other
+requests. Slots of a worker killed while hashing are freed when the counter
+expires.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+T = TypeVar("T")
+
+IN_FLIGHT_KEY = "user:password-hash:in-flight"
+
+# Seconds between attempts to take a slot.
+POLL_INTERVAL = 0.02
+
+_limited: ContextVar[bool] = ContextVar("password_hash_limited", default=False)
+
+
+class HashLimitReached(Exception):
+    """Raised when no hashing slot became free in time."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Too many password hashes in progress, retry after {retry_after} s.")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def limit_hashing() -> Iterator[None]:
+    """Apply the hashing limit to the password hashes of the block."""
+    token = _limited.set(True)
+    try:
+        yield
+    finally:
+        _limited.reset(token)
+
+
+class PasswordHashLimiter:
+    """Counter of the password hashes in progress, kept in the cache."""
+
+    def __init__(self, max_concurrent: int, max_wait: float, retry_after: int, expiry: int) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.expiry = expiry
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "unlimited": 0,
+            "wait_seconds": 0.0,
+            "hash_seconds": 0.0,
+        }
+
+    @classmethod
+    def from_settings(cls) -> "PasswordHashLimiter":
+        """Create a limiter configured by the ``PASSWORD_HASH_LIMIT`` setting."""
+        config = settings.PASSWORD_HASH_LIMIT
+        return cls(
+            max_concurrent=config["MAX_CONCURRENT"],
+            max_wait=config["MAX_WAIT"],
+            retry_after=config["RETRY_AFTER"],
+            expiry=config["EXPIRY"],
+        )
+
+    def _acquire(self) -> float:
+        """Take a slot, waiting up to ``max_wait``; return the seconds waited."""
+        start = time.monotonic()
+        while True:
+            cache.add(IN_FLIGHT_KEY, 0, self.expiry)
+            try:
+                taken = cache.incr(IN_FLIGHT_KEY)
+            except ValueError:
+                # Expired between add() and incr().
+                continue
+            if taken <= self.max_concurrent:
+                return time.monotonic() - start
+            self._release()
+            if time.monotonic() - start + POLL_INTERVAL > self.max_wait:
+                with self._lock:
+                    self._stats["rejected"] += 1
+                raise HashLimitReached(self.retry_after)
+            time.sleep(POLL_INTERVAL)
+
+    def _release(self) -> None:
+        # ValueError: the counter expired meanwhile, and with it this slot.
+        with suppress(ValueError):
+            cache.decr(IN_FLIGHT_KEY)
+
+    def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Return ``func(*args)``, within a slot if the caller runs inside ``limit_hashing()``."""
+        if not _limited.get():
+            with self._lock:
+                self._stats["unlimited"] += 1
+            return func(*args)
+
+        waited = self._acquire()
+        started_at = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return func(*args)
+        finally:
+            self._release()
+            with self._lock:
+                self._in_flight -= 1
+                self._stats["completed"] += 1
+                self._stats["wait_seconds"] += waited
+                self._stats["hash_seconds"] += time.monotonic() - started_at
+
+    def metrics(self) -> dict[str, float]:
+        """Return a snapshot of the counters of this process."""
+        with self._lock:
+            return {**self._stats, "in_flight": self._in_flight, "max_concurrent": self.max_concurrent}
+
+
+_limiter: PasswordHashLimiter | None = None
+_limiter_lock = threading.Lock()
+
+
+def get_hash_limiter() -> PasswordHashLimiter:
+    """Return the process-wide password hashing limiter."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = PasswordHashLimiter.from_settings()
+    return _limiter
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped on password change or deactivation to revoke issued tokens.'),
+        ),
+    ]
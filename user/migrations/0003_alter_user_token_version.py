@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 02:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped when the password or the active, staff or superuser flag changes, to revoke issued tokens.'),
+        ),
+    ]
@@ -4,12 +4,19 @@ Database models for the User app.
 
 from typing import Any, cast
 
+from django.contrib.auth.hashers import make_password, verify_password
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
-from django.db import models
+from django.db import models, transaction
+
+from user.hashing import HashLimitReached, get_hash_limiter
+from user.token_versions import publish_token_version
+
+# Carried in the token claims or the cached user; a change revokes issued tokens.
+TOKEN_FIELDS = ("is_active", "is_staff", "is_superuser")
 
 
 class UserManager(BaseUserManager):
@@ -38,9 +45,64 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    token_version = models.PositiveIntegerField(
+        default=0,
+        help_text="Bumped when the password or the active, staff or superuser flag changes, to revoke issued tokens.",
+    )
     objects = UserManager()
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ()  # type: ignore
 
     def __str__(self) -> str:
         return self.email
+
+    def set_password(self, raw_password: str | None) -> None:
+        """Hash the password, within the hashing limit when called from the API."""
+        self.password = get_hash_limiter().run(make_password, raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password: str) -> bool:
+        """Verify the password within the hashing limit, upgrading an outdated hash."""
+        limiter = get_hash_limiter()
+        is_correct, must_update = limiter.run(verify_password, raw_password, self.password)
+
+        if is_correct and must_update:
+            try:
+                self.password = limiter.run(make_password, raw_password)
+            except HashLimitReached:
+                # The upgrade is retried on the next login.
+                return is_correct
+            self.save(update_fields=["password"])
+
+        return is_correct
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded token fields to detect changes on save."""
+        instance = super().from_db(db, field_names, values)
+        instance._remember_token_fields()
+        return instance
+
+    def _remember_token_fields(self) -> None:
+        # Deferred fields are left out rather than loaded.
+        self._loaded_token_fields = {name: self.__dict__[name] for name in TOKEN_FIELDS if name in self.__dict__}
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """Bump the token version when the password or one of ``TOKEN_FIELDS`` changes."""
+        password_changed = self._password is not None
+        loaded = getattr(self, "_loaded_token_fields", {})
+        fields_changed = any(getattr(self, name) != value for name, value in loaded.items())
+        revoke = password_changed or fields_changed
+
+        if revoke:
+            self.token_version += 1
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "token_version"}
+
+        super().save(*args, **kwargs)
+        self._remember_token_fields()
+
+        if revoke:
+            # Published once committed, so that a rollback leaves the cached version alone.
+            transaction.on_commit(lambda: publish_token_version(self), using=self._state.db)
@@ -0,0 +1,11 @@
+"""
+OpenAPI schema extensions for the user app.
+"""
+
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """Document ``ClaimsJWTAuthentication`` as the regular JWT bearer scheme."""
+
+    target_class = "user.authentication.ClaimsJWTAuthentication"
@@ -5,9 +5,16 @@ Serializers for the user API View.
 from typing import Any, ClassVar
 
 from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import Token
 
+from user.authentication import IS_ACTIVE_CLAIM, IS_STAFF_CLAIM, TOKEN_VERSION_CLAIM
 from user.models import User
+from user.token_versions import get_token_version
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -30,10 +37,34 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance: User, validated_data: dict[str, Any]) -> User:
         """Update and return user."""
         password = validated_data.pop("password", None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+
+        return super().update(instance, validated_data)
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Token serializer embedding the claims used by ``ClaimsJWTAuthentication``."""
+
+    @classmethod
+    def get_token(cls, user: User) -> Token:
+        """Return a refresh token carrying staff, active and token version claims."""
+        token = super().get_token(user)
+        token[IS_STAFF_CLAIM] = user.is_staff
+        token[IS_ACTIVE_CLAIM] = user.is_active
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh serializer rejecting tokens whose version has been revoked."""
+
+    def validate(self, attrs: dict[str, Any]) -> dict[str, str]:
+        """Check the token version before issuing a new access token."""
+        refresh = self.token_class(attrs["refresh"])
+        if TOKEN_VERSION_CLAIM in refresh.payload:
+            user_id = refresh.payload[api_settings.USER_ID_CLAIM]
+            if get_token_version(user_id) != refresh.payload[TOKEN_VERSION_CLAIM]:
+                raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
 
-        return user
+        return super().validate(attrs)
@@ -0,0 +1,160 @@
+"""
+Tests for the claims-based JWT authentication.
+"""
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.authentication import ClaimsUser
+from user.serializers import ClaimsTokenObtainPairSerializer
+
+User = get_user_model()
+
+TOKEN_URL = reverse("user:token_obtain_pair")
+TOKEN_REFRESH_URL = reverse("user:token_refresh")
+ME_URL = reverse("user:me")
+MENU_URL = reverse("menu:menu-list")
+
+
+@pytest.fixture
+def user() -> User:
+    """Fixture for creating a test user."""
+    return User.objects.create_user("user@example.com", "password123", name="Test User")
+
+
+@pytest.fixture
+def tokens(user) -> dict[str, str]:
+    """Fixture returning a token pair obtained through the API."""
+    res = APIClient().post(TOKEN_URL, {"email": user.email, "password": "password123"})
+    assert res.status_code == status.HTTP_200_OK
+    return res.data
+
+
+def bearer_client(access: str) -> APIClient:
+    """Return a client sending the given access token."""
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+    return client
+
+
+@pytest.mark.django_db
+class TestClaimsAuthentication:
+    """Test authenticating requests from token claims."""
+
+    def test_token_contains_claims(self, user):
+        """Test that issued tokens carry the staff, active and version claims."""
+        token = ClaimsTokenObtainPairSerializer.get_token(user)
+
+        assert token["is_staff"] is False
+        assert token["is_active"] is True
+        assert token["token_version"] == user.token_version
+
+    def test_read_does_not_query_user_table(self, tokens, django_assert_num_queries):
+        """Test that an authenticated read needs no user lookup once the version is cached."""
+        client = bearer_client(tokens["access"])
+        client.get(MENU_URL)
+
+        with django_assert_num_queries(1):
+            res = client.get(MENU_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert isinstance(res.wsgi_request.user, ClaimsUser)
+
+    def test_me_endpoint_loads_user(self, tokens, user):
+        """Test that the me endpoint returns the full user for a claims token."""
+        res = bearer_client(tokens["access"]).get(ME_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["email"] == user.email
+
+    def test_password_change_revokes_tokens(self, tokens, user, django_capture_on_commit_callbacks):
+        """Test that changing the password invalidates previously issued tokens."""
+        client = bearer_client(tokens["access"])
+        with django_capture_on_commit_callbacks(execute=True):
+            res = client.patch(ME_URL, {"password": "newpassword123"})
+        assert res.status_code == status.HTTP_200_OK
+
+        res = client.get(ME_URL)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_deactivation_revokes_tokens(self, tokens, user, django_capture_on_commit_callbacks):
+        """Test that deactivating a user invalidates previously issued tokens."""
+        client = bearer_client(tokens["access"])
+        assert client.get(ME_URL).status_code == status.HTTP_200_OK
+
+        user = User.objects.get(pk=user.pk)
+        user.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+
+        res = client.get(ME_URL)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize("flag", ["is_staff", "is_superuser"])
+    def test_privilege_change_revokes_tokens(self, tokens, user, flag, django_capture_on_commit_callbacks):
+        """Test that granting or removing staff or superuser status invalidates previously issued tokens."""
+        client = bearer_client(tokens["access"])
+        assert client.get(ME_URL).status_code == status.HTTP_200_OK
+
+        user = User.objects.get(pk=user.pk)
+        setattr(user, flag, True)
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+
+        assert client.get(ME_URL).status_code == status.HTTP_401_UNAUTHORIZED
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_rolled_back_change_keeps_tokens(self, tokens, user):
+        """Test that a revoking change that is rolled back leaves the cached version and the tokens valid."""
+        client = bearer_client(tokens["access"])
+        assert client.get(ME_URL).status_code == status.HTTP_200_OK
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            user = User.objects.get(pk=user.pk)
+            user.is_active = False
+            user.save()
+            raise RuntimeError
+
+        assert client.get(ME_URL).status_code == status.HTTP_200_OK
+
+    def test_other_changes_keep_tokens(self, tokens, user):
+        """Test that saving other fields leaves issued tokens valid."""
+        user = User.objects.get(pk=user.pk)
+        user.name = "Renamed"
+        user.save()
+
+        assert bearer_client(tokens["access"]).get(ME_URL).status_code == status.HTTP_200_OK
+
+    def test_token_valid_after_refresh(self, tokens):
+        """Test that refreshed access tokens keep the claims and authenticate."""
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        assert res.status_code == status.HTTP_200_OK
+
+        res = bearer_client(res.data["access"]).get(ME_URL)
+        assert res.status_code == status.HTTP_200_OK
+
+    def test_token_without_claims_falls_back_to_lookup(self, user):
+        """Test that tokens without a version claim are checked against the database."""
+        access = RefreshToken.for_user(user).access_token
+
+        res = bearer_client(str(access)).get(ME_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data["email"] == user.email
+
+    def test_permission_checks_use_full_user(self, tokens, user):
+        """Test that permission checks load the full user."""
+        res = bearer_client(tokens["access"]).get(ME_URL)
+        claims_user = res.wsgi_request.user
+
+        assert claims_user.has_perm("menu.add_menu") is False
+        assert claims_user.full_user == user
@@ -0,0 +1,148 @@
+"""
+Tests for the password hashing limit.
+"""
+
+import threading
+from unittest.mock import patch
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.hashing import HashLimitReached, PasswordHashLimiter, limit_hashing
+
+User = get_user_model()
+
+CREATE_USER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+MD5_HASHER = "django.contrib.auth.hashers.MD5PasswordHasher"
+PBKDF2_HASHER = "django.contrib.auth.hashers.PBKDF2PasswordHasher"
+
+
+def occupy(limiter: PasswordHashLimiter) -> tuple[threading.Event, threading.Thread]:
+    """Hold one slot of the limiter until the returned event is set."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocker():
+        started.set()
+        release.wait(5)
+
+    def hold():
+        with limit_hashing():
+            limiter.run(blocker)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    started.wait(5)
+    return release, thread
+
+
+class TestPasswordHashLimiter:
+    """Test admission control of password hashes."""
+
+    def test_run_returns_result(self):
+        """Test that a hash within the limit runs and is counted."""
+        limiter = PasswordHashLimiter(max_concurrent=1, max_wait=0, retry_after=1, expiry=60)
+
+        with limit_hashing():
+            assert limiter.run(sum, [1, 2]) == 3
+        metrics = limiter.metrics()
+        assert metrics["completed"] == 1
+        assert metrics["in_flight"] == 0
+
+    def test_rejects_when_full(self):
+        """Test that a hash finding no free slot within the wait is rejected."""
+        limiter = PasswordHashLimiter(max_concurrent=1, max_wait=0.05, retry_after=3, expiry=60)
+        release, thread = occupy(limiter)
+
+        try:
+            with limit_hashing(), pytest.raises(HashLimitReached) as exc_info:
+                limiter.run(sum, [1])
+        finally:
+            release.set()
+            thread.join()
+
+        assert exc_info.value.retry_after == 3
+        assert limiter.metrics()["rejected"] == 1
+        with limit_hashing():
+            assert limiter.run(sum, [1]) == 1
+
+    def test_slot_shared_through_cache(self):
+        """Test that limiters of different workers share the slots through the cache."""
+        worker, other_worker = (
+            PasswordHashLimiter(max_concurrent=1, max_wait=0, retry_after=1, expiry=60) for _ in range(2)
+        )
+        release, thread = occupy(worker)
+
+        try:
+            with limit_hashing(), pytest.raises(HashLimitReached):
+                other_worker.run(sum, [1])
+        finally:
+            release.set()
+            thread.join()
+
+    def test_unlimited_outside_api(self):
+        """Test that hashes outside limit_hashing() run even when every slot is taken."""
+        limiter = PasswordHashLimiter(max_concurrent=1, max_wait=0, retry_after=1, expiry=60)
+        release, thread = occupy(limiter)
+
+        try:
+            assert limiter.run(sum, [1]) == 1
+        finally:
+            release.set()
+            thread.join()
+
+        assert limiter.metrics()["unlimited"] == 1
+
+
+@pytest.mark.django_db
+class TestHashingEndpoints:
+    """Test the token and signup endpoints under hashing pressure."""
+
+    def test_token_returns_503_when_saturated(self):
+        """Test that a full limiter answers quickly with 503 and Retry-After."""
+        User.objects.create_user(email="user@example.com", password="password123")
+
+        with patch.object(PasswordHashLimiter, "_acquire", side_effect=HashLimitReached(2)):
+            res = APIClient().post(TOKEN_URL, {"email": "user@example.com", "password": "password123"})
+
+        assert res.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert res["Retry-After"] == "2"
+
+    def test_signup_returns_503_when_saturated(self):
+        """Test that signup is rejected with 503 when the limiter is full."""
+        payload = {"email": "new@example.com", "password": "password123", "name": "New"}
+
+        with patch.object(PasswordHashLimiter, "_acquire", side_effect=HashLimitReached(1)):
+            res = APIClient().post(CREATE_USER_URL, payload)
+
+        assert res.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert User.objects.exists() is False
+
+    def test_admin_and_commands_not_limited(self, client, monkeypatch):
+        """Test that admin login and createsuperuser hash even when the limiter is full."""
+        monkeypatch.setenv("DJANGO_SUPERUSER_PASSWORD", "password123")
+        with patch.object(PasswordHashLimiter, "_acquire", side_effect=HashLimitReached(1)):
+            call_command("createsuperuser", email="admin@example.com", interactive=False, verbosity=0)
+            res = client.post(reverse("admin:login"), {"username": "admin@example.com", "password": "password123"})
+
+        assert res.status_code == status.HTTP_302_FOUND
+
+    def test_login_upgrades_outdated_hash(self, settings):
+        """Test that logging in rehashes a password stored with an outdated hasher."""
+        settings.PASSWORD_HASHERS = [MD5_HASHER, PBKDF2_HASHER]
+        user = User.objects.create_user(email="user@example.com", password="password123")
+        assert user.password.startswith("md5$")
+
+        settings.PASSWORD_HASHERS = [PBKDF2_HASHER, MD5_HASHER]
+        res = APIClient().post(TOKEN_URL, {"email": "user@example.com", "password": "password123"})
+
+        assert res.status_code == status.HTTP_200_OK
+        upgraded = User.objects.get(pk=user.pk)
+        assert upgraded.password.startswith("pbkdf2_sha256$")
+        assert upgraded.token_version == user.token_version
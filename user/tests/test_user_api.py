@@ -4,6 +4,8 @@ Tests for the user API.
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -122,6 +124,16 @@ class TestPrivateUserApi:
         assert user.check_password(payload["password"])
         assert res.status_code == status.HTTP_200_OK
 
+    def test_password_change_single_write(self, authenticated_client):
+        """Test that changing the name and password updates the user row once."""
+        client, _ = authenticated_client
+
+        with CaptureQueriesContext(connection) as queries:
+            res = client.patch(ME_URL, {"name": "New Name", "password": "newpassword123"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert len([query for query in queries if query["sql"].startswith('UPDATE "user_user"')]) == 1
+
     def test_post_me_not_allowed(self, authenticated_client):
         """Test that POST is not allowed for the me endpoint."""
         client, _ = authenticated_client
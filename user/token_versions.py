@@ -0,0 +1,40 @@
+"""
+Per-user token versions used to revoke issued tokens.
+
+Tokens carry the version of their user at issue time. ``User.save`` bumps it
+when the password, the active flag or the staff or superuser flag changes,
+and publishes the new one to the cache once the change commits, where the
+authentication and the token refresh compare it. Kept apart from ``user.authentication`` so that the
+model does not depend on DRF and Simple JWT.
+"""
+
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+# Cached in place of a version for users that are inactive or do not exist.
+REVOKED = -1
+
+
+def token_version_cache_key(user_id: Any) -> str:
+    """Return the cache key holding the current token version of a user."""
+    return f"user:token-version:{user_id}"
+
+
+def publish_token_version(user: Any) -> None:
+    """Store the current token version of the user in the cache."""
+    version = user.token_version if user.is_active else REVOKED
+    cache.set(token_version_cache_key(user.pk), version, settings.AUTH_TOKEN_VERSION_CACHE_TIMEOUT)
+
+
+def get_token_version(user_id: Any) -> int:
+    """Return the current token version of a user, loading it from the database on a cache miss."""
+    key = token_version_cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        row = get_user_model().objects.filter(pk=user_id).values_list("token_version", "is_active").first()
+        version = row[0] if row and row[1] else REVOKED
+        cache.set(key, version, settings.AUTH_TOKEN_VERSION_CACHE_TIMEOUT)
+    return version
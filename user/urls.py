@@ -3,10 +3,7 @@ URL mappings for the user API.
 """
 
 from django.urls import path
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from user import views
 
@@ -14,7 +11,7 @@ app_name = "user"
 
 urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name="create"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("token/", views.TokenView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("me/", views.ManageUserView.as_view(), name="me"),
 ]
@@ -2,18 +2,53 @@
 Views for the user API.
 """
 
-from rest_framework import generics, permissions
-
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from user.authentication import ClaimsUser
+from user.hashing import HashLimitReached, limit_hashing
 from user.serializers import UserSerializer
 
 
-class CreateUserView(generics.CreateAPIView):
+class HashingUnavailable(APIException):
+    """No password hashing slot became free in time (see user.hashing)."""
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _("Too many sign-in requests, please retry shortly.")
+    default_code = "hashing_unavailable"
+
+    def __init__(self, wait: int) -> None:
+        super().__init__()
+        self.wait = wait
+
+
+class HashLimitedMixin:
+    """Hash passwords within the hashing limit, answering 503 when it is reached."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with limit_hashing():
+            return super().dispatch(request, *args, **kwargs)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, HashLimitReached):
+            exc = HashingUnavailable(exc.retry_after)
+        return super().handle_exception(exc)
+
+
+class CreateUserView(HashLimitedMixin, generics.CreateAPIView):
     """Create a new user in the system."""
 
     serializer_class = UserSerializer
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class TokenView(HashLimitedMixin, TokenObtainPairView):
+    """Obtain a pair of tokens for an email and password."""
+
+
+class ManageUserView(HashLimitedMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
 
     serializer_class = UserSerializer
@@ -21,4 +56,8 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
+        user = self.request.user
+        # Claims-based users carry no model state; load a fresh row to update.
+        if isinstance(user, ClaimsUser):
+            return get_user_model().objects.get(pk=user.pk)
+        return user